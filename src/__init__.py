@@ -9,12 +9,71 @@ bl_info = {
 }
 
 import bpy
-from bpy.props import BoolProperty, EnumProperty, PointerProperty, StringProperty
+from bpy.props import (
+    BoolProperty,
+    EnumProperty,
+    FloatProperty,
+    IntProperty,
+    PointerProperty,
+    StringProperty,
+)
 
+from . import cache, detector, prefetch
 from .ops import SMARTCLIP_OT_modal_move
 from .prefs import SMARTCLIP_AddonPreferences, get_addon_prefs
 
 
+# ======================================================================
+# Snap overrides (per object / collection)
+# ======================================================================
+
+class SMARTCLIP_SnapOverride(bpy.types.PropertyGroup):
+    mode: EnumProperty(
+        name="Snap Targets",
+        description="How the vertex budget treats this object (or collection)",
+        items=[
+            ("DEFAULT", "Default", "Budgeted by distance like everything else"),
+            ("FULL", "Always Full Vertices", "Always index every vertex, nearest or not"),
+            ("BOUNDS", "Bounds Only", "Only the bounding-box corners and origin"),
+            ("EXCLUDE", "Exclude", "Never a snap target"),
+        ],
+        default="DEFAULT",
+    )
+    priority: FloatProperty(
+        name="Priority",
+        description="Weight in the distance order: 2 competes for the budget as if "
+                    "twice as near, 0.5 as if twice as far",
+        default=1.0,
+        min=0.01,
+        max=100.0,
+    )
+    vertex_cap: IntProperty(
+        name="Vertex Cap",
+        description="Objects with more vertices than this are bounds-only. 0 = no cap",
+        default=0,
+        min=0,
+    )
+    vertex_subset: StringProperty(
+        name="Vertex Subset",
+        description="Only snap to the vertices in this vertex group, or with this boolean "
+                    "point attribute set (e.g. hand-marked keypoints on a scan). Empty = "
+                    "all vertices",
+        default="",
+    )
+
+
+def _draw_override(layout, id_data, label):
+    group = getattr(id_data, "smartclip_override", None)
+    if group is None:
+        return
+    layout.label(text=label)
+    layout.prop(group, "mode", text="")
+    row = layout.row(align=True)
+    row.prop(group, "priority")
+    row.prop(group, "vertex_cap", text="Cap")
+    layout.prop(group, "vertex_subset", text="Subset", icon="GROUP_VERTEX")
+
+
 # ======================================================================
 # UI Panel
 # ======================================================================
@@ -40,6 +99,13 @@ class SMARTCLIP_PT_panel(bpy.types.Panel):
             col.separator()
             col.prop(scene, "target_collection", text="Collection")
 
+        layout.separator()
+        layout.prop(scene, "smartclip_source_snap")
+        layout.prop(scene, "smartclip_equal_spacing")
+        layout.prop(scene, "smartclip_face_snap")
+        layout.prop(scene, "smartclip_edge_snap")
+        layout.prop(scene, "smartclip_occlusion")
+
         layout.separator()
         box = layout.box()
         box.label(text="Axis Align:")
@@ -47,16 +113,29 @@ class SMARTCLIP_PT_panel(bpy.types.Panel):
         row.prop(scene, "smartclip_align_x", toggle=True)
         row.prop(scene, "smartclip_align_y", toggle=True)
         row.prop(scene, "smartclip_align_z", toggle=True)
+        box.prop(scene, "smartclip_align_combine")
 
         layout.separator()
         box = layout.box()
         box.label(text="Performance:")
         prefs = get_addon_prefs(context)
-        budget = prefs.max_vertex_budget if prefs else 50000
-        box.label(text=f"Max Vertices: {budget}")
+        if getattr(prefs, "index_layout", "FLAT") == "TWO_LEVEL":
+            box.label(text="Index: Two-Level (lazy, no budget)")
+        else:
+            budget = prefs.max_vertex_budget if prefs else 50000
+            box.label(text=f"Max Vertices: {budget}")
         info = getattr(scene, "smartclip_runtime_info", "")
-        if info:
-            box.label(text=info)
+        for line in info.split(" | ") if info else ():
+            box.label(text=line)
+
+        layout.separator()
+        box = layout.box()
+        box.label(text="Snap Override:")
+        if context.active_object is not None:
+            _draw_override(box, context.active_object, f"Object: {context.active_object.name}")
+        coll = context.collection
+        if coll is not None and coll is not scene.collection:
+            _draw_override(box, coll, f"Collection: {coll.name}")
 
         layout.separator()
         layout.operator(SMARTCLIP_OT_modal_move.bl_idname, icon="SNAP_ON")
@@ -205,6 +284,7 @@ class SMARTCLIP_OT_clear_hotkeys(bpy.types.Operator):
 # ======================================================================
 
 _classes = (
+    SMARTCLIP_SnapOverride,
     SMARTCLIP_AddonPreferences,
     SMARTCLIP_OT_add_default_hotkeys,
     SMARTCLIP_OT_clear_hotkeys,
@@ -240,6 +320,43 @@ def register():
         name="Runtime Info",
         default="",
     )
+    bpy.types.Scene.smartclip_source_snap = BoolProperty(
+        name="Snap From Corners / Vertices",
+        description="Snap the moving object's bounding-box corners (Object Mode) or its "
+                    "selected vertices (Edit Mode) instead of only the pivot",
+        default=False,
+    )
+    bpy.types.Scene.smartclip_equal_spacing = BoolProperty(
+        name="Equal Spacing",
+        description="Object Mode: snap so the gap to a neighbour matches an existing gap "
+                    "between other objects, or centre between two neighbours",
+        default=False,
+    )
+    bpy.types.Scene.smartclip_face_snap = BoolProperty(
+        name="Snap to Faces",
+        description="Also snap to the nearest point on the surface of nearby objects "
+                    "(vertices close by are still preferred)",
+        default=False,
+    )
+    bpy.types.Scene.smartclip_edge_snap = BoolProperty(
+        name="Snap to Edges",
+        description="Also snap to edge midpoints and the closest point on nearby edges "
+                    "(Flat index layout; midpoints count against the vertex budget)",
+        default=False,
+    )
+    bpy.types.Scene.smartclip_occlusion = BoolProperty(
+        name="Ignore Hidden Targets",
+        description="Skip snap targets hidden behind other geometry in the current view "
+                    "(ray cast against every visible mesh that is not moving, including the "
+                    "unselected part of a mesh in Edit Mode)",
+        default=False,
+    )
+    bpy.types.Scene.smartclip_align_combine = BoolProperty(
+        name="Combine Axes",
+        description="Axis-clipping: align to several axes at once, each to its own "
+                    "reference vertex",
+        default=False,
+    )
     bpy.types.Scene.smartclip_align_x = BoolProperty(
         name="X",
         description="Axis-clipping: align to reference vertices' X coordinate",
@@ -256,19 +373,32 @@ def register():
         default=False,
     )
 
+    bpy.types.Object.smartclip_override = PointerProperty(type=SMARTCLIP_SnapOverride)
+    bpy.types.Collection.smartclip_override = PointerProperty(type=SMARTCLIP_SnapOverride)
+
+    cache.register()
+    prefetch.register()
     _register_keymaps()
 
 
 def unregister():
     _unregister_keymaps()
+    prefetch.unregister()
+    detector.shutdown_build_pool()
+    cache.unregister()
 
     props = (
         "smartclip_align_z", "smartclip_align_y", "smartclip_align_x",
+        "smartclip_align_combine", "smartclip_equal_spacing", "smartclip_occlusion",
+        "smartclip_face_snap", "smartclip_edge_snap", "smartclip_source_snap",
         "smartclip_runtime_info", "target_collection", "target_scope", "smartclip_enabled",
     )
     for p in props:
         if hasattr(bpy.types.Scene, p):
             delattr(bpy.types.Scene, p)
+    for id_type in (bpy.types.Object, bpy.types.Collection):
+        if hasattr(id_type, "smartclip_override"):
+            delattr(id_type, "smartclip_override")
 
     for cls in reversed(_classes):
         bpy.utils.unregister_class(cls)
@@ -0,0 +1,228 @@
+"""Session-wide caches of extracted geometry.
+
+Cached entries are keyed on a per-datablock geometry generation that a
+depsgraph handler bumps whenever Blender reports a geometry update, so data
+extracted in one Smart Clipping move is reused by the next one but never
+outlives an edit.
+
+Meshes linked from library files can also be kept on disk across sessions
+(``linked_arrays``), keyed on the library file rather than on generations.
+"""
+
+import os
+
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from mathutils.bvhtree import BVHTree
+
+from .core import DiskCache, LRUCache, local_axis_orders
+from .utils import mesh_vertex_coords, mesh_vertex_mask
+
+# Lazily built per-object vertex indices (two-level layout), weighted by
+# point count.  Capacity is refreshed from preferences at every build.
+object_indices = LRUCache(capacity=2_000_000)
+
+# Object-space BVH trees (occlusion tests, face snapping), weighted by
+# polygon count.
+object_bvhs = LRUCache(capacity=4_000_000)
+
+# Evaluated (modifier result) local vertex coordinates, weighted by point
+# count; see ``evaluated_key``.
+evaluated_coords = LRUCache(capacity=4_000_000)
+
+# Vertex subsets (boolean attribute / vertex group masks) per mesh and
+# name, weighted by vertex count; see ``vertex_mask``.
+vertex_masks = LRUCache(capacity=50_000_000)
+
+# Local coordinates and axis orderings of linked library meshes, mapped
+# from disk; ``None`` while the preference is off (see ``configure_disk``).
+disk: "DiskCache | None" = None
+_linked: dict = {}  # library key -> mapped arrays (this session)
+
+_generations: dict = {}  # name_full -> int
+_scene_generation = 0    # bumped by every depsgraph update
+
+
+def geometry_generation(id_data) -> int:
+    """Current geometry generation of an Object or Mesh datablock."""
+    return _generations.get(id_data.name_full, 0)
+
+
+def scene_generation() -> int:
+    """Counter of depsgraph updates of any kind (transforms, visibility, edits)."""
+    return _scene_generation
+
+
+def matrix_fingerprint(matrix) -> tuple:
+    return tuple(round(v, 6) for row in matrix for v in row)
+
+
+def object_key(obj) -> tuple:
+    """Cache key for world-space data extracted from *obj*'s mesh."""
+    mesh = obj.data
+    return (
+        obj.name_full,
+        mesh.name_full,
+        geometry_generation(obj),
+        geometry_generation(mesh),
+        len(mesh.vertices),
+        matrix_fingerprint(obj.matrix_world),
+    )
+
+
+def object_bvh(obj, depsgraph) -> BVHTree:
+    """Object-space ``BVHTree`` of *obj*'s evaluated mesh, built on first use.
+
+    Keyed like the vertex indices (mesh datablock, geometry generations and
+    transform), so it is reused across moves until the object changes.
+    """
+    key = object_key(obj)
+    tree = object_bvhs.get(key)
+    if tree is None:
+        tree = BVHTree.FromObject(obj, depsgraph)
+        object_bvhs.put(key, tree, weight=max(len(obj.data.polygons), 1))
+    return tree
+
+
+def evaluated_key(obj, frame: int) -> tuple:
+    """Cache key for *obj*'s evaluated mesh.
+
+    The depsgraph reports modifier and dependency changes as geometry
+    updates of the object itself; *frame* covers time-dependent modifiers,
+    which change on frame steps without an update.
+    """
+    return (obj.name_full, obj.data.name_full,
+            geometry_generation(obj), geometry_generation(obj.data), frame)
+
+
+def vertex_mask(obj, mesh, name: str, frame: "int | None" = None) -> "np.ndarray | None":
+    """Cached ``utils.mesh_vertex_mask`` of *obj*'s *mesh*.
+
+    *frame* is given for an evaluated mesh, which is keyed like evaluated
+    coordinates.  An original mesh is keyed on the datablock and its
+    geometry generation only, so the mask survives frame changes and is
+    shared by linked duplicates (with the same group index); weight
+    painting or editing the attribute (geometry updates) invalidates it.
+    """
+    group = obj.vertex_groups.get(name)
+    tail = (mesh.name_full, len(mesh.vertices), name, -1 if group is None else group.index)
+    if frame is None:
+        key = (geometry_generation(mesh),) + tail
+    else:
+        key = evaluated_key(obj, frame) + tail
+    mask = vertex_masks.get(key)
+    if mask is None:
+        mask = mesh_vertex_mask(mesh, obj.vertex_groups, name)
+        if mask is None:
+            return None
+        vertex_masks.put(key, mask, weight=max(len(mask), 1))
+    return mask
+
+
+def configure_disk(prefs) -> None:
+    """Point ``disk`` at the preference's directory, or disable it."""
+    global disk
+    if not getattr(prefs, "use_disk_cache", False):
+        disk = None
+        return
+    directory = bpy.path.abspath(getattr(prefs, "disk_cache_dir", "")) \
+        or bpy.utils.user_resource("DATAFILES", path="smartclip_cache")
+    max_bytes = getattr(prefs, "disk_cache_mb", 0) * 1024 * 1024
+    if disk is None or disk.directory != directory:
+        disk = DiskCache(directory, max_bytes)
+        _linked.clear()
+    disk.max_bytes = max_bytes
+
+
+def library_key(mesh) -> "tuple | None":
+    """Disk cache key of a linked *mesh*; ``None`` for local data.
+
+    Library files are not hashed byte by byte (they can be gigabytes); the
+    key holds the file's path, size and modification time plus the mesh
+    name and element counts, so saving the library invalidates its entries.
+    """
+    lib = mesh.library
+    if lib is None or mesh.is_editmode:
+        return None
+    path = os.path.normcase(os.path.abspath(bpy.path.abspath(lib.filepath, library=lib)))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns, mesh.name,
+            len(mesh.vertices), len(mesh.edges), len(mesh.polygons))
+
+
+def linked_arrays(mesh) -> "dict | None":
+    """``coords`` plus ``order_x/y/z`` of a linked *mesh*, from the disk cache.
+
+    Extracted and written on a miss; ``None`` when the disk cache is off or
+    *mesh* is not linked.  Arrays are read-only memory maps.
+    """
+    if disk is None:
+        return None
+    key = library_key(mesh)
+    if key is None:
+        return None
+    arrays = _linked.get(key)
+    if arrays is None:
+        arrays = disk.get(key)
+    if arrays is None or len(arrays.get("coords", ())) != key[4]:
+        coords = mesh_vertex_coords(mesh)
+        arrays = dict(zip(("order_x", "order_y", "order_z"), local_axis_orders(coords)))
+        arrays["coords"] = coords
+        if disk.put(key, arrays):
+            arrays = disk.get(key) or arrays
+    _linked[key] = arrays
+    return arrays
+
+
+def linked_coords(mesh) -> "np.ndarray | None":
+    arrays = linked_arrays(mesh)
+    return None if arrays is None else arrays["coords"]
+
+
+def clear():
+    _linked.clear()
+    object_indices.clear()
+    object_bvhs.clear()
+    evaluated_coords.clear()
+    vertex_masks.clear()
+    _generations.clear()
+
+
+@persistent
+def on_depsgraph_update(_scene, depsgraph):
+    global _scene_generation
+    _scene_generation += 1
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry:
+            continue
+        id_data = getattr(update.id, "original", update.id)
+        if not isinstance(id_data, (bpy.types.Object, bpy.types.Mesh)):
+            continue
+        name = id_data.name_full
+        _generations[name] = _generations.get(name, 0) + 1
+
+
+@persistent
+def on_load_post(*_args):
+    clear()
+
+
+def register():
+    handlers = bpy.app.handlers
+    if on_depsgraph_update not in handlers.depsgraph_update_post:
+        handlers.depsgraph_update_post.append(on_depsgraph_update)
+    if on_load_post not in handlers.load_post:
+        handlers.load_post.append(on_load_post)
+
+
+def unregister():
+    handlers = bpy.app.handlers
+    if on_depsgraph_update in handlers.depsgraph_update_post:
+        handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    if on_load_post in handlers.load_post:
+        handlers.load_post.remove(on_load_post)
+    clear()
@@ -0,0 +1,152 @@
+"""Blender-free snap index and candidate scoring.
+
+Nothing in this package may import ``bpy``, ``bmesh`` or ``bpy_extras`` at
+module level, and nothing may import from the parent add-on package.  That
+keeps the whole query path importable from plain CPython (with NumPy), so it
+can be unit-tested and benchmarked on machines without a Blender install.
+The Blender side (``detector.py``) only extracts arrays and adapts results.
+"""
+
+from .backends import (
+    BACKENDS,
+    GridBackend,
+    KDTreeBackend,
+    LinearBackend,
+    SpatialBackend,
+    StaticTreeBackend,
+    choose_backend,
+    make_backend,
+)
+from .budget import allocate_vertex_budget, iter_nearest
+from .dedup import SharedOwners, coincident_first, format_owners
+from .diskcache import DiskCache, read_arrays, write_arrays
+from .edges import EdgeIndex, edge_midpoints
+from .exclusion import Exclusion
+from .faces import FaceTargets
+from .geometry import (
+    bbox_centers,
+    limit_points,
+    local_axis_orders,
+    transform_corners,
+    transform_points,
+    transformed_axis_orders,
+)
+from .index import (
+    KIND_BOUNDS,
+    KIND_EDGE,
+    KIND_FACE,
+    KIND_MIDPOINT,
+    KIND_NAMES,
+    KIND_POINT,
+    HitSet,
+    SnapIndex,
+    query_constrained_multi,
+    query_range_multi,
+)
+from .jobs import (
+    BuildPool,
+    FlatParts,
+    FlatPlan,
+    assemble_flat_index,
+    plan_flat_merge,
+    transform_parts,
+)
+from .lod import LodIndex, LodLevel
+from .lru import LRUCache
+from .memory import (
+    BOUNDS_POINTS_PER_OBJECT,
+    bytes_per_point,
+    format_breakdown,
+    format_bytes,
+    points_for_memory,
+)
+from .prefetch import IdlePrefetch
+from .projection import ViewProjection
+from .scoring import (
+    CoreCandidate,
+    combine_axis_candidates,
+    score_axis_hits,
+    score_constrained_hits,
+    score_range_hits,
+    score_source_hits,
+    score_spacing_matches,
+)
+from .spacing import SPACING_CENTER, SPACING_EQUAL, GapIndex, SpacingMatch
+from .twolevel import AabbTree, TwoLevelIndex
+from .visibility import VisibilityCache, filter_visible, segment_box_overlap, view_key
+from .watchdog import QUALITY_TIERS, FrameWatchdog, QualityTier
+
+__all__ = [
+    "BACKENDS",
+    "BOUNDS_POINTS_PER_OBJECT",
+    "KIND_BOUNDS",
+    "KIND_EDGE",
+    "KIND_FACE",
+    "KIND_MIDPOINT",
+    "KIND_NAMES",
+    "KIND_POINT",
+    "QUALITY_TIERS",
+    "SPACING_CENTER",
+    "SPACING_EQUAL",
+    "AabbTree",
+    "BuildPool",
+    "CoreCandidate",
+    "DiskCache",
+    "EdgeIndex",
+    "Exclusion",
+    "FlatParts",
+    "FlatPlan",
+    "FrameWatchdog",
+    "FaceTargets",
+    "GapIndex",
+    "GridBackend",
+    "HitSet",
+    "IdlePrefetch",
+    "KDTreeBackend",
+    "LRUCache",
+    "LodIndex",
+    "LodLevel",
+    "LinearBackend",
+    "QualityTier",
+    "SharedOwners",
+    "SnapIndex",
+    "SpacingMatch",
+    "SpatialBackend",
+    "StaticTreeBackend",
+    "TwoLevelIndex",
+    "ViewProjection",
+    "VisibilityCache",
+    "allocate_vertex_budget",
+    "assemble_flat_index",
+    "bbox_centers",
+    "bytes_per_point",
+    "choose_backend",
+    "coincident_first",
+    "combine_axis_candidates",
+    "edge_midpoints",
+    "filter_visible",
+    "format_breakdown",
+    "format_bytes",
+    "format_owners",
+    "iter_nearest",
+    "limit_points",
+    "local_axis_orders",
+    "make_backend",
+    "plan_flat_merge",
+    "points_for_memory",
+    "query_constrained_multi",
+    "query_range_multi",
+    "read_arrays",
+    "score_axis_hits",
+    "score_constrained_hits",
+    "score_range_hits",
+    "score_source_hits",
+    "score_spacing_matches",
+    "segment_box_overlap",
+    "transform_corners",
+    "transform_parts",
+    "transform_points",
+    "transformed_axis_orders",
+    "view_key",
+    "write_arrays",
+]
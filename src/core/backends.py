@@ -0,0 +1,348 @@
+"""Spatial range-query backends used by :class:`~.index.SnapIndex`.
+
+Every backend is built once from a static ``(N, 3)`` point array and answers
+``find_range(center, radius)`` with ``(ids, dist)`` arrays sorted by distance.
+
+Backends
+--------
+KDTREE  -- ``mathutils.kdtree.KDTree``; Blender only, per-point ``insert``.
+GRID    -- uniform spatial-hash grid; best for evenly spread points.
+STATIC  -- packed bounding-box tree over Morton-ordered leaves (NumPy only).
+LINEAR  -- brute-force scan; tiny point sets and last-resort fallback.
+
+``choose_backend`` picks one from the point count and distribution; callers
+may force a specific backend by name.
+"""
+
+import numpy as np
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+_EMPTY_DIST = np.empty(0, dtype=np.float64)
+
+# Heuristic thresholds (see test_core_benchmarks.py for the measurements).
+LINEAR_MAX_POINTS = 512
+KDTREE_MAX_POINTS = 200_000
+GRID_MIN_OCCUPANCY = 0.35
+_GRID_POINTS_PER_CELL = 8
+_SAMPLE_POINTS = 20_000
+
+# Estimated bytes per node of a mathutils KD-Tree (co[3], index, left,
+# right, split axis -- padded).  The tree lives in C and cannot be measured.
+KDTREE_NODE_BYTES = 32
+
+
+def _sorted_result(ids: np.ndarray, dist: np.ndarray):
+    order = np.argsort(dist, kind="stable")
+    return ids[order], dist[order]
+
+
+def _index_array(ids: np.ndarray) -> np.ndarray:
+    """Store permutation arrays as int32 when they fit (halves their size)."""
+    if len(ids) < 2 ** 31:
+        return ids.astype(np.int32)
+    return ids
+
+
+def _gather_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate ``arange(s, s + c)`` for every (start, count) pair."""
+    total = int(counts.sum())
+    if not total:
+        return _EMPTY_IDS
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+class SpatialBackend:
+    """Base class for static point backends.
+
+    ``bytes_per_point`` is the allocator's up-front estimate of the memory a
+    backend adds per indexed point; ``nbytes`` reports what a built instance
+    actually holds (shared input arrays are not counted).
+    """
+
+    name = ""
+    bytes_per_point = 0
+
+    def __init__(self, points: np.ndarray):
+        self.count = len(points)
+
+    def _owned_arrays(self):
+        return ()
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self._owned_arrays()))
+
+    def find_range(self, center, radius: float):
+        """Return ``(ids, dist)`` of points within *radius* of *center*."""
+        raise NotImplementedError
+
+
+class KDTreeBackend(SpatialBackend):
+    """``mathutils.kdtree.KDTree`` (only available inside Blender)."""
+
+    name = "KDTREE"
+    bytes_per_point = KDTREE_NODE_BYTES
+
+    @property
+    def nbytes(self) -> int:
+        return self.count * KDTREE_NODE_BYTES
+
+    def __init__(self, points: np.ndarray):
+        from mathutils import kdtree  # Blender-only; import lazily
+
+        super().__init__(points)
+        tree = kdtree.KDTree(len(points))
+        for i, co in enumerate(points.tolist()):
+            tree.insert(co, i)
+        tree.balance()
+        self._tree = tree
+
+    def find_range(self, center, radius: float):
+        hits = self._tree.find_range(tuple(map(float, center)), radius)
+        if not hits:
+            return _EMPTY_IDS, _EMPTY_DIST
+        n = len(hits)
+        ids = np.fromiter((h[1] for h in hits), dtype=np.int64, count=n)
+        dist = np.fromiter((h[2] for h in hits), dtype=np.float64, count=n)
+        return _sorted_result(ids, dist)
+
+
+class LinearBackend(SpatialBackend):
+    """Brute-force NumPy scan."""
+
+    name = "LINEAR"
+
+    def __init__(self, points: np.ndarray):
+        super().__init__(points)
+        self._points = points
+
+    def find_range(self, center, radius: float):
+        if not self.count:
+            return _EMPTY_IDS, _EMPTY_DIST
+        d2 = ((self._points - np.asarray(center, dtype=np.float64)) ** 2).sum(axis=1)
+        ids = np.flatnonzero(d2 <= radius * radius)
+        return _sorted_result(ids, np.sqrt(d2[ids]))
+
+
+def grid_cell_size(points: np.ndarray, per_cell: int = _GRID_POINTS_PER_CELL) -> float:
+    """Cell edge giving roughly *per_cell* points per cell for uniform data.
+
+    Degenerate (flat) axes are ignored so planar scenes still get cells that
+    scale with their area rather than a zero volume.
+    """
+    if not len(points):
+        return 1.0
+    ext = points.max(axis=0) - points.min(axis=0)
+    span = float(ext.max())
+    if span <= 0.0:
+        return 1.0
+    live = ext[ext > span * 1e-3]
+    measure = float(np.prod(live))
+    return max((measure * per_cell / len(points)) ** (1.0 / len(live)), span * 1e-6)
+
+
+class GridBackend(SpatialBackend):
+    """Uniform spatial-hash grid: points bucketed by integer cell coordinate.
+
+    Points are sorted by linearised cell key so each occupied cell is a
+    contiguous slice.  A query enumerates the cells overlapping the query box,
+    or scans the occupied-cell list when that is cheaper (huge radii).
+    """
+
+    name = "GRID"
+    bytes_per_point = 16  # int32 order + occupied-cell arrays (~1 cell / 4 points)
+
+    def __init__(self, points: np.ndarray, cell_size: "float | None" = None):
+        super().__init__(points)
+        self._points = points
+        self.cell_size = float(cell_size or grid_cell_size(points))
+        if not self.count:
+            return
+        self._origin = points.min(axis=0)
+        ijk = np.floor((points - self._origin) / self.cell_size).astype(np.int64)
+        self._dims = ijk.max(axis=0) + 1
+        keys = self._linear(ijk)
+        self._order = _index_array(np.argsort(keys, kind="stable"))
+        sorted_keys = keys[self._order]
+        self._cell_keys, self._cell_starts, self._cell_counts = np.unique(
+            sorted_keys, return_index=True, return_counts=True,
+        )
+        self._cell_ijk = np.stack(np.unravel_index(self._cell_keys, self._dims), axis=1)
+
+    def _owned_arrays(self):
+        if not self.count:
+            return ()
+        return (self._order, self._cell_keys, self._cell_starts, self._cell_counts, self._cell_ijk)
+
+    def _linear(self, ijk: np.ndarray) -> np.ndarray:
+        return (ijk[..., 0] * self._dims[1] + ijk[..., 1]) * self._dims[2] + ijk[..., 2]
+
+    def find_range(self, center, radius: float):
+        if not self.count:
+            return _EMPTY_IDS, _EMPTY_DIST
+        c = np.asarray(center, dtype=np.float64)
+        lo = np.floor((c - radius - self._origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((c + radius - self._origin) / self.cell_size).astype(np.int64)
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, self._dims - 1)
+        if np.any(hi < lo):
+            return _EMPTY_IDS, _EMPTY_DIST
+
+        box_cells = int(np.prod(hi - lo + 1))
+        if box_cells <= len(self._cell_keys):
+            axes = [np.arange(lo[a], hi[a] + 1) for a in range(3)]
+            grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+            keys = self._linear(grid)
+            slot = np.searchsorted(self._cell_keys, keys)
+            valid = slot < len(self._cell_keys)
+            slot, keys = slot[valid], keys[valid]
+            cells = slot[self._cell_keys[slot] == keys]
+        else:
+            inside = np.all((self._cell_ijk >= lo) & (self._cell_ijk <= hi), axis=1)
+            cells = np.flatnonzero(inside)
+        if not len(cells):
+            return _EMPTY_IDS, _EMPTY_DIST
+
+        ids = self._order[_gather_ranges(self._cell_starts[cells], self._cell_counts[cells])]
+        d2 = ((self._points[ids] - c) ** 2).sum(axis=1)
+        keep = d2 <= radius * radius
+        return _sorted_result(ids[keep], np.sqrt(d2[keep]))
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert two zero bits between each of the low 21 bits of *v*."""
+    v = v.astype(np.uint64) & np.uint64(0x1FFFFF)
+    v = (v | (v << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return v
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    """63-bit Morton (Z-order) codes of *points* within their bounding box."""
+    lo = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - lo, 1e-12)
+    q = ((points - lo) / span * 0x1FFFFF).astype(np.uint64)
+    return (_spread_bits(q[:, 0])
+            | (_spread_bits(q[:, 1]) << np.uint64(1))
+            | (_spread_bits(q[:, 2]) << np.uint64(2)))
+
+
+class StaticTreeBackend(SpatialBackend):
+    """Packed bounding-box tree (NumPy only).
+
+    Points are sorted along a Morton curve and cut into fixed-size leaves;
+    parent boxes are built bottom-up with *fanout* children each.  Queries
+    walk the levels top-down, testing all surviving children of a level in a
+    single vectorised sphere/box test.
+    """
+
+    name = "STATIC"
+    bytes_per_point = 20  # int32 order + Morton-sorted float32 copy + boxes
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 32, fanout: int = 16):
+        super().__init__(points)
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self._levels = []  # top-down list of (box_min, box_max)
+        if not self.count:
+            return
+        self._order = _index_array(np.argsort(morton_codes(points), kind="stable"))
+        self._sorted = points[self._order]
+
+        starts = np.arange(0, self.count, leaf_size)
+        box_min = np.minimum.reduceat(self._sorted, starts, axis=0)
+        box_max = np.maximum.reduceat(self._sorted, starts, axis=0)
+        levels = [(box_min, box_max)]
+        while len(box_min) > 1:
+            starts = np.arange(0, len(box_min), fanout)
+            box_min = np.minimum.reduceat(box_min, starts, axis=0)
+            box_max = np.maximum.reduceat(box_max, starts, axis=0)
+            levels.append((box_min, box_max))
+        self._levels = levels[::-1]
+
+    def _owned_arrays(self):
+        if not self.count:
+            return ()
+        boxes = [a for level in self._levels for a in level]
+        return (self._order, self._sorted, *boxes)
+
+    def find_range(self, center, radius: float):
+        if not self.count:
+            return _EMPTY_IDS, _EMPTY_DIST
+        c = np.asarray(center, dtype=np.float64)
+        r2 = radius * radius
+        nodes = np.zeros(1, dtype=np.int64)
+        for depth, (box_min, box_max) in enumerate(self._levels):
+            if depth:
+                nodes = (nodes[:, None] * self.fanout + np.arange(self.fanout)).ravel()
+                nodes = nodes[nodes < len(box_min)]
+            nearest = np.clip(c, box_min[nodes], box_max[nodes])
+            nodes = nodes[((nearest - c) ** 2).sum(axis=1) <= r2]
+            if not len(nodes):
+                return _EMPTY_IDS, _EMPTY_DIST
+
+        starts = nodes * self.leaf_size
+        counts = np.minimum(starts + self.leaf_size, self.count) - starts
+        slots = _gather_ranges(starts, counts)
+        d2 = ((self._sorted[slots] - c) ** 2).sum(axis=1)
+        keep = d2 <= r2
+        return _sorted_result(self._order[slots[keep]], np.sqrt(d2[keep]))
+
+
+BACKENDS = {
+    KDTreeBackend.name: KDTreeBackend,
+    GridBackend.name: GridBackend,
+    StaticTreeBackend.name: StaticTreeBackend,
+    LinearBackend.name: LinearBackend,
+}
+
+
+def kdtree_available() -> bool:
+    try:
+        from mathutils import kdtree  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def grid_occupancy(points: np.ndarray) -> float:
+    """Fraction of grid cells (at the GRID backend's density) that hold points.
+
+    Close to 1 for evenly spread points, small for clustered scenes.  A
+    strided sample keeps this cheap on large inputs.
+    """
+    if len(points) > _SAMPLE_POINTS:
+        points = points[:: len(points) // _SAMPLE_POINTS]
+    h = grid_cell_size(points)
+    ijk = np.floor((points - points.min(axis=0)) / h).astype(np.int64)
+    dims = ijk.max(axis=0) + 1
+    occupied = len(np.unique((ijk[:, 0] * dims[1] + ijk[:, 1]) * dims[2] + ijk[:, 2]))
+    return occupied / float(np.prod(dims))
+
+
+def choose_backend(points: np.ndarray) -> str:
+    """Pick a backend name from the point count and distribution."""
+    n = len(points)
+    if n <= LINEAR_MAX_POINTS:
+        return LinearBackend.name
+    if grid_occupancy(points) >= GRID_MIN_OCCUPANCY:
+        return GridBackend.name
+    if n <= KDTREE_MAX_POINTS and kdtree_available():
+        return KDTreeBackend.name
+    return StaticTreeBackend.name
+
+
+def make_backend(points: np.ndarray, name: str = "AUTO") -> SpatialBackend:
+    """Build the backend *name* (``"AUTO"`` = :func:`choose_backend`).
+
+    A forced ``KDTREE`` outside Blender falls back to the automatic choice.
+    """
+    if name == KDTreeBackend.name and not kdtree_available():
+        name = "AUTO"
+    if name not in BACKENDS:
+        name = choose_backend(points)
+    return BACKENDS[name](points)
@@ -0,0 +1,84 @@
+"""Distance-ordered vertex budget allocation over scope objects."""
+
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def iter_nearest(d2: np.ndarray, first_chunk: int = 256) -> Iterator[np.ndarray]:
+    """Yield object ids in ascending *d2* order, a growing chunk at a time.
+
+    Each chunk is selected with ``np.partition`` from the not-yet-yielded ids
+    and only the chunk itself is sorted, so a consumer that stops early never
+    pays for a full sort.  Chunk sizes double, bounding the total work to
+    O(n log n) even when everything is consumed.  Ties keep input order.
+    """
+    remaining = np.arange(len(d2))
+    chunk = max(1, first_chunk)
+    while len(remaining):
+        dr = d2[remaining]
+        if len(remaining) > chunk:
+            kth = np.partition(dr, chunk - 1)[chunk - 1]
+            in_head = dr <= kth
+        else:
+            in_head = np.ones(len(remaining), dtype=bool)
+        head = remaining[in_head]
+        yield head[np.argsort(d2[head], kind="stable")]
+        remaining = remaining[~in_head]
+        chunk *= 2
+
+
+def allocate_vertex_budget(d2: np.ndarray, counts: np.ndarray, budget: int,
+                           always_full: Optional[np.ndarray] = None,
+                           bounds_only: Optional[np.ndarray] = None,
+                           priority: Optional[np.ndarray] = None,
+                           ) -> Tuple[List[int], np.ndarray]:
+    """Greedy nearest-first split into full-vertex and bounds-only objects.
+
+    Walking objects by ascending *d2*, an object gets full vertices when its
+    vertex count still fits in the remaining *budget*.  The walk stops as
+    soon as nothing left could fit; every unvisited object is bounds-only.
+
+    Per-object overrides (boolean masks / weights, all optional): objects
+    in *always_full* get full vertices first, whatever their distance, and
+    their vertices count against *budget* (which may run out on them alone);
+    objects in *bounds_only* never do.  A *priority* weight ``w`` makes an
+    object compete as if it were ``w`` times nearer.
+
+    Returns ``(full_ids, bounds_ids)``: full ids in distance order (forced
+    ones first), bounds ids as an array (forced and visited misfits first).
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    d2 = np.asarray(d2, dtype=np.float64)
+    if priority is not None:
+        d2 = d2 / np.square(np.maximum(np.asarray(priority, dtype=np.float64), 1e-6))
+    full: List[int] = []
+    misfits: List[int] = []
+    left = int(budget)
+    visited = np.zeros(len(counts), dtype=bool)
+    if bounds_only is not None:
+        forced = np.flatnonzero(bounds_only)
+        misfits += forced.tolist()
+        visited[forced] = True
+    if always_full is not None:
+        forced = np.flatnonzero(np.asarray(always_full, dtype=bool) & ~visited)
+        forced = forced[np.argsort(d2[forced], kind="stable")]
+        full += forced.tolist()
+        left = max(left - int(counts[forced].sum()), 0)
+        visited[forced] = True
+    for chunk in iter_nearest(d2):
+        chunk = chunk[~visited[chunk]]
+        unvisited = ~visited
+        if not unvisited.any() or counts[unvisited].min() > left:
+            break
+        for i in chunk.tolist():
+            c = int(counts[i])
+            if c <= left:
+                full.append(i)
+                left -= c
+            else:
+                misfits.append(i)
+        visited[chunk] = True
+    rest = np.flatnonzero(~visited)
+    bounds = np.concatenate((np.asarray(misfits, dtype=np.int64), rest))
+    return full, bounds
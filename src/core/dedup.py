@@ -0,0 +1,78 @@
+"""Merging coincident points at build time.
+
+Modular kit pieces meet at seams where every vertex exists once per piece,
+and split normals duplicate vertices within one mesh.  Each copy would be
+its own index point -- in the tree, the axis orderings and the hit lists.
+Points are hashed by the grid cell (edge *epsilon*) they fall in; the first
+point of a cell stays and the rest are dropped, their owners recorded in a
+:class:`SharedOwners` table on the survivor.  Hashing is by cell, so two
+points closer than *epsilon* across a cell face stay separate; that only
+costs a duplicate, never a wrong snap position.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def coincident_first(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """For every point, the index of the first point in its *epsilon* cell."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(pts):
+        return np.empty(0, dtype=np.int64)
+    keys = np.floor(pts / epsilon).astype(np.int64)
+    keys -= keys.min(axis=0)
+    span = keys.max(axis=0) + 1
+    if float(span[0]) * float(span[1]) * float(span[2]) < 2.0 ** 62:
+        flat = (keys[:, 0] * span[1] + keys[:, 1]) * span[2] + keys[:, 2]
+        _, first, inverse = np.unique(flat, return_index=True, return_inverse=True)
+    else:  # cells do not fit one int64 code
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return first[inverse.reshape(-1)]
+
+
+@dataclass
+class SharedOwners:
+    """Extra owners of merged points, as a compressed sparse table.
+
+    *ids* are the (sorted) point ids that stand for more than one owner;
+    ``owners[indptr[k]:indptr[k + 1]]`` are the owners of ``ids[k]`` other
+    than its own ``SnapIndex.owners`` entry.
+    """
+    ids: np.ndarray
+    indptr: np.ndarray
+    owners: np.ndarray
+
+    @classmethod
+    def from_pairs(cls, point_ids, owners) -> "SharedOwners":
+        """Table of the unique ``(point id, owner)`` pairs."""
+        point_ids = np.asarray(point_ids, dtype=np.int64)
+        owners = np.asarray(owners, dtype=np.int64)
+        if len(point_ids):
+            pairs = np.unique(np.stack((point_ids, owners), axis=1), axis=0)
+            point_ids, owners = pairs[:, 0], pairs[:, 1]
+        ids, counts = np.unique(point_ids, return_counts=True)
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(ids=ids.astype(np.int32), indptr=indptr, owners=owners.astype(np.int32))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.indptr.nbytes + self.owners.nbytes
+
+    def of(self, point_id: int) -> np.ndarray:
+        """Extra owners of *point_id* (empty if it was never merged)."""
+        k = int(np.searchsorted(self.ids, point_id))
+        if k == len(self.ids) or self.ids[k] != point_id:
+            return self.owners[:0]
+        return self.owners[self.indptr[k]:self.indptr[k + 1]]
+
+
+def format_owners(names, shown: int = 2) -> str:
+    """``"Cube, Cube.001 +2"``: the first *shown* owner names, then how many more."""
+    names = list(names)
+    label = ", ".join(names[:shown])
+    return f"{label} +{len(names) - shown}" if len(names) > shown else label
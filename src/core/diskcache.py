@@ -0,0 +1,147 @@
+"""On-disk cache of extracted arrays, memory-mapped on load.
+
+One file per entry: an 8-byte magic, a little-endian ``uint32`` header
+length, a JSON header ``{name: [dtype, shape, offset]}`` and the raw arrays,
+each starting on a 64-byte boundary.  Loading maps the file read-only and
+returns ``np.memmap`` views, so nothing is read until a page is touched.
+Files are written to a temporary name and renamed into place, so readers
+never see a half-written entry; damaged or foreign files read as misses.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+MAGIC = b"SCLPIDX1"
+ALIGN = 64
+SUFFIX = ".scidx"
+
+
+def _aligned(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def write_arrays(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """Write *arrays* to *path* in the flat mappable format (atomically)."""
+    header, offset = {}, 0
+    blobs = []
+    for name, value in arrays.items():
+        arr = np.ascontiguousarray(value)
+        header[name] = [arr.dtype.str, list(arr.shape), offset]
+        blobs.append((offset, arr))
+        offset = _aligned(offset + arr.nbytes)
+    text = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    base = _aligned(len(MAGIC) + 4 + len(text))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(text)) + text)
+        for start, arr in blobs:
+            f.seek(base + start)
+            f.write(arr.tobytes())
+        f.truncate(base + offset)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        os.remove(tmp)  # e.g. the old file is still mapped (Windows)
+        raise
+
+
+def read_arrays(path: str) -> Optional[Dict[str, np.ndarray]]:
+    """Map the arrays stored at *path*; ``None`` if missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(MAGIC) + 4)
+            if len(head) < len(MAGIC) + 4 or head[:len(MAGIC)] != MAGIC:
+                return None
+            (size,) = struct.unpack("<I", head[len(MAGIC):])
+            header = json.loads(f.read(size).decode("utf-8"))
+        base = _aligned(len(MAGIC) + 4 + size)
+        total = os.path.getsize(path)
+        out = {}
+        for name, (dtype, shape, offset) in header.items():
+            dt = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            if base + offset + count * dt.itemsize > total:
+                return None
+            if count == 0:
+                out[name] = np.empty(shape, dtype=dt)
+            else:
+                out[name] = np.memmap(path, dtype=dt, mode="r", offset=base + offset,
+                                      shape=tuple(shape))
+        return out
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class DiskCache:
+    """Directory of mapped array files, keyed by any ``repr``-stable key.
+
+    Keys are hashed into file names, so they may hold paths and names of
+    any length.  After each ``put``, the least recently written files are
+    removed until the directory holds at most *max_bytes* (0 = unbounded).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 0):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+
+    def path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + SUFFIX)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, np.ndarray]]:
+        return read_arrays(self.path(key))
+
+    def put(self, key: Hashable, arrays: Dict[str, np.ndarray]) -> bool:
+        """Store *arrays* under *key*; ``False`` if the directory is not writable."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_arrays(self.path(key), arrays)
+        except OSError:
+            return False
+        if self.max_bytes > 0:
+            self.prune(self.max_bytes)
+        return True
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        out = []
+        for name in names:
+            if name.endswith(SUFFIX):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                out.append((st.st_mtime_ns, st.st_size, name))
+        return sorted(out)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(size for _t, size, _n in self._entries())
+
+    def prune(self, max_bytes: int) -> None:
+        """Remove the oldest entries until at most *max_bytes* remain."""
+        entries = self._entries()
+        total = sum(size for _t, size, _n in entries)
+        for _t, size, name in entries[:-1]:  # the newest entry always stays
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self) -> None:
+        for _t, _s, name in self._entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
@@ -0,0 +1,98 @@
+"""Edge snap targets: closest points on mesh edges.
+
+Edges are kept as ``(m, 2)`` int32 vertex ids into the snap index's own
+float32 point array, so an edge costs 8 bytes plus its box in the
+:class:`~.twolevel.AabbTree` that finds the edges near a query.  Edge
+midpoints are plain points in the snap index (``KIND_MIDPOINT``); see
+:func:`edge_midpoints`.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .index import KIND_EDGE, HitSet
+from .twolevel import AabbTree
+
+# Points are float32: a midpoint stored in the index is off its edge by up
+# to a few float32 steps of its coordinates, however small the edge.
+_FLOAT32_STEPS = 8 * float(np.finfo(np.float32).eps)
+
+
+def edge_midpoints(points, edges) -> np.ndarray:
+    """Midpoints of the ``(m, 2)`` vertex-id *edges* over ``(n, 3)`` *points*."""
+    pts = np.asarray(points)
+    e = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    return (pts[e[:, 0]].astype(np.float64) + pts[e[:, 1]]) * 0.5
+
+
+class EdgeIndex:
+    """Segments between index points, queried by distance to the segment.
+
+    *points* is shared with the snap index (not copied); *edges* are row
+    ids into it and *owners* the owner of each edge.  Edges of moving
+    geometry are simply left out by the caller.
+    """
+
+    def __init__(self, points: np.ndarray, edges, owners, owner_names: Sequence[str]):
+        self.points = points
+        id_type = np.int32 if len(points) < 2 ** 31 else np.int64
+        self.edges = np.asarray(edges, dtype=id_type).reshape(-1, 2)
+        self.owners = np.asarray(owners, dtype=np.int32).reshape(len(self.edges))
+        self.owner_names = list(owner_names)
+        a, b = self.points[self.edges[:, 0]], self.points[self.edges[:, 1]]
+        self.tree = AabbTree(np.minimum(a, b), np.maximum(a, b))
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    @property
+    def nbytes(self) -> int:
+        tree = self.tree
+        extra = 0
+        if tree.count:
+            extra = tree._order.nbytes + tree._min.nbytes + tree._max.nbytes
+            extra += sum(lo.nbytes + hi.nbytes for lo, hi in tree._levels)
+        return self.edges.nbytes + self.owners.nbytes + extra
+
+    def memory_breakdown(self) -> Dict[str, int]:
+        return {"edges": self.nbytes}
+
+    def query_range(self, center, radius: float) -> HitSet:
+        """Closest point of every edge within *radius* of *center*, nearest first.
+
+        ``segment`` holds each hit's edge end points.
+        """
+        c = np.asarray(center, dtype=np.float64).reshape(3)
+        ids = self.tree.query_sphere(c, radius)
+        a = self.points[self.edges[ids, 0]].astype(np.float64)
+        b = self.points[self.edges[ids, 1]].astype(np.float64)
+        ab = b - a
+        length2 = (ab ** 2).sum(axis=1)
+        t = np.clip(((c - a) * ab).sum(axis=1) / np.where(length2 > 0.0, length2, 1.0), 0.0, 1.0)
+        co = a + ab * t[:, None]
+        dist = np.sqrt(((co - c) ** 2).sum(axis=1))
+        keep = np.flatnonzero(dist <= radius)
+        keep = keep[np.argsort(dist[keep], kind="stable")]
+        return HitSet(
+            co=co[keep], dist=dist[keep],
+            kind=np.full(len(keep), KIND_EDGE, dtype=np.uint8),
+            owner=self.owners[ids[keep]], owner_names=self.owner_names,
+            segment=np.stack((a[keep], b[keep]), axis=1),
+        )
+
+    def edge_through(self, point, tolerance: Optional[float] = None) -> "tuple | None":
+        """End points of an edge passing within *tolerance* of *point*.
+
+        By default the tolerance grows with *point*'s largest coordinate
+        (:data:`_FLOAT32_STEPS` of it, at least 1e-5), so stored midpoints
+        far from the origin still find their edge.
+        """
+        c = np.asarray(point, dtype=np.float64).reshape(3)
+        if tolerance is None:
+            tolerance = max(1e-5, _FLOAT32_STEPS * float(np.abs(c).max()))
+        hits = self.query_range(c, tolerance)
+        if not len(hits):
+            return None
+        a, b = hits.segment[0]
+        return tuple(a.tolist()), tuple(b.tolist())
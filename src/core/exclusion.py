@@ -0,0 +1,81 @@
+"""Compact exclusion of index points: whole-object ranges plus sparse bitmaps.
+
+Points of one object are contiguous in a flat index, so excluding an object
+(Object Mode: everything being moved) is a single ``[start, stop)`` range.
+Edit Mode selections exclude only some vertices of an object; those are kept
+as a packed bitmap over that object's slice (1 bit per vertex) instead of a
+boolean mask over the whole index.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+class Exclusion:
+    """Index ranges and per-slice bitmaps tested against query ids in bulk."""
+
+    def __init__(self):
+        self._starts = np.empty(0, dtype=np.int64)
+        self._stops = np.empty(0, dtype=np.int64)
+        self._bitmaps: List[Tuple[int, int, np.ndarray]] = []  # (offset, count, packed)
+
+    def __bool__(self) -> bool:
+        return bool(len(self._starts) or self._bitmaps)
+
+    @classmethod
+    def from_mask(cls, mask) -> "Exclusion":
+        """Build from a boolean mask (runs become ranges)."""
+        ex = cls()
+        m = np.asarray(mask, dtype=bool).ravel()
+        if m.any():
+            edges = np.flatnonzero(np.diff(np.concatenate(([False], m, [False])).astype(np.int8)))
+            ex._starts = edges[0::2].astype(np.int64)
+            ex._stops = edges[1::2].astype(np.int64)
+        return ex
+
+    def add_range(self, start: int, stop: int) -> None:
+        """Exclude ids ``start <= id < stop``."""
+        self.add_ranges([start], [stop])
+
+    def add_ranges(self, starts, stops) -> None:
+        """Exclude several ``[start, stop)`` ranges (must not overlap) at once."""
+        starts = np.asarray(starts, dtype=np.int64).ravel()
+        stops = np.asarray(stops, dtype=np.int64).ravel()
+        keep = stops > starts
+        if not keep.any():
+            return
+        starts = np.concatenate((self._starts, starts[keep]))
+        stops = np.concatenate((self._stops, stops[keep]))
+        order = np.argsort(starts, kind="stable")
+        self._starts, self._stops = starts[order], stops[order]
+
+    def add_selection(self, offset: int, count: int, indices) -> None:
+        """Exclude ``offset + i`` for each *i* in *indices* (``0 <= i < count``)."""
+        sel = np.asarray(indices, dtype=np.int64).ravel()
+        sel = sel[(sel >= 0) & (sel < count)]
+        if not len(sel):
+            return
+        bits = np.zeros(count, dtype=bool)
+        bits[sel] = True
+        self._bitmaps.append((int(offset), int(count), np.packbits(bits)))
+
+    def mask(self, ids: np.ndarray) -> np.ndarray:
+        """Boolean array: which of *ids* are excluded."""
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.zeros(ids.shape, dtype=bool)
+        if len(self._starts):
+            j = np.searchsorted(self._starts, ids, side="right") - 1
+            inside = j >= 0
+            out[inside] = ids[inside] < self._stops[j[inside]]
+        for offset, count, packed in self._bitmaps:
+            local = ids - offset
+            inside = (local >= 0) & (local < count)
+            loc = local[inside]
+            out[inside] |= ((packed[loc >> 3] >> (7 - (loc & 7))) & 1).astype(bool)
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return (self._starts.nbytes + self._stops.nbytes
+                + sum(packed.nbytes for _o, _c, packed in self._bitmaps))
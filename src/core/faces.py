@@ -0,0 +1,63 @@
+"""Face snap targets: the nearest surface point of each object near a query.
+
+Surface points are not stored.  An :class:`~.twolevel.AabbTree` over the
+scope objects' world boxes picks the objects a query sphere reaches, and a
+caller-supplied ``nearest`` callback (a ``BVHTree.find_nearest`` on the
+Blender side) returns each one's closest point.  Results come back as a
+:class:`~.index.HitSet` of ``KIND_FACE`` hits, so they are scored together
+with vertex hits.
+"""
+
+from typing import Callable, Sequence
+
+import numpy as np
+
+from .index import KIND_FACE, HitSet
+from .twolevel import AabbTree
+
+
+class FaceTargets:
+    """Per-object nearest-surface queries behind an object box tree.
+
+    *corners* are the ``(n, 8, 3)`` world bounding-box corners of the
+    objects named in *owner_names*.  ``nearest(i, center, radius)`` returns
+    ``(point, distance)`` for object *i*, or ``None`` when its surface is
+    further than *radius*.  Objects in *excluded_objects* are never queried.
+    """
+
+    def __init__(self, corners, owner_names: Sequence[str],
+                 nearest: Callable[[int, np.ndarray, float], "tuple | None"],
+                 excluded_objects: Sequence[int] = ()):
+        corners = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3)
+        self.owner_names = list(owner_names)
+        self.tree = AabbTree(corners.min(axis=1), corners.max(axis=1))
+        self._nearest = nearest
+        self._skip = np.zeros(len(self.owner_names), dtype=bool)
+        self._skip[list(excluded_objects)] = True
+
+    def __len__(self) -> int:
+        return int((~self._skip).sum())
+
+    def query_range(self, center, radius: float) -> HitSet:
+        """Closest surface point of every object within *radius*, nearest first."""
+        c = np.asarray(center, dtype=np.float64).reshape(3)
+        ids = self.tree.query_sphere(c, radius)
+        co, dist, owner = [], [], []
+        for i in ids[~self._skip[ids]].tolist():
+            found = self._nearest(i, c, radius)
+            if found is None or found[1] > radius:
+                continue
+            co.append(found[0])
+            dist.append(found[1])
+            owner.append(i)
+        if not co:
+            return HitSet.concat([], self.owner_names)
+        dist = np.asarray(dist, dtype=np.float64)
+        order = np.argsort(dist, kind="stable")
+        return HitSet(
+            co=np.asarray(co, dtype=np.float64).reshape(-1, 3)[order],
+            dist=dist[order],
+            kind=np.full(len(order), KIND_FACE, dtype=np.uint8),
+            owner=np.asarray(owner, dtype=np.int32)[order],
+            owner_names=self.owner_names,
+        )
@@ -0,0 +1,60 @@
+"""Small array helpers shared by the index builders."""
+
+import numpy as np
+
+
+def as_points(points) -> np.ndarray:
+    """Return *points* as a contiguous ``(N, 3)`` float64 array."""
+    return np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+
+
+def transform_points(points, matrix) -> np.ndarray:
+    """Apply a 4x4 affine *matrix* (row-major, Blender layout) to ``(N, 3)`` points."""
+    m = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return pts @ m[:3, :3].T + m[:3, 3]
+
+
+def transform_corners(corners, matrices) -> np.ndarray:
+    """Transform per-object ``(n, 8, 3)`` corners by ``(n, 4, 4)`` matrices."""
+    c = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3)
+    m = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    return np.einsum("nij,nkj->nki", m[:, :3, :3], c) + m[:, None, :3, 3]
+
+
+def local_axis_orders(points) -> tuple:
+    """Stable per-axis argsorts of ``(N, 3)`` *points* (int32 where possible)."""
+    pts = np.asarray(points).reshape(-1, 3)
+    id_type = np.int32 if len(pts) < 2 ** 31 else np.int64
+    return tuple(np.argsort(pts[:, axis], kind="stable").astype(id_type) for axis in range(3))
+
+
+def transformed_axis_orders(orders, matrix) -> "tuple | None":
+    """World per-axis orderings from local *orders*, if *matrix* allows it.
+
+    Only scale and translation keep each world axis a function of the same
+    local axis (a negative scale reverses the order); ``None`` otherwise.
+    """
+    m = np.asarray(matrix, dtype=np.float64).reshape(4, 4)[:3, :3]
+    diag = np.diag(m)
+    if np.any(m - np.diag(diag)) or not np.all(diag):
+        return None
+    return tuple(o if diag[axis] > 0.0 else o[::-1] for axis, o in enumerate(orders))
+
+
+def bbox_centers(corners, matrices) -> np.ndarray:
+    """World-space centres of per-object local ``(n, 8, 3)`` bounding boxes."""
+    c = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3).mean(axis=1)
+    m = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    return np.einsum("nij,nj->ni", m[:, :3, :3], c) + m[:, :3, 3]
+
+
+def limit_points(points, cap: int) -> np.ndarray:
+    """At most *cap* rows of *points*: the per-axis extremes, then an even stride."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(pts) <= cap:
+        return pts
+    extremes = np.unique(np.concatenate((pts.argmin(axis=0), pts.argmax(axis=0))))[:cap]
+    rest = np.setdiff1d(np.arange(len(pts)), extremes)
+    fill = rest[np.linspace(0, len(rest) - 1, cap - len(extremes)).astype(np.int64)]
+    return pts[np.sort(np.concatenate((extremes, fill)))]
@@ -0,0 +1,292 @@
+"""Flat snap index: point arrays, per-axis orderings and a spatial backend."""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .backends import SpatialBackend, _index_array, make_backend
+from .exclusion import Exclusion
+
+KIND_POINT = 0
+KIND_BOUNDS = 1
+KIND_FACE = 2      # nearest surface point (never stored in an index)
+KIND_MIDPOINT = 3  # edge midpoint, stored next to the vertices
+KIND_EDGE = 4      # closest point on an edge (EdgeIndex)
+KIND_NAMES = ("POINT", "BOUNDS", "FACE", "MIDPOINT", "EDGE")
+
+
+@dataclass
+class HitSet:
+    """Points returned by an index query, as parallel arrays."""
+    co: np.ndarray         # (k, 3) world-space positions
+    dist: np.ndarray       # (k,)   distance to the query (world units)
+    kind: np.ndarray       # (k,)   KIND_* codes
+    owner: np.ndarray      # (k,)   indices into owner_names
+    owner_names: Sequence[str]
+    source: Optional[np.ndarray] = None  # (k,) query point per hit (multi-point queries)
+    segment: Optional[np.ndarray] = None  # (k, 2, 3) edge end points (edge queries)
+    point: Optional[np.ndarray] = None    # (k,) SnapIndex point ids (flat index queries)
+
+    def __len__(self) -> int:
+        return len(self.dist)
+
+    @staticmethod
+    def concat(parts: "list[HitSet]", owner_names: Sequence[str]) -> "HitSet":
+        """Join *parts* (already remapped to *owner_names*) into one set."""
+        if not parts:
+            return HitSet(
+                co=np.empty((0, 3)), dist=np.empty(0), kind=np.empty(0, dtype=np.uint8),
+                owner=np.empty(0, dtype=np.int32), owner_names=owner_names,
+            )
+        with_source = all(p.source is not None for p in parts)
+        with_segment = all(p.segment is not None for p in parts)
+        with_point = all(p.point is not None for p in parts)
+        return HitSet(
+            co=np.concatenate([p.co for p in parts]),
+            dist=np.concatenate([p.dist for p in parts]),
+            kind=np.concatenate([p.kind for p in parts]),
+            owner=np.concatenate([p.owner for p in parts]),
+            owner_names=owner_names,
+            source=np.concatenate([p.source for p in parts]) if with_source else None,
+            segment=np.concatenate([p.segment for p in parts]) if with_segment else None,
+            point=np.concatenate([p.point for p in parts]) if with_point else None,
+        )
+
+    def take(self, order: np.ndarray) -> "HitSet":
+        """Subset / reorder by an index array."""
+        return HitSet(
+            co=self.co[order], dist=self.dist[order], kind=self.kind[order],
+            owner=self.owner[order], owner_names=self.owner_names,
+            source=None if self.source is None else self.source[order],
+            segment=None if self.segment is None else self.segment[order],
+            point=None if self.point is None else self.point[order],
+        )
+
+
+def query_range_multi(index, sources, radius: float, max_spread: float = 2.0) -> HitSet:
+    """(source, point) pairs closer than *radius*, for several query points.
+
+    *index* is anything with ``query_range``.  When the sources are clustered
+    (spread within ``max_spread * radius`` of their centroid) a single range
+    query around the centroid gathers every possible point and the pairs are
+    resolved with one broadcast distance matrix; otherwise each source gets
+    its own query.  ``hits.source`` holds the source row, ``hits.dist`` the
+    source-to-point distance; pairs are sorted by that distance.
+    """
+    src = np.asarray(sources, dtype=np.float64).reshape(-1, 3)
+    if not len(src):
+        return HitSet.concat([], index.owner_names)
+    center = src.mean(axis=0)
+    spread = float(np.sqrt(((src - center) ** 2).sum(axis=1).max()))
+    if spread <= max_spread * radius:
+        near = index.query_range(center, radius + spread)
+        d = np.sqrt(((near.co[:, None, :] - src[None, :, :]) ** 2).sum(axis=2))
+        hit, which = np.nonzero(d <= radius)
+        pairs = HitSet(
+            co=near.co[hit], dist=d[hit, which], kind=near.kind[hit], owner=near.owner[hit],
+            owner_names=near.owner_names, source=which.astype(np.int32),
+            point=None if near.point is None else near.point[hit],
+        )
+    else:
+        parts = []
+        for j, s in enumerate(src):
+            h = index.query_range(s, radius)
+            h.source = np.full(len(h), j, dtype=np.int32)
+            parts.append(h)
+        pairs = HitSet.concat(parts, index.owner_names)
+    return pairs.take(np.argsort(pairs.dist, kind="stable"))
+
+
+def query_constrained_multi(index, sources, free_axes, radius: float,
+                            reach: float) -> HitSet:
+    """(source, point) pairs near the line or plane each source moves along.
+
+    *free_axes* are one axis (a line: ``query_line``) or two (a plane:
+    ``query_slab`` around the locked axis); *radius* is the distance allowed
+    from the constraint and *reach* the extent along it.  ``hits.source``
+    holds the source row and ``hits.dist`` the distance to its constraint;
+    pairs are sorted by that distance.
+    """
+    src = np.asarray(sources, dtype=np.float64).reshape(-1, 3)
+    free = list(free_axes)
+    parts = []
+    for j, s in enumerate(src):
+        if len(free) == 1:
+            h = index.query_line(s, free[0], radius, reach)
+        else:
+            h = index.query_slab(s, 3 - sum(free), radius, reach)
+        h.source = np.full(len(h), j, dtype=np.int32)
+        parts.append(h)
+    pairs = HitSet.concat(parts, index.owner_names)
+    return pairs.take(np.argsort(pairs.dist, kind="stable"))
+
+
+class SnapIndex:
+    """Static snap reference points plus the structures used to query them.
+
+    *points* are world-space ``(N, 3)`` coordinates, stored as float32 (the
+    precision Blender keeps vertices and matrices in); *kinds* and *owners* are
+    parallel ``(N,)`` arrays holding a ``KIND_*`` code and an index into
+    *owner_names*.  *excluded* (an :class:`Exclusion`, or a boolean mask that
+    is converted to one) marks points that are never returned -- the
+    geometry being moved.  *backend* is a backend name
+    (``"AUTO"``, ``"KDTREE"``, ``"GRID"``, ...) or a ready-built instance.
+    *axis_order*, when given, holds precomputed stable per-axis argsorts of
+    *points* (e.g. mapped from a disk cache) and skips the three sorts.
+    With a *pool* (``jobs.BuildPool``), the sorts and the backend are built
+    on its workers concurrently.  *shared* (a ``dedup.SharedOwners``) lists
+    the further owners of points that stand for several merged ones.
+    """
+
+    def __init__(self, points, kinds, owners, owner_names: Sequence[str],
+                 excluded=None, backend: "str | SpatialBackend" = "AUTO",
+                 axis_order: "tuple | None" = None, pool=None, shared=None):
+        self.points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3)
+        n = len(self.points)
+        self.kinds = np.asarray(kinds, dtype=np.uint8).reshape(n)
+        self.owners = np.asarray(owners, dtype=np.int32).reshape(n)
+        self.owner_names = list(owner_names)
+        self.shared = shared
+        if excluded is None:
+            self.excluded = Exclusion()
+        elif isinstance(excluded, Exclusion):
+            self.excluded = excluded
+        else:
+            self.excluded = Exclusion.from_mask(np.asarray(excluded, dtype=bool).reshape(n))
+        # Sorted per-axis projections for axis-clipping mode.
+        tasks = [] if axis_order is not None else [0, 1, 2]
+        if not isinstance(backend, SpatialBackend):
+            tasks.append("backend")
+
+        def build(task):
+            if task == "backend":
+                return make_backend(self.points, backend)
+            return np.argsort(self.points[:, task], kind="stable")
+
+        built = dict(zip(tasks, pool.map(build, tasks) if pool else map(build, tasks)))
+        self.backend = built.get("backend", backend)
+        if axis_order is None:
+            axis_order = (built[0], built[1], built[2])
+        self.axis_order = tuple(_index_array(np.asarray(order)) for order in axis_order)
+        self.axis_values = tuple(
+            self.points[order, axis] for axis, order in enumerate(self.axis_order)
+        )
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name
+
+    def memory_breakdown(self) -> Dict[str, int]:
+        """Bytes held per component (``tree`` is estimated for KDTREE)."""
+        return {
+            "points": self.points.nbytes,
+            "meta": self.kinds.nbytes + self.owners.nbytes
+            + (self.shared.nbytes if self.shared is not None else 0),
+            "axes": sum(a.nbytes for a in self.axis_order + self.axis_values),
+            "exclude": self.excluded.nbytes,
+            "tree": self.backend.nbytes,
+        }
+
+    def owners_of(self, point_id: int) -> List[int]:
+        """Owner of *point_id*, then the owners of points merged into it."""
+        owners = [int(self.owners[point_id])]
+        if self.shared is not None:
+            owners += self.shared.of(point_id).tolist()
+        return owners
+
+    def _keep(self, ids: np.ndarray) -> np.ndarray:
+        return ~self.excluded.mask(ids) if self.excluded else slice(None)
+
+    def _hits(self, ids: np.ndarray, dist: np.ndarray) -> HitSet:
+        return HitSet(
+            co=self.points[ids],
+            dist=dist,
+            kind=self.kinds[ids],
+            owner=self.owners[ids],
+            owner_names=self.owner_names,
+            point=ids,
+        )
+
+    def query_range(self, center, radius: float) -> HitSet:
+        """Non-excluded points within *radius* of *center*, nearest first."""
+        ids, dist = self.backend.find_range(center, radius)
+        keep = self._keep(ids)
+        return self._hits(ids[keep], dist[keep])
+
+    def query_range_multi(self, sources, radius: float) -> HitSet:
+        """Range query for several points at once (see :func:`query_range_multi`)."""
+        return query_range_multi(self, sources, radius)
+
+    def _box_candidates(self, origin: np.ndarray, half_extents) -> np.ndarray:
+        """Ids inside the narrowest per-axis sorted window of an axis-aligned box."""
+        best = None
+        for axis, h in enumerate(half_extents):
+            values = self.axis_values[axis]
+            lo = int(np.searchsorted(values, origin[axis] - h, side="left"))
+            hi = int(np.searchsorted(values, origin[axis] + h, side="right"))
+            if best is None or hi - lo < best[2] - best[1]:
+                best = (axis, lo, hi)
+        axis, lo, hi = best
+        return self.axis_order[axis][lo:hi]
+
+    def _constrained_hits(self, ids: np.ndarray, dist: np.ndarray, keep: np.ndarray) -> HitSet:
+        ids, dist = ids[keep], dist[keep]
+        if self.excluded:
+            ok = ~self.excluded.mask(ids)
+            ids, dist = ids[ok], dist[ok]
+        order = np.argsort(dist, kind="stable")
+        return self._hits(ids[order], dist[order])
+
+    def query_line(self, origin, axis: int, radius: float, half_length: float) -> HitSet:
+        """Points in a cylinder around the *axis*-parallel line through *origin*.
+
+        The cylinder has *radius* and extends *half_length* either side of
+        *origin*; ``dist`` is the distance to the line, nearest first.  Only
+        the narrowest of the three sorted axis windows is scanned.
+        """
+        o = np.asarray(origin, dtype=np.float64).reshape(3)
+        half = [radius, radius, radius]
+        half[axis] = half_length
+        ids = self._box_candidates(o, half)
+        d = self.points[ids].astype(np.float64) - o
+        along = np.abs(d[:, axis])
+        d[:, axis] = 0.0
+        perp = np.sqrt((d ** 2).sum(axis=1))
+        return self._constrained_hits(ids, perp, (perp <= radius) & (along <= half_length))
+
+    def query_slab(self, origin, axis: int, thickness: float, radius: float) -> HitSet:
+        """Points within *thickness* of the plane through *origin* normal to *axis*.
+
+        Only points within *radius* of *origin* inside the plane are returned;
+        ``dist`` is the distance to the plane, nearest first.
+        """
+        o = np.asarray(origin, dtype=np.float64).reshape(3)
+        half = [radius, radius, radius]
+        half[axis] = thickness
+        ids = self._box_candidates(o, half)
+        d = self.points[ids].astype(np.float64) - o
+        normal = np.abs(d[:, axis])
+        d[:, axis] = 0.0
+        in_plane = (d ** 2).sum(axis=1)
+        return self._constrained_hits(ids, normal, (normal <= thickness) & (in_plane <= radius * radius))
+
+    def axis_window(self, axis: int, value: float, threshold: float,
+                    limit: int = 5000) -> HitSet:
+        """Points whose *axis* coordinate lies within *threshold* of *value*.
+
+        At most *limit* entries of the sorted window are examined (lowest
+        coordinate first), matching the cap used before exclusion filtering.
+        ``dist`` holds the distance along *axis*.
+        """
+        values = self.axis_values[axis]
+        lo = int(np.searchsorted(values, value - threshold, side="left"))
+        hi = int(np.searchsorted(values, value + threshold, side="right"))
+        hi = min(hi, lo + limit)
+        ids = self.axis_order[axis][lo:hi]
+        vals = values[lo:hi]
+        keep = self._keep(ids)
+        return self._hits(ids[keep], np.abs(vals[keep] - value))
@@ -0,0 +1,290 @@
+"""Flat index assembly off the main thread.
+
+Only reading meshes needs ``bpy`` (and with it Blender's main thread).
+Everything after that -- transforms, edge midpoints, exclusion ranges,
+axis sorts, the spatial backend and detail levels -- is NumPy work on
+arrays that are not shared with Blender, so it can run on worker threads.
+NumPy releases the GIL inside matrix products and sorts, so a thread pool
+really spreads those over cores.  (A process pool would have to pickle
+every array across and start a Python that imports the add-on; threads
+share the buffers as they are.)
+
+:class:`FlatParts` holds what the main thread extracted;
+:func:`plan_flat_merge` transforms it, merges coincident vertices and
+decides which spare parts the merged budget still takes, and
+:func:`assemble_flat_index` turns the plan into indices, optionally fanning
+the per-object transforms and the per-axis sorts out over a
+:class:`BuildPool`.
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .dedup import SharedOwners, coincident_first
+from .edges import EdgeIndex, edge_midpoints
+from .exclusion import Exclusion
+from .geometry import transform_corners, transform_points
+from .index import KIND_BOUNDS, KIND_MIDPOINT, KIND_POINT, SnapIndex
+from .lod import LodIndex
+from .memory import BOUNDS_POINTS_PER_OBJECT
+
+MIN_POINTS_PER_TASK = 50_000  # below this a task costs more than it saves
+
+
+class BuildPool:
+    """One coordinator thread for whole builds plus workers for their stages.
+
+    A build submitted with :meth:`submit` may call :meth:`map` from its
+    coordinator thread; the workers are a separate pool, so a build never
+    waits on a slot its own stages need.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, int(workers or min(32, os.cpu_count() or 1)))
+        self._coordinator = ThreadPoolExecutor(1, thread_name_prefix="smartclip-build")
+        self._pool = (ThreadPoolExecutor(self.workers, thread_name_prefix="smartclip-worker")
+                      if self.workers > 1 else None)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._coordinator.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable, items: Sequence) -> list:
+        if self._pool is None or len(items) < 2:
+            return [fn(item) for item in items]
+        return list(self._pool.map(fn, items))
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._coordinator.shutdown(wait=wait, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _batches(sizes: np.ndarray, count: int) -> List[np.ndarray]:
+    """Split part ids into at most *count* contiguous runs of similar point totals."""
+    if not len(sizes):
+        return []
+    ends = np.cumsum(sizes)
+    count = int(max(1, min(count, len(sizes), ends[-1] // MIN_POINTS_PER_TASK)))
+    cuts = np.searchsorted(ends, ends[-1] * np.arange(1, count) / count, side="right")
+    return [run for run in np.split(np.arange(len(sizes)), cuts) if len(run)]
+
+
+def transform_parts(coords: Sequence[np.ndarray], matrices, pool: "BuildPool | None" = None
+                    ) -> List[np.ndarray]:
+    """World-space copy of each local part, batched over the pool's workers."""
+    mats = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    if pool is None:
+        return [transform_points(c, m) for c, m in zip(coords, mats)]
+    sizes = np.fromiter((len(c) for c in coords), dtype=np.int64, count=len(coords))
+    runs = _batches(sizes, pool.workers * 2)
+    done = pool.map(lambda run: [transform_points(coords[k], mats[k]) for k in run], runs)
+    return [pts for batch in done for pts in batch]
+
+
+@dataclass
+class FlatParts:
+    """Arrays for one flat index, read from Blender on the main thread.
+
+    Full-detail parts come first, one row each: slot id in *owners*, local
+    *coords* and world *matrices*; *moving* parts are excluded as a whole,
+    *selections* maps a row to excluded vertex ids (Edit Mode) and *edges*
+    a row to its ``(m, 2)`` vertex pairs.  The last *spare* rows are taken
+    only if the budget allows once merged (see :func:`plan_flat_merge`);
+    *spare_corners* are their local box corners, for when they do not fit.
+    Bounds-only slots follow with their local corners and matrices.
+    """
+    owners: np.ndarray
+    coords: List[np.ndarray]
+    matrices: np.ndarray
+    moving: np.ndarray
+    selections: Dict[int, np.ndarray] = field(default_factory=dict)
+    edges: Dict[int, np.ndarray] = field(default_factory=dict)
+    bounds_owners: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    bounds_corners: np.ndarray = field(default_factory=lambda: np.empty((0, 8, 3)))
+    bounds_matrices: np.ndarray = field(default_factory=lambda: np.empty((0, 4, 4)))
+    bounds_moving: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+    spare: int = 0
+    spare_corners: np.ndarray = field(default_factory=lambda: np.empty((0, 8, 3)))
+
+
+@dataclass
+class FlatPlan:
+    """:class:`FlatParts` made ready for :func:`assemble_flat_index`.
+
+    *parts* has the spare rows that did not fit moved to the bounds;
+    *world* is each remaining part in world space, and *first* /
+    *row_starts* the merge plan (``None`` without merging, see
+    :func:`_merge_plan`).  *admitted* spare rows were kept.
+    """
+    parts: FlatParts
+    world: List[np.ndarray]
+    first: Optional[np.ndarray] = None
+    row_starts: Optional[np.ndarray] = None
+    admitted: int = 0
+
+
+def _merge_plan(world: List[np.ndarray], rows: np.ndarray, epsilon: float):
+    """Coincident vertices over the parts in *rows* (see :mod:`.dedup`).
+
+    Returns ``(first, starts)``: per vertex of the concatenated rows, the
+    position of the first vertex in its cell, and each row's start in that
+    concatenation (``-1`` for rows not taking part).
+    """
+    sizes = np.array([len(world[r]) for r in rows], dtype=np.int64)
+    starts = np.full(len(world), -1, dtype=np.int64)
+    starts[rows] = np.cumsum(sizes) - sizes
+    merged = np.concatenate([world[r] for r in rows]) if len(rows) else np.empty((0, 3))
+    return coincident_first(merged, epsilon), starts
+
+
+def plan_flat_merge(parts: FlatParts, epsilon: float = 0.0,
+                    budget: Optional[int] = None,
+                    pool: "BuildPool | None" = None) -> FlatPlan:
+    """Transform *parts*, plan the merge and settle the spare rows.
+
+    Vertices of parts that neither move nor have a selection are merged
+    per *epsilon*-sized cell (none when *epsilon* is 0).  A part then costs
+    the vertices it keeps -- a vertex coinciding with an earlier part's is
+    free -- plus its edge midpoints.  Spare rows are taken in order while
+    the total stays within *budget* (all of them when ``None``); the first
+    that does not fit and every later one become bounds-only.
+    """
+    world = transform_parts(parts.coords, parts.matrices, pool)
+    sizes = np.array([len(w) for w in world], dtype=np.int64)
+    first = row_starts = None
+    if epsilon > 0:
+        mergeable = ~np.asarray(parts.moving, dtype=bool)
+        mergeable[list(parts.selections)] = False
+        rows = np.flatnonzero(mergeable)
+        first, row_starts = _merge_plan(world, rows, epsilon)
+        kept = np.concatenate(([0], np.cumsum(first == np.arange(len(first)))))
+        sizes[rows] = kept[row_starts[rows] + sizes[rows]] - kept[row_starts[rows]]
+    required = len(world) - parts.spare
+    if budget is None or not parts.spare:
+        return FlatPlan(parts, world, first, row_starts, admitted=parts.spare)
+
+    costs = sizes + [len(parts.edges.get(r, ())) for r in range(len(world))]
+    used = np.cumsum(costs[required:]) + int(costs[:required].sum())
+    admitted = int(np.count_nonzero(np.cumsum(used > budget) == 0))
+    keep = required + admitted
+    if keep < len(world):
+        spill = slice(keep, None)
+        if first is not None:
+            cut = sum(len(world[r]) for r in range(keep) if row_starts[r] >= 0)
+            first, row_starts = first[:cut], row_starts[:keep]
+        parts = replace(
+            parts,
+            owners=parts.owners[:keep], coords=parts.coords[:keep],
+            matrices=parts.matrices[:keep], moving=parts.moving[:keep],
+            selections={r: v for r, v in parts.selections.items() if r < keep},
+            edges={r: v for r, v in parts.edges.items() if r < keep},
+            bounds_owners=np.concatenate((parts.owners[spill], parts.bounds_owners)),
+            bounds_corners=np.concatenate((parts.spare_corners[admitted:], parts.bounds_corners)),
+            bounds_matrices=np.concatenate((parts.matrices[spill], parts.bounds_matrices)),
+            bounds_moving=np.concatenate((parts.moving[spill], parts.bounds_moving)),
+            spare=admitted, spare_corners=parts.spare_corners[:admitted],
+        )
+        world = world[:keep]
+    return FlatPlan(parts, world, first, row_starts, admitted)
+
+
+def assemble_flat_index(parts: FlatParts, owner_names: Sequence[str], backend: str = "AUTO",
+                        lod: bool = False, pool: "BuildPool | None" = None,
+                        dedup: float = 0.0, plan: Optional[FlatPlan] = None):
+    """``(SnapIndex | None, EdgeIndex | None, LodIndex | None)`` for *parts*.
+
+    Points are laid out part by part (vertices, then edge midpoints), then
+    the bounds-only corners and origins in one batch.  Each part's points
+    are contiguous, so exclusion is a range (moving parts) or a bitmap over
+    the part's slice (Edit Mode selection).
+
+    With *dedup* > 0, vertices of parts that neither move nor have a
+    selection are merged per *dedup*-sized cell: only the first vertex of a
+    cell is kept, edges are re-pointed to it and the other owners go into
+    ``SnapIndex.shared``.  A *plan* from :func:`plan_flat_merge` (which
+    may have dropped spare rows) is used as is instead of *parts* and
+    *dedup*.
+    """
+    if plan is None:
+        plan = plan_flat_merge(parts, dedup, pool=pool)
+    parts, world, first, row_starts = plan.parts, plan.world, plan.first, plan.row_starts
+    chunks, kinds, owners = [], [], []
+    edge_ids, edge_owners = [], []
+    excluded = Exclusion()
+    offset = 0
+    point_ids = None
+    if first is not None:
+        point_ids = np.full(len(first), -1, dtype=np.int64)  # survivor -> index id
+    for row, (slot, pts) in enumerate(zip(parts.owners.tolist(), world)):
+        sel = parts.selections.get(row)
+        verts, ids = pts, None  # ids: index id of every vertex, when merged
+        if row_starts is not None and row_starts[row] >= 0:
+            here = np.arange(row_starts[row], row_starts[row] + len(pts))
+            keep = first[here] == here
+            point_ids[here[keep]] = offset + np.arange(np.count_nonzero(keep))
+            verts, ids = pts[keep], point_ids[first[here]]
+        elif parts.moving[row]:
+            excluded.add_range(offset, offset + len(pts))
+        elif sel is not None:
+            excluded.add_selection(offset, len(pts), sel)
+        chunks.append(verts)
+        kinds.append(np.full(len(verts), KIND_POINT, dtype=np.uint8))
+        owners.append(np.full(len(verts), slot, dtype=np.int32))
+        vert_offset, offset = offset, offset + len(verts)
+
+        pairs = parts.edges.get(row)
+        if pairs is None:
+            continue
+        mids = edge_midpoints(pts, pairs)
+        if parts.moving[row]:
+            excluded.add_range(offset, offset + len(mids))
+            pairs = pairs[:0]
+        elif sel is not None:
+            # An edge with a selected end moves: drop it, hide its midpoint
+            selected = np.zeros(len(pts), dtype=bool)
+            selected[sel] = True
+            moves = selected[pairs].any(axis=1)
+            excluded.add_selection(offset, len(mids), np.flatnonzero(moves))
+            pairs = pairs[~moves]
+        edge_ids.append(ids[pairs] if ids is not None else pairs.astype(np.int64) + vert_offset)
+        edge_owners.append(np.full(len(pairs), slot, dtype=np.int32))
+        chunks.append(mids)
+        kinds.append(np.full(len(mids), KIND_MIDPOINT, dtype=np.uint8))
+        owners.append(np.full(len(mids), slot, dtype=np.int32))
+        offset += len(mids)
+
+    bounds_ids = parts.bounds_owners
+    if len(bounds_ids):
+        # Bounding-box 8 corners + origin, all bounds-only slots in one batch
+        box = transform_corners(parts.bounds_corners, parts.bounds_matrices)
+        box = np.concatenate((box, parts.bounds_matrices[:, None, :3, 3]), axis=1)
+        chunks.append(box.reshape(-1, 3))
+        per_obj = BOUNDS_POINTS_PER_OBJECT
+        kinds.append(np.full(len(bounds_ids) * per_obj, KIND_BOUNDS, dtype=np.uint8))
+        owners.append(np.repeat(bounds_ids.astype(np.int32), per_obj))
+        starts = offset + np.flatnonzero(parts.bounds_moving) * per_obj
+        excluded.add_ranges(starts, starts + per_obj)
+
+    if not chunks or not sum(len(c) for c in chunks):
+        return None, None, None
+    owners = np.concatenate(owners)
+    shared = None
+    if first is not None and len(first):
+        dropped = np.flatnonzero(first != np.arange(len(first)))
+        merged_rows = np.flatnonzero(row_starts >= 0)
+        slot_of = np.repeat(parts.owners[merged_rows], [len(world[r]) for r in merged_rows])
+        survivor = point_ids[first[dropped]]
+        other = slot_of[dropped] != owners[survivor]
+        shared = SharedOwners.from_pairs(survivor[other], slot_of[dropped][other])
+    index = SnapIndex(np.concatenate(chunks), np.concatenate(kinds), owners,
+                      owner_names, excluded=excluded, backend=backend, pool=pool,
+                      shared=shared)
+    edge_index = None
+    if edge_ids and sum(len(e) for e in edge_ids):
+        edge_index = EdgeIndex(index.points, np.concatenate(edge_ids),
+                               np.concatenate(edge_owners), owner_names)
+    return index, edge_index, LodIndex(index, backend=backend) if lod else None
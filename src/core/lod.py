@@ -0,0 +1,137 @@
+"""Zoom-dependent detail: one representative point per octree cell and level.
+
+Zoomed out, hundreds of vertices can fall inside a single pixel and every
+one of them is scored although only one can be told apart.  A
+:class:`LodIndex` keeps, per octree level, the non-excluded point nearest
+to the centroid of each occupied cell (a real vertex, so snapped positions
+stay exact), with a spatial backend over those representatives.  A query
+names the world size one distinguishable step has at the cursor; the
+coarsest level whose cells are no larger is used, and the full-resolution
+:class:`~.index.SnapIndex` when even the finest level is too coarse.
+
+Levels are built once, bottom-up, from one Morton-code sort: a cell's
+parent drops the lowest three code bits, so each level clusters the finer
+level's representatives (weighted by how many points they stand for) in
+linear passes over contiguous runs.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from .backends import SpatialBackend, _index_array, _spread_bits, make_backend
+from .index import HitSet, SnapIndex
+
+MAX_LEVELS = 16          # finest cell = extent / 2**16 (codes allow 21)
+MAX_LEVEL_FRACTION = 0.5  # a level keeping more points than this adds nothing
+MAX_TOTAL_FRACTION = 0.5  # all levels together: the memory cap counts on it
+
+
+@dataclass
+class LodLevel:
+    cell: float              # cell edge length (world units)
+    ids: np.ndarray          # representative rows of the base index
+    backend: SpatialBackend  # over ``points[ids]``
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.backend.nbytes
+
+
+def _cluster(keys: np.ndarray, points: np.ndarray, weights: np.ndarray):
+    """Pick the point nearest the weighted centroid of each run of equal *keys*.
+
+    *keys* are sorted, so every cell is one contiguous run.  Returns the
+    representative rows into *points* and the total weight each stands for.
+    """
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if len(starts) == len(keys):
+        return np.arange(len(keys)), weights
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(keys)]))
+    total = np.add.reduceat(weights, starts)
+    centroid = np.add.reduceat(points * weights[:, None], starts) / total[:, None]
+    d2 = ((points - centroid[group]) ** 2).sum(axis=1)
+    nearest = np.flatnonzero(d2 == np.minimum.reduceat(d2, starts)[group])
+    first = np.r_[True, group[nearest[1:]] != group[nearest[:-1]]]
+    return nearest[first], total
+
+
+class LodIndex:
+    """Octree levels of representative points over a :class:`SnapIndex`.
+
+    Excluded points of *index* never become representatives.  Levels are
+    kept coarse to fine; a level is dropped once it would keep more than
+    ``MAX_LEVEL_FRACTION`` of the points (the base index serves there), and
+    the finest are dropped while all levels together keep more than
+    ``MAX_TOTAL_FRACTION``.
+    """
+
+    def __init__(self, index: SnapIndex, backend: str = "AUTO",
+                 max_levels: int = MAX_LEVELS):
+        self.index = index
+        self.owner_names = index.owner_names
+        self.levels: List[LodLevel] = []
+        ids = np.arange(len(index))
+        if index.excluded:
+            ids = ids[~index.excluded.mask(ids)]
+        if len(ids) < 2:
+            return
+        pts = index.points[ids].astype(np.float64)
+        lo = pts.min(axis=0)
+        extent = float((pts.max(axis=0) - lo).max())
+        if extent <= 0.0:
+            return
+
+        # Sorted Morton codes: every octree cell, at every level, is one run.
+        q = np.minimum((pts - lo) / extent * 2 ** max_levels, 2 ** max_levels - 1)
+        q = q.astype(np.uint64)
+        codes = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << np.uint64(1)) \
+            | (_spread_bits(q[:, 2]) << np.uint64(2))
+        order = np.argsort(codes, kind="stable")
+        ids, pts, codes = ids[order], pts[order], codes[order]
+        weights = np.ones(len(ids))
+        limit = MAX_LEVEL_FRACTION * len(ids)
+        total_limit = MAX_TOTAL_FRACTION * len(ids)
+        levels = []
+        for level in range(max_levels, 0, -1):
+            codes = codes >> np.uint64(3 * (level != max_levels))
+            if np.count_nonzero(codes[1:] != codes[:-1]) + 1 > limit:
+                continue  # too fine to keep: cluster the points at a coarser level
+            rows, weights = _cluster(codes, pts, weights)
+            ids, pts, codes = ids[rows], pts[rows], codes[rows]
+            levels.append((extent / 2 ** level, ids))
+            if len(ids) == 1:
+                break
+        while levels and sum(len(rep) for _, rep in levels) > total_limit:
+            levels.pop(0)  # finest first
+        for cell, rep in reversed(levels):
+            self.levels.append(LodLevel(
+                cell=cell, ids=_index_array(rep),
+                backend=make_backend(index.points[rep], backend),
+            ))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels)
+
+    def memory_breakdown(self) -> Dict[str, int]:
+        return {"lod": self.nbytes}
+
+    def level_for(self, cell: float) -> "LodLevel | None":
+        """Coarsest level with cells no larger than *cell* (``None``: full detail)."""
+        for level in self.levels:
+            if level.cell <= cell:
+                return level
+        return None
+
+    def query_range(self, center, radius: float, cell: float = 0.0) -> HitSet:
+        """Like ``SnapIndex.query_range``, at the detail level *cell* asks for."""
+        level = self.level_for(cell)
+        if level is None:
+            return self.index.query_range(center, radius)
+        found, dist = level.backend.find_range(center, radius)
+        return self.index._hits(level.ids[found], dist)
@@ -0,0 +1,66 @@
+"""Weight-bounded least-recently-used cache."""
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Mapping that evicts least-recently-used entries above *capacity*.
+
+    Every entry carries a weight (e.g. a point count); the newest entry is
+    always kept, even if it alone exceeds the capacity.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self.total = 0
+        self._items = OrderedDict()  # key -> (value, weight)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Return the value for *key* and mark it most recently used."""
+        item = self._items.get(key)
+        if item is None:
+            return default
+        self._items.move_to_end(key)
+        return item[0]
+
+    def peek(self, key, default=None):
+        """Return the value for *key* without touching the LRU order."""
+        item = self._items.get(key)
+        return default if item is None else item[0]
+
+    def values(self):
+        """Cached values, least recently used first."""
+        return [value for value, _weight in self._items.values()]
+
+    def put(self, key, value, weight: int = 1):
+        self.discard(key)
+        self._items[key] = (value, int(weight))
+        self.total += int(weight)
+        self.trim()
+
+    def discard(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.total -= item[1]
+
+    def discard_where(self, predicate):
+        """Drop every entry whose key satisfies *predicate*."""
+        for key in [k for k in self._items if predicate(k)]:
+            self.discard(key)
+
+    def trim(self, capacity: "int | None" = None):
+        """Evict down to *capacity* (default: the cache's own)."""
+        limit = self.capacity if capacity is None else capacity
+        while self.total > limit and len(self._items) > 1:
+            _key, (_value, weight) = self._items.popitem(last=False)
+            self.total -= weight
+
+    def clear(self):
+        self._items.clear()
+        self.total = 0
@@ -0,0 +1,65 @@
+"""Memory estimates for snap indices and the MB-based point allocator."""
+
+import math
+from typing import Dict
+
+from .backends import BACKENDS
+from .lod import MAX_TOTAL_FRACTION
+
+# Per-point bytes held by SnapIndex itself, independent of the backend:
+# float32 xyz (12) + kind (1) + owner (4) + three axis orderings
+# (int32 order + float32 value = 8 each).  Exclusion ranges / bitmaps are
+# per object or at most 1 bit per vertex and are not counted.
+INDEX_BYTES_PER_POINT = 12 + 1 + 4 + 3 * 8
+
+# Per-edge bytes of the EdgeIndex, on top of the edge's midpoint (a plain
+# index point): int32 vertex pair (8) + owner (4), and in its AabbTree the
+# int64 order (8), float32 box min/max (24) and the upper levels (~4).
+EDGE_BYTES = 8 + 4 + 8 + 24 + 4
+
+# Detail levels keep up to MAX_TOTAL_FRACTION of the points again, each as
+# an int32 row id (4) plus the float32 copy its level's backend is built
+# over (12) and that backend's own per-point cost.
+LOD_ID_BYTES = 4 + 12
+
+# Every bounds-only object contributes its 8 corners + origin.
+BOUNDS_POINTS_PER_OBJECT = 9
+
+COMPONENTS = ("points", "meta", "axes", "exclude", "tree")
+
+
+def bytes_per_point(backend: str = "AUTO", edge_share: float = 0.0, lod: bool = False) -> int:
+    """Estimated bytes per indexed point for *backend* (AUTO = worst case).
+
+    *edge_share* is the fraction of the points that are edge midpoints;
+    each of those also pays :data:`EDGE_BYTES` for its edge.  With *lod*,
+    every point also pays its share of the detail levels.
+    """
+    cls = BACKENDS.get(backend)
+    if cls is None:
+        extra = max(c.bytes_per_point for c in BACKENDS.values())
+    else:
+        extra = cls.bytes_per_point
+    lod_bytes = MAX_TOTAL_FRACTION * (LOD_ID_BYTES + extra) if lod else 0.0
+    return INDEX_BYTES_PER_POINT + extra + math.ceil(edge_share * EDGE_BYTES + lod_bytes)
+
+
+def points_for_memory(megabytes: float, backend: str = "AUTO", edge_share: float = 0.0,
+                      lod: bool = False) -> int:
+    """How many points fit in *megabytes* of index memory (see :func:`bytes_per_point`)."""
+    return int(megabytes * 1024 * 1024) // bytes_per_point(backend, edge_share, lod)
+
+
+def format_bytes(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1024 * 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def format_breakdown(breakdown: Dict[str, int]) -> str:
+    """``"6.1 MB (points 1.2 MB, meta 0.2 MB, ...)"``; zero components omitted."""
+    total = sum(breakdown.values())
+    parts = [f"{k} {format_bytes(v)}" for k, v in breakdown.items() if v]
+    return f"{format_bytes(total)} ({', '.join(parts)})" if parts else format_bytes(total)
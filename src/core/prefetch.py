@@ -0,0 +1,63 @@
+"""When to build an index before it is asked for.
+
+Between moves the user selects, orbits and thinks; the scene does not
+change.  :class:`IdlePrefetch` watches a cheap *key* describing what the
+next build would read (selection, scope, settings, a scene generation) and
+says when that key has held still for ``idle_seconds`` -- the moment to
+start a build.  The build's future is kept under its key; the next move
+takes it if its own key matches and otherwise builds as usual.
+"""
+
+from concurrent.futures import Future
+from typing import Hashable, Optional
+
+
+class IdlePrefetch:
+    """Idle detection for one prefetched build, keyed by the state it read.
+
+    Call :meth:`observe` on every poll; when it returns ``True``, build and
+    hand the future to :meth:`start`.  :meth:`take` gives the future to the
+    caller whose key matches and forgets it either way, so a stale build is
+    never reused and a fresh one is never used twice.
+    """
+
+    def __init__(self, idle_seconds: float = 0.5):
+        self.idle_seconds = float(idle_seconds)
+        self._seen: Optional[Hashable] = None
+        self._since = 0.0
+        self._key: Optional[Hashable] = None
+        self._future: Optional[Future] = None
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def observe(self, key: Optional[Hashable], now: float) -> bool:
+        """Whether to start a build for *key* now (``None``: nothing to build)."""
+        if key != self._seen:
+            self._seen, self._since = key, now
+            return False
+        if key is None or key == self._key or self.pending:
+            return False  # built (or building) already, or one build at a time
+        return now - self._since >= self.idle_seconds
+
+    def start(self, key: Hashable, future: Future) -> None:
+        self.clear()
+        self._key, self._future = key, future
+
+    def take(self, key: Hashable) -> Optional[Future]:
+        """The build started for *key* (possibly still running), or ``None``."""
+        future = self._future if self._key == key else None
+        if future is not None and future.done() and (
+                future.cancelled() or future.exception() is not None):
+            future = None  # a failed prefetch: let the move build (and report) itself
+        if future is None:
+            self.clear()  # stale: stop it
+        else:
+            self._key, self._future = None, None
+        return future
+
+    def clear(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+        self._key, self._future = None, None
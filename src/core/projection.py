@@ -0,0 +1,67 @@
+"""World -> region pixel projection without ``bpy_extras``."""
+
+import numpy as np
+
+
+class ViewProjection:
+    """A region's perspective matrix plus its pixel size.
+
+    Mirrors ``bpy_extras.view3d_utils.location_3d_to_region_2d``: points with
+    a non-positive clip-space ``w`` are behind the viewer and have no screen
+    position.
+    """
+
+    __slots__ = ("matrix", "width", "height")
+
+    def __init__(self, matrix, width: float, height: float):
+        self.matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+        self.width = float(width)
+        self.height = float(height)
+
+    def project(self, points):
+        """Project ``(N, 3)`` world points.
+
+        Returns ``(xy, ok)``: an ``(N, 2)`` pixel array and a boolean mask of
+        points in front of the viewer (``xy`` is undefined where ``ok`` is
+        False).
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        m = self.matrix
+        clip = pts @ m[:, :3].T + m[:, 3]
+        w = clip[:, 3]
+        ok = w > 0.0
+        safe_w = np.where(ok, w, 1.0)
+        half_w = self.width / 2.0
+        half_h = self.height / 2.0
+        xy = np.empty((len(pts), 2), dtype=np.float64)
+        xy[:, 0] = half_w + half_w * (clip[:, 0] / safe_w)
+        xy[:, 1] = half_h + half_h * (clip[:, 1] / safe_w)
+        return xy, ok
+
+    def project_point(self, co):
+        """Project a single point; ``None`` when it is behind the viewer."""
+        xy, ok = self.project(co)
+        if not ok[0]:
+            return None
+        return float(xy[0, 0]), float(xy[0, 1])
+
+    def pixel_size(self, co) -> float:
+        """World length of one horizontal pixel at the depth of *co*.
+
+        ``inf`` when *co* is behind the viewer.
+        """
+        p = np.asarray(co, dtype=np.float64).reshape(3)
+        m = self.matrix
+        w = float(m[3, :3] @ p + m[3, 3])
+        scale = float(np.linalg.norm(m[0, :3])) * self.width / 2.0
+        if w <= 0.0 or scale <= 0.0:
+            return float("inf")
+        return w / scale
+
+    def reach(self, co) -> float:
+        """World length of the region's diagonal at the depth of *co*.
+
+        No point on screen is further than this from *co* at its depth;
+        ``inf`` when *co* is behind the viewer.
+        """
+        return self.pixel_size(co) * float(np.hypot(self.width, self.height))
@@ -0,0 +1,285 @@
+"""Vectorised screen-space filtering and scoring of index hits."""
+
+from dataclasses import dataclass
+from itertools import combinations, product
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .index import KIND_NAMES, HitSet
+from .projection import ViewProjection
+from .spacing import SpacingMatch
+
+
+@dataclass
+class CoreCandidate:
+    """A scored snap target in plain Python types."""
+    kind: str                                # 'POINT' / 'BOUNDS' / 'ALIGN_X' ...
+    location: Tuple[float, float, float]     # world-space snap destination
+    reference: Tuple[float, float, float]    # point the candidate relates to
+    screen_dist: float                       # pixels from the reference cursor
+    score: float                             # priority (lower = better)
+    owner_name: str = ""
+    source: Optional[Tuple[float, float, float]] = None  # moving point that snaps
+    references: Tuple[Tuple[float, float, float], ...] = ()  # per-axis refs (multi-axis)
+    segments: Tuple[Tuple[tuple, tuple], ...] = ()  # guide lines (equal spacing, edges)
+    point_id: int = -1                       # SnapIndex point, when the hit carried one
+
+
+def _screen_dist(view: ViewProjection, points: np.ndarray, mouse_xy):
+    xy, ok = view.project(points)
+    d = np.hypot(xy[:, 0] - float(mouse_xy[0]), xy[:, 1] - float(mouse_xy[1]))
+    return d, ok
+
+
+def _point_id(hits: HitSet, i: int) -> int:
+    return -1 if hits.point is None else int(hits.point[i])
+
+
+def _kind_bias(hits: HitSet, kind_bias) -> "np.ndarray | float":
+    if not kind_bias:
+        return 0.0
+    table = np.zeros(len(KIND_NAMES))
+    for kind, px in kind_bias.items():
+        table[kind] = px
+    return table[hits.kind]
+
+
+def score_range_hits(hits: HitSet, center, view: ViewProjection, mouse_xy,
+                     snap_distance_px: float, kind_bias=None) -> List[CoreCandidate]:
+    """Turn range-query *hits* into candidates sorted by score.
+
+    Hits behind the viewer or further than *snap_distance_px* from *mouse_xy*
+    are dropped; the score is screen distance plus world distance, plus
+    ``kind_bias[kind]`` pixels when given (e.g. so vertices beat the face
+    point right next to them).  A candidate's ``reference`` is the target
+    itself, so occlusion is tested where the snap would land.
+    """
+    if not len(hits):
+        return []
+    sd, ok = _screen_dist(view, hits.co, mouse_xy)
+    keep = np.flatnonzero(ok & (sd <= snap_distance_px))
+    if not len(keep):
+        return []
+    total = sd + hits.dist + _kind_bias(hits, kind_bias)
+    order = keep[np.argsort(total[keep], kind="stable")]
+
+    names = hits.owner_names
+    return [
+        CoreCandidate(
+            kind=KIND_NAMES[hits.kind[i]],
+            location=tuple(hits.co[i].tolist()),
+            reference=tuple(hits.co[i].tolist()),
+            screen_dist=float(sd[i]),
+            score=float(total[i]),
+            owner_name=names[hits.owner[i]],
+            point_id=_point_id(hits, i),
+            segments=() if hits.segment is None else (
+                tuple(tuple(p) for p in hits.segment[i].tolist()),
+            ),
+        )
+        for i in order
+    ]
+
+
+def score_constrained_hits(hits: HitSet, origin, free_axes, view: ViewProjection,
+                           mouse_xy, snap_distance_px: float) -> List[CoreCandidate]:
+    """Candidates for a move restricted to *free_axes* (line or plane).
+
+    Each target is projected onto the constraint: ``location`` keeps
+    *origin* on the locked axes and takes the target's coordinate on the
+    free ones.  Filtering and score are as in :func:`score_range_hits`, with
+    ``dist`` being the target's distance from the constraint.
+    """
+    if not len(hits):
+        return []
+    free = list(free_axes)
+    dest = np.repeat(np.asarray(origin, dtype=np.float64).reshape(1, 3), len(hits), axis=0)
+    dest[:, free] = hits.co[:, free]
+    sd, ok = _screen_dist(view, dest, mouse_xy)
+    keep = np.flatnonzero(ok & (sd <= snap_distance_px))
+    if not len(keep):
+        return []
+    score = sd[keep] + hits.dist[keep]
+    order = keep[np.argsort(score, kind="stable")]
+
+    names = hits.owner_names
+    return [
+        CoreCandidate(
+            kind=KIND_NAMES[hits.kind[i]],
+            location=tuple(dest[i].tolist()),
+            reference=tuple(hits.co[i].tolist()),
+            screen_dist=float(sd[i]),
+            score=float(sd[i] + hits.dist[i]),
+            owner_name=names[hits.owner[i]],
+            point_id=_point_id(hits, i),
+        )
+        for i in order
+    ]
+
+
+def score_source_hits(hits: HitSet, sources, pivot, view: ViewProjection,
+                      snap_distance_px: float, free_axes=None) -> List[CoreCandidate]:
+    """Candidates from ``query_range_multi`` pairs of moving *sources*.
+
+    A pair is kept when source and target are within *snap_distance_px* of
+    each other on screen; ``location`` is where *pivot* has to go for the
+    source to land on the target.  Score is screen plus world distance.
+
+    With *free_axes* (pairs from ``query_constrained_multi``) the move is
+    restricted to those axes: the source lands on the target's projection
+    onto its line or plane, and that point is what has to be within reach.
+    """
+    if not len(hits):
+        return []
+    src = np.asarray(sources, dtype=np.float64).reshape(-1, 3)
+    s = hits.source
+    delta = hits.co - src[s]
+    if free_axes is not None:
+        delta[:, [a for a in range(3) if a not in free_axes]] = 0.0
+    src_xy, src_ok = view.project(src)
+    xy, ok = view.project(src[s] + delta)
+    sd = np.hypot(xy[:, 0] - src_xy[s, 0], xy[:, 1] - src_xy[s, 1])
+    keep = np.flatnonzero(ok & src_ok[s] & (sd <= snap_distance_px))
+    if not len(keep):
+        return []
+    score = sd[keep] + hits.dist[keep]
+    order = keep[np.argsort(score, kind="stable")]
+
+    dest = np.asarray(pivot, dtype=np.float64).reshape(1, 3) + delta
+    names = hits.owner_names
+    return [
+        CoreCandidate(
+            kind=KIND_NAMES[hits.kind[i]],
+            location=tuple(dest[i].tolist()),
+            reference=tuple(hits.co[i].tolist()),
+            screen_dist=float(sd[i]),
+            score=float(sd[i] + hits.dist[i]),
+            owner_name=names[hits.owner[i]],
+            source=tuple(src[s[i]].tolist()),
+            point_id=_point_id(hits, i),
+        )
+        for i in order
+    ]
+
+
+def score_axis_hits(hits: HitSet, axis: int, center, view: ViewProjection,
+                    mouse_xy) -> List[CoreCandidate]:
+    """Alignment candidates for one axis from an ``axis_window`` query.
+
+    Each hit yields *center* with its *axis* coordinate replaced by the hit's.
+    Only points behind the viewer are rejected; candidates are deduplicated by
+    the axis value rounded to 1 mm, keeping the best score per value.
+    """
+    if not len(hits):
+        return []
+    vals = hits.co[:, axis]
+    align = np.repeat(np.asarray(center, dtype=np.float64).reshape(1, 3), len(hits), axis=0)
+    align[:, axis] = vals
+    sd, ok = _screen_dist(view, align, mouse_xy)
+    keep = np.flatnonzero(ok)
+    if not len(keep):
+        return []
+
+    score = hits.dist * 100.0
+    keep = keep[np.argsort(score[keep], kind="stable")]
+    _uniq, first = np.unique(np.round(vals[keep], 3), return_index=True)
+    best = keep[np.sort(first)]
+
+    kind = "ALIGN_" + "XYZ"[axis]
+    names = hits.owner_names
+    return [
+        CoreCandidate(
+            kind=kind,
+            location=tuple(align[i].tolist()),
+            reference=tuple(hits.co[i].tolist()),
+            screen_dist=float(sd[i]),
+            score=float(score[i]),
+            owner_name=names[hits.owner[i]],
+        )
+        for i in best
+    ]
+
+
+def combine_axis_candidates(per_axis: Sequence[List[CoreCandidate]], center,
+                            view: ViewProjection, mouse_xy,
+                            top_k: int = 4,
+                            max_axis_dist: Optional[float] = None) -> List[CoreCandidate]:
+    """2- and 3-axis alignment points from single-axis candidate lists.
+
+    *per_axis* holds the sorted ``score_axis_hits`` result of each enabled
+    axis.  Only the best *top_k* of each list are combined, so the work is
+    at most ``top_k ** 3`` points however many hits the windows had.  With
+    *max_axis_dist*, candidates whose aligned coordinate is further than
+    that from *center* take no part: a combination is only made of values
+    each axis would snap to on its own.  Each combination takes its aligned
+    coordinate from one candidate per axis; its score is the sum of theirs.
+    Results using more axes come first, then by score.
+    """
+    base = np.asarray(center, dtype=np.float64).reshape(3)
+    if max_axis_dist is not None:
+        def _offset(cand):
+            axis = "XYZ".index(cand.kind[-1])
+            return abs(cand.location[axis] - base[axis])
+        per_axis = [[c for c in cands if _offset(c) <= max_axis_dist] for cands in per_axis]
+    lists = [cands[:top_k] for cands in per_axis if cands]
+    if len(lists) < 2:
+        return []
+    combos = []
+    for size in range(len(lists), 1, -1):
+        for group in combinations(lists, size):
+            combos.extend(product(*group))
+
+    locs = np.repeat(base.reshape(1, 3), len(combos), axis=0)
+    for row, combo in enumerate(combos):
+        for cand in combo:
+            axis = "XYZ".index(cand.kind[-1])
+            locs[row, axis] = cand.location[axis]
+    sd, ok = _screen_dist(view, locs, mouse_xy)
+
+    out = []
+    for row in np.flatnonzero(ok).tolist():
+        combo = combos[row]
+        out.append(CoreCandidate(
+            kind="ALIGN_" + "".join(c.kind[-1] for c in combo),
+            location=tuple(locs[row].tolist()),
+            reference=combo[0].reference,
+            screen_dist=float(sd[row]),
+            score=float(sum(c.score for c in combo)),
+            owner_name=" / ".join(dict.fromkeys(c.owner_name for c in combo)),
+            references=tuple(c.reference for c in combo),
+        ))
+    out.sort(key=lambda c: (-len(c.references), c.score))
+    return out
+
+
+def score_spacing_matches(matches: Sequence[SpacingMatch], pivot, view: ViewProjection,
+                          mouse_xy, snap_distance_px: float,
+                          owner_names: Sequence[str]) -> List[CoreCandidate]:
+    """Equal-spacing candidates: *pivot* shifted along each match's axis.
+
+    Matches whose shifted pivot lands more than *snap_distance_px* from
+    *mouse_xy* on screen are dropped; the score is that pixel distance.
+    """
+    if not matches:
+        return []
+    dest = np.repeat(np.asarray(pivot, dtype=np.float64).reshape(1, 3), len(matches), axis=0)
+    for row, m in enumerate(matches):
+        dest[row, m.axis] += m.shift
+    sd, ok = _screen_dist(view, dest, mouse_xy)
+    keep = np.flatnonzero(ok & (sd <= snap_distance_px))
+
+    out = []
+    for i in keep[np.argsort(sd[keep], kind="stable")].tolist():
+        m = matches[i]
+        a, b = m.reference
+        out.append(CoreCandidate(
+            kind="SPACING_" + "XYZ"[m.axis],
+            location=tuple(dest[i].tolist()),
+            reference=m.segments[0][0],
+            screen_dist=float(sd[i]),
+            score=float(sd[i]),
+            owner_name=f"{owner_names[a]} - {owner_names[b]}",
+            segments=tuple(m.segments),
+        ))
+    return out
@@ -0,0 +1,181 @@
+"""Equal-spacing guides: an index of the gaps between neighbouring boxes.
+
+For every axis the scope objects' world AABBs are kept as intervals sorted
+by their lower and upper bounds.  At build time each box is paired with the
+next box along the axis that overlaps it on the two other axes (a "row"),
+and the gaps of those pairs are stored sorted.  Per event, the moving box's
+neighbours are found by binary search on the sorted bounds and the existing
+gap closest to its current gap by binary search on the sorted gaps, so no
+pairwise comparison over the scope happens while moving.
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+SPACING_EQUAL = "EQUAL"    # gap to a neighbour equals an existing gap
+SPACING_CENTER = "CENTER"  # equal gaps to both neighbours
+
+
+@dataclass
+class SpacingMatch:
+    """A shift along *axis* that makes the moving box's spacing match."""
+    axis: int
+    shift: float                     # world units along *axis*
+    gap: float                       # the resulting (matched) gap
+    mode: str                        # SPACING_EQUAL / SPACING_CENTER
+    neighbour: int                   # box the moving gap is measured to
+    reference: Tuple[int, int]       # pair whose gap is matched (may repeat neighbour)
+    segments: List[Tuple[tuple, tuple]]  # gap lines to draw, after the shift
+
+
+def _overlap(a_min, a_max, b_min, b_max, axes) -> np.ndarray:
+    ok = np.ones(np.broadcast(a_min[..., 0], b_min[..., 0]).shape, dtype=bool)
+    for k in axes:
+        ok &= (a_min[..., k] <= b_max[..., k]) & (b_min[..., k] <= a_max[..., k])
+    return ok
+
+
+class GapIndex:
+    """Sorted box intervals and row gaps per axis.
+
+    *box_min* / *box_max* are ``(n, 3)`` world AABBs of the (non-moving)
+    scope objects.  *max_steps* bounds how far along the sorted order the
+    search for a row neighbour walks, both at build time and per query.
+    """
+
+    def __init__(self, box_min, box_max, owner_names: Sequence[str], max_steps: int = 32):
+        self.box_min = np.asarray(box_min, dtype=np.float64).reshape(-1, 3)
+        self.box_max = np.asarray(box_max, dtype=np.float64).reshape(-1, 3)
+        self.owner_names = list(owner_names)
+        self.max_steps = max_steps
+        n = len(self.box_min)
+        self.by_min = []     # per axis: ids sorted by lower bound
+        self.by_max = []     # per axis: ids sorted by upper bound
+        self.sorted_min = []  # per axis: lower bounds in by_min order
+        self.sorted_max = []  # per axis: upper bounds in by_max order
+        self.gaps = []       # per axis: sorted gap values
+        self.gap_pairs = []  # per axis: (g, 2) box ids (left, right)
+        for axis in range(3):
+            by_min = np.argsort(self.box_min[:, axis], kind="stable")
+            by_max = np.argsort(self.box_max[:, axis], kind="stable")
+            self.by_min.append(by_min)
+            self.by_max.append(by_max)
+            self.sorted_min.append(self.box_min[by_min, axis])
+            self.sorted_max.append(self.box_max[by_max, axis])
+            left, right = self._row_pairs(axis, by_min) if n > 1 else (np.empty(0, int),) * 2
+            gap = self.box_min[right, axis] - self.box_max[left, axis]
+            order = np.argsort(gap, kind="stable")
+            self.gaps.append(gap[order])
+            self.gap_pairs.append(np.column_stack((left[order], right[order])))
+
+    def __len__(self) -> int:
+        return len(self.box_min)
+
+    def _row_pairs(self, axis: int, by_min: np.ndarray):
+        """Each box paired with the first box starting after it in its row."""
+        others = [k for k in range(3) if k != axis]
+        n = len(by_min)
+        # First position (in min order) whose lower bound is past each box's end.
+        start = np.searchsorted(self.sorted_min[axis], self.box_max[:, axis], side="left")
+        found = np.full(n, -1, dtype=np.int64)
+        for step in range(self.max_steps):
+            pos = start + step
+            todo = np.flatnonzero((found < 0) & (pos < n))
+            if not len(todo):
+                break
+            cand = by_min[pos[todo]]
+            ok = _overlap(self.box_min[todo], self.box_max[todo],
+                          self.box_min[cand], self.box_max[cand], others)
+            found[todo[ok]] = cand[ok]
+        left = np.flatnonzero(found >= 0)
+        return left, found[left]
+
+    def neighbours(self, axis: int, box_min, box_max) -> Tuple[int, int]:
+        """Nearest row boxes fully before / after the box (``-1`` if none)."""
+        lo, hi = np.asarray(box_min, dtype=np.float64), np.asarray(box_max, dtype=np.float64)
+        others = [k for k in range(3) if k != axis]
+
+        def walk(order, start, stop, step):
+            for pos in range(start, stop, step):
+                j = int(order[pos])
+                if _overlap(lo, hi, self.box_min[j], self.box_max[j], others):
+                    return j
+            return -1
+
+        by_max, by_min = self.by_max[axis], self.by_min[axis]
+        p = int(np.searchsorted(self.sorted_max[axis], lo[axis], side="right"))
+        left = walk(by_max, p - 1, max(p - 1 - self.max_steps, -1), -1)
+        q = int(np.searchsorted(self.sorted_min[axis], hi[axis], side="left"))
+        right = walk(by_min, q, min(q + self.max_steps, len(by_min)), 1)
+        return left, right
+
+    def nearest_gap(self, axis: int, value: float) -> int:
+        """Position in ``gaps[axis]`` of the gap closest to *value* (``-1`` if none)."""
+        gaps = self.gaps[axis]
+        if not len(gaps):
+            return -1
+        i = int(np.searchsorted(gaps, value))
+        if i == len(gaps) or (i > 0 and value - gaps[i - 1] <= gaps[i] - value):
+            return i - 1
+        return i
+
+    def _gap_segment(self, axis: int, a_max: float, b_min: float, mid) -> Tuple[tuple, tuple]:
+        p0 = np.array(mid, dtype=np.float64)
+        p1 = p0.copy()
+        p0[axis], p1[axis] = a_max, b_min
+        return tuple(p0.tolist()), tuple(p1.tolist())
+
+    def _pair_segment(self, axis: int, a: int, b: int) -> Tuple[tuple, tuple]:
+        lo = np.maximum(self.box_min[a], self.box_min[b])
+        hi = np.minimum(self.box_max[a], self.box_max[b])
+        return self._gap_segment(axis, self.box_max[a, axis], self.box_min[b, axis], (lo + hi) * 0.5)
+
+    def matches(self, axis: int, box_min, box_max, max_shift: float) -> List[SpacingMatch]:
+        """Shifts within *max_shift* that give the box an equal spacing on *axis*."""
+        lo, hi = np.asarray(box_min, dtype=np.float64), np.asarray(box_max, dtype=np.float64)
+        left, right = self.neighbours(axis, lo, hi)
+        mid = (lo + hi) * 0.5
+        out: List[SpacingMatch] = []
+
+        def moved_segments(shift, nb_left, nb_right):
+            segs = []
+            if nb_left >= 0:
+                segs.append(self._gap_segment(axis, self.box_max[nb_left, axis],
+                                              lo[axis] + shift, mid))
+            if nb_right >= 0:
+                segs.append(self._gap_segment(axis, hi[axis] + shift,
+                                              self.box_min[nb_right, axis], mid))
+            return segs
+
+        for side, nb in (("left", left), ("right", right)):
+            if nb < 0:
+                continue
+            if side == "left":
+                current = lo[axis] - self.box_max[nb, axis]
+            else:
+                current = self.box_min[nb, axis] - hi[axis]
+            k = self.nearest_gap(axis, current)
+            if k < 0:
+                continue
+            gap = float(self.gaps[axis][k])
+            shift = gap - current if side == "left" else current - gap
+            if abs(shift) > max_shift:
+                continue
+            a, b = (int(x) for x in self.gap_pairs[axis][k])
+            segs = [self._pair_segment(axis, a, b)]
+            segs += moved_segments(shift, nb if side == "left" else -1,
+                                   nb if side == "right" else -1)
+            out.append(SpacingMatch(axis, float(shift), gap, SPACING_EQUAL, nb, (a, b), segs))
+
+        if left >= 0 and right >= 0:
+            g_left = lo[axis] - self.box_max[left, axis]
+            g_right = self.box_min[right, axis] - hi[axis]
+            shift = (g_right - g_left) * 0.5
+            gap = (g_left + g_right) * 0.5
+            if gap >= 0.0 and abs(shift) <= max_shift:
+                out.append(SpacingMatch(axis, float(shift), float(gap), SPACING_CENTER, right,
+                                        (left, right), moved_segments(shift, left, right)))
+        out.sort(key=lambda m: abs(m.shift))
+        return out
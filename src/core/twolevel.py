@@ -0,0 +1,288 @@
+"""Two-level snap index: an object box hierarchy over lazily built vertex indices.
+
+Building touches only object bounds, so it is O(objects).  A per-object
+:class:`~.index.SnapIndex` holding every vertex is built the first time a
+query region overlaps that object's box and kept in an :class:`~.lru.LRUCache`
+(shared across sessions when the caller supplies cache keys).
+"""
+
+import sys
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from .backends import _gather_ranges, morton_codes
+from .index import KIND_BOUNDS, KIND_POINT, HitSet, SnapIndex, query_range_multi
+from .lru import LRUCache
+
+
+class AabbTree:
+    """Packed box hierarchy over object bounds.
+
+    Objects are sorted along a Morton curve of their box centres and grouped
+    into leaves of *leaf_size*; upper levels merge *fanout* boxes each.
+    """
+
+    def __init__(self, box_min: np.ndarray, box_max: np.ndarray,
+                 leaf_size: int = 8, fanout: int = 8):
+        self.count = len(box_min)
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self._levels = []
+        if not self.count:
+            return
+        self._order = np.argsort(morton_codes((box_min + box_max) * 0.5), kind="stable")
+        self._min = box_min[self._order]
+        self._max = box_max[self._order]
+        starts = np.arange(0, self.count, leaf_size)
+        lo = np.minimum.reduceat(self._min, starts, axis=0)
+        hi = np.maximum.reduceat(self._max, starts, axis=0)
+        levels = [(lo, hi)]
+        while len(lo) > 1:
+            starts = np.arange(0, len(lo), fanout)
+            lo = np.minimum.reduceat(lo, starts, axis=0)
+            hi = np.maximum.reduceat(hi, starts, axis=0)
+            levels.append((lo, hi))
+        self._levels = levels[::-1]
+
+    def _query(self, overlaps) -> np.ndarray:
+        """Object ids whose box passes ``overlaps(lo, hi) -> bool mask``."""
+        if not self.count:
+            return np.empty(0, dtype=np.int64)
+        nodes = np.zeros(1, dtype=np.int64)
+        for depth, (lo, hi) in enumerate(self._levels):
+            if depth:
+                nodes = (nodes[:, None] * self.fanout + np.arange(self.fanout)).ravel()
+                nodes = nodes[nodes < len(lo)]
+            nodes = nodes[overlaps(lo[nodes], hi[nodes])]
+            if not len(nodes):
+                return np.empty(0, dtype=np.int64)
+        starts = nodes * self.leaf_size
+        counts = np.minimum(starts + self.leaf_size, self.count) - starts
+        slots = _gather_ranges(starts, counts)
+        slots = slots[overlaps(self._min[slots], self._max[slots])]
+        return np.sort(self._order[slots])
+
+    def query_sphere(self, center, radius: float) -> np.ndarray:
+        """Object ids whose box intersects the sphere (*center*, *radius*)."""
+        c = np.asarray(center, dtype=np.float64)
+        r2 = radius * radius
+        return self._query(lambda lo, hi: ((np.clip(c, lo, hi) - c) ** 2).sum(axis=1) <= r2)
+
+    def query_box(self, box_min, box_max) -> np.ndarray:
+        """Object ids whose box overlaps the axis-aligned box."""
+        qlo = np.asarray(box_min, dtype=np.float64)
+        qhi = np.asarray(box_max, dtype=np.float64)
+        return self._query(lambda lo, hi: np.all((lo <= qhi) & (hi >= qlo), axis=1))
+
+
+# Objects a single query may load; the rest of the overlapped ones answer
+# with their box corners until a later query loads them.
+MAX_LOADS_PER_QUERY = 8
+
+
+class TwoLevelIndex:
+    """Object-level box tree with on-demand full-resolution vertex indices.
+
+    *corners* are the ``(n, 8, 3)`` world-space bounding-box corners of the
+    scope objects.  ``loader(i)`` returns ``(points, excluded)`` for object *i*
+    when its vertices are first needed, *excluded* being an :class:`Exclusion`,
+    a boolean mask or ``None``; a third item, if present, is passed on as
+    the index's precomputed ``axis_order``.  ``cache_keys[i]``
+    (hashable, or ``None`` for "never share") selects the shared *cache*
+    slot; objects in *excluded_objects* are never returned at all.
+
+    *capacity* bounds the points held by the shared cache and this
+    session's uncached indices together (default: the cache's capacity);
+    loading an uncached object evicts shared entries to stay within it.
+    A query loads at most *max_loads* objects, nearest boxes first; other
+    overlapped objects that are not loaded yet contribute their box
+    corners (as BOUNDS), as in :meth:`axis_window`.
+    """
+
+    def __init__(self, corners: np.ndarray, owner_names: Sequence[str],
+                 loader: Callable[[int], tuple],
+                 cache_keys: Optional[Sequence] = None,
+                 cache: Optional[LRUCache] = None,
+                 excluded_objects: Sequence[int] = (),
+                 backend: str = "AUTO",
+                 capacity: Optional[int] = None,
+                 max_loads: int = MAX_LOADS_PER_QUERY):
+        self.corners = np.asarray(corners, dtype=np.float64).reshape(-1, 8, 3)
+        self.box_min = self.corners.min(axis=1)
+        self.box_max = self.corners.max(axis=1)
+        self.owner_names = list(owner_names)
+        self.tree = AabbTree(self.box_min, self.box_max)
+        self.backend = backend
+        self.loads = 0
+        self._loader = loader
+        self._keys = list(cache_keys) if cache_keys is not None else [None] * len(self.owner_names)
+        self._cache = cache
+        if capacity is None:
+            capacity = cache.capacity if cache is not None else sys.maxsize
+        self.capacity = int(capacity)
+        self.max_loads = max(int(max_loads), 1)
+        self._local = LRUCache(self.capacity)  # per-session indices (uncached objects)
+        self._touched: set = set()
+        self._skip = np.zeros(len(self.owner_names), dtype=bool)
+        self._skip[list(excluded_objects)] = True
+
+    # -- bookkeeping -----------------------------------------------------
+    @property
+    def backend_name(self) -> str:
+        return "TWO_LEVEL"
+
+    def __len__(self) -> int:
+        """Points currently loaded for this session."""
+        return sum(len(idx) for _i, idx in self._loaded())
+
+    def _loaded(self):
+        for i in sorted(self._touched):
+            idx = self._peek(i)
+            if idx is not None:
+                yield i, idx
+
+    def memory_breakdown(self) -> Dict[str, int]:
+        """Bytes of this session's loaded objects plus the object-level arrays."""
+        total = {"objects": self.corners.nbytes + self.box_min.nbytes + self.box_max.nbytes}
+        for _i, idx in self._loaded():
+            for key, value in idx.memory_breakdown().items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    @property
+    def owners(self) -> np.ndarray:
+        parts = [np.full(len(idx), i, dtype=np.int32) for i, idx in self._loaded()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    @property
+    def kinds(self) -> np.ndarray:
+        parts = [idx.kinds for _i, idx in self._loaded()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+
+    def _peek(self, i: int) -> Optional[SnapIndex]:
+        key = self._keys[i]
+        if key is None or self._cache is None:
+            return self._local.peek(i)
+        return self._cache.peek(key)
+
+    def object_index(self, i: int) -> SnapIndex:
+        """Full-resolution index of object *i*, loading it on first use."""
+        key = self._keys[i]
+        shared = key is not None and self._cache is not None
+        idx = self._cache.get(key) if shared else self._local.get(i)
+        if idx is None:
+            points, excluded, *axis_order = self._loader(i)
+            n = len(points)
+            idx = SnapIndex(points, np.full(n, KIND_POINT), np.zeros(n), [self.owner_names[i]],
+                            excluded=excluded, backend=self.backend,
+                            axis_order=axis_order[0] if axis_order else None)
+            self.loads += 1
+            if shared:
+                self._cache.put(key, idx, weight=max(n, 1))
+            else:
+                self._local.put(i, idx, weight=max(n, 1))
+            if self._cache is not None:
+                self._cache.trim(self.capacity - self._local.total)
+        self._touched.add(i)
+        return idx
+
+    @staticmethod
+    def _remap(hits: HitSet, i: int, owner_names) -> HitSet:
+        return HitSet(co=hits.co, dist=hits.dist, kind=hits.kind,
+                      owner=np.full(len(hits), i, dtype=np.int32), owner_names=owner_names)
+
+    # -- queries ---------------------------------------------------------
+    def query_range(self, center, radius: float) -> HitSet:
+        """Non-excluded vertices within *radius* of *center*, nearest first."""
+        return self._loaded_query(self.tree.query_sphere(center, radius), center,
+                                  lambda idx: idx.query_range(center, radius))
+
+    def query_range_multi(self, sources, radius: float) -> HitSet:
+        """Range query for several points at once (see :func:`query_range_multi`)."""
+        return query_range_multi(self, sources, radius)
+
+    def _loaded_query(self, ids: np.ndarray, origin, query) -> HitSet:
+        """Run *query* on the non-excluded objects *ids* and merge, nearest first.
+
+        Beyond ``max_loads`` unloaded objects (nearest to *origin* first),
+        *query* runs on the box corners of the others instead.
+        """
+        ids = ids[~self._skip[ids]]
+        cold = np.array([i for i in ids.tolist() if self._peek(i) is None], dtype=np.int64)
+        deferred = cold[:0]
+        if len(cold) > self.max_loads:
+            deferred = cold[np.argsort(self._box_d2(cold, origin), kind="stable")[self.max_loads:]]
+            ids = np.setdiff1d(ids, deferred)
+        parts = []
+        for i in ids.tolist():
+            hits = query(self.object_index(i))
+            if len(hits):
+                parts.append(self._remap(hits, i, self.owner_names))
+        if len(deferred):
+            corners = SnapIndex(self.corners[deferred].reshape(-1, 3),
+                                np.full(len(deferred) * 8, KIND_BOUNDS), np.repeat(deferred, 8),
+                                self.owner_names, backend=self.backend)
+            hits = query(corners)
+            parts.append(HitSet(co=hits.co, dist=hits.dist, kind=hits.kind, owner=hits.owner,
+                                owner_names=self.owner_names))
+        merged = HitSet.concat(parts, self.owner_names)
+        return merged.take(np.argsort(merged.dist, kind="stable"))
+
+    def _box_d2(self, ids: np.ndarray, origin) -> np.ndarray:
+        """Squared distance from *origin* to the boxes of objects *ids*."""
+        o = np.asarray(origin, dtype=np.float64).reshape(3)
+        gap = np.maximum(np.maximum(self.box_min[ids] - o, o - self.box_max[ids]), 0.0)
+        return (gap ** 2).sum(axis=1)
+
+    def _box_ids(self, origin, axis: int, half_axis: float, half_other: float) -> np.ndarray:
+        half = np.full(3, half_other, dtype=np.float64)
+        half[axis] = half_axis
+        o = np.asarray(origin, dtype=np.float64)
+        return self.tree.query_box(o - half, o + half)
+
+    def query_line(self, origin, axis: int, radius: float, half_length: float) -> HitSet:
+        """Cylinder query (see ``SnapIndex.query_line``), loading overlapped objects."""
+        ids = self._box_ids(origin, axis, half_length, radius)
+        return self._loaded_query(ids, origin,
+                                  lambda idx: idx.query_line(origin, axis, radius, half_length))
+
+    def query_slab(self, origin, axis: int, thickness: float, radius: float) -> HitSet:
+        """Slab query (see ``SnapIndex.query_slab``), loading overlapped objects."""
+        ids = self._box_ids(origin, axis, thickness, radius)
+        return self._loaded_query(ids, origin,
+                                  lambda idx: idx.query_slab(origin, axis, thickness, radius))
+
+    def axis_window(self, axis: int, value: float, threshold: float,
+                    limit: int = 5000) -> HitSet:
+        """Axis-clipping window over loaded vertices plus unloaded box corners.
+
+        Objects whose vertices are not loaded yet contribute their eight
+        bounding-box corners (as BOUNDS) instead of being loaded: a wide axis
+        window can span most of the scene.  At most *limit* hits, closest
+        along *axis* first.
+        """
+        lo, hi = value - threshold, value + threshold
+        span = ((self.box_min[:, axis] <= hi) & (self.box_max[:, axis] >= lo) & ~self._skip)
+        parts = []
+        unloaded = []
+        for i in np.flatnonzero(span).tolist():
+            idx = self._peek(i)
+            if idx is None:
+                unloaded.append(i)
+                continue
+            hits = idx.axis_window(axis, value, threshold, limit)
+            if len(hits):
+                parts.append(self._remap(hits, i, self.owner_names))
+        if unloaded:
+            co = self.corners[unloaded].reshape(-1, 3)
+            dist = np.abs(co[:, axis] - value)
+            keep = dist <= threshold
+            parts.append(HitSet(
+                co=co[keep], dist=dist[keep],
+                kind=np.full(int(keep.sum()), KIND_BOUNDS, dtype=np.uint8),
+                owner=np.repeat(np.asarray(unloaded, dtype=np.int32), 8)[keep],
+                owner_names=self.owner_names,
+            ))
+        merged = HitSet.concat(parts, self.owner_names)
+        return merged.take(np.argsort(merged.dist, kind="stable")[:limit])
@@ -0,0 +1,118 @@
+"""Occlusion filtering: cached per-view visibility of snap targets.
+
+Ray casts are the expensive part, so they run only for the best few scored
+candidates and every verdict is remembered per view and per point.  The
+view key is a rounded fingerprint of the view matrix: orbiting back to a
+view (or moving the mouse without touching the view) reuses the verdicts.
+The ray cast itself is supplied by the caller (``mathutils.bvhtree`` on the
+Blender side), which keeps this module Blender-free.
+"""
+
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+from .lru import LRUCache
+
+
+def view_key(matrix, decimals: int = 5) -> bytes:
+    """Hashable fingerprint of a 4x4 view matrix."""
+    m = np.round(np.asarray(matrix, dtype=np.float64).reshape(4, 4), decimals)
+    return (m + 0.0).tobytes()  # + 0.0 folds -0.0 into 0.0
+
+
+class VisibilityCache:
+    """Visibility verdicts per view key and per (quantised) point.
+
+    *max_views* views are kept, least recently used first out; *quantum*
+    is the world-space grid points are snapped to before lookup.
+    """
+
+    def __init__(self, max_views: int = 8, quantum: float = 1e-5):
+        self.quantum = float(quantum)
+        self._views = LRUCache(capacity=max_views)  # view key -> {point key: bool}
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._views.values())
+
+    def _point_keys(self, points) -> List[bytes]:
+        q = np.round(np.asarray(points, dtype=np.float64).reshape(-1, 3) / self.quantum)
+        return [row.tobytes() for row in q.astype(np.int64)]
+
+    def lookup(self, key: bytes, points) -> np.ndarray:
+        """Per point: ``1`` visible, ``0`` hidden, ``-1`` not known for this view."""
+        known = self._views.get(key)
+        keys = self._point_keys(points)
+        if known is None:
+            return np.full(len(keys), -1, dtype=np.int8)
+        return np.array([known.get(k, -1) for k in keys], dtype=np.int8)
+
+    def store(self, key: bytes, points, visible) -> None:
+        known = self._views.get(key)
+        if known is None:
+            known = {}
+            self._views.put(key, known)
+        known.update(zip(self._point_keys(points), (int(v) for v in visible)))
+
+    def resolve(self, key: bytes, points, cast: Callable) -> np.ndarray:
+        """Boolean visibility of *points*; only unknown ones go to ``cast``.
+
+        ``cast`` takes the ``(u, 3)`` unknown points and returns their
+        visibility; the result is stored under *key*.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        state = self.lookup(key, pts)
+        todo = np.flatnonzero(state < 0)
+        if len(todo):
+            fresh = np.asarray(cast(pts[todo]), dtype=bool)
+            self.store(key, pts[todo], fresh)
+            state[todo] = fresh
+        return state.astype(bool)
+
+    def clear(self) -> None:
+        self._views.clear()
+
+
+def segment_box_overlap(start, end, box_min, box_max) -> np.ndarray:
+    """Which boxes each segment passes through (slab test).
+
+    *start* / *end* are ``(k, 3)``, the boxes ``(n, 3)``; returns a
+    ``(k, n)`` boolean array.
+    """
+    p0 = np.asarray(start, dtype=np.float64).reshape(-1, 1, 3)
+    d = np.asarray(end, dtype=np.float64).reshape(-1, 1, 3) - p0
+    lo = np.asarray(box_min, dtype=np.float64).reshape(1, -1, 3)
+    hi = np.asarray(box_max, dtype=np.float64).reshape(1, -1, 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / d
+        t0 = (lo - p0) * inv
+        t1 = (hi - p0) * inv
+    # Axis-parallel segments: inside the slab for every t, or never.
+    flat = d == 0.0
+    inside = (p0 >= lo) & (p0 <= hi)
+    t_near = np.where(flat, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+    t_far = np.where(flat, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+    enter = np.maximum(t_near.max(axis=2), 0.0)
+    leave = np.minimum(t_far.min(axis=2), 1.0)
+    return enter <= leave
+
+
+def filter_visible(candidates: Sequence, is_visible: Callable, top_k: int = 4,
+                   max_checks: int = 16) -> list:
+    """Drop occluded candidates, testing only the best-scored ones.
+
+    *candidates* are sorted best first and carry a ``reference`` point.
+    They are tested in batches of *top_k* -- ``is_visible`` takes a
+    ``(k, 3)`` array and returns a boolean array -- until a batch contains
+    a visible one or *max_checks* have been tested.  Only candidates that
+    were tested and found visible are returned, in the original order.
+    """
+    out = []
+    for start in range(0, min(len(candidates), max_checks), top_k):
+        batch = candidates[start:min(start + top_k, max_checks)]
+        refs = np.array([c.reference for c in batch], dtype=np.float64).reshape(-1, 3)
+        ok = np.asarray(is_visible(refs), dtype=bool)
+        out.extend(c for c, v in zip(batch, ok) if v)
+        if out:
+            break
+    return out
@@ -0,0 +1,71 @@
+"""Frame-time watchdog: trade snap quality for responsiveness while moving.
+
+Every mouse event runs one snap search.  In a heavy scene that search can
+take longer than a frame, and the move lags behind the cursor.  A
+:class:`FrameWatchdog` is fed the duration of each search and steps down
+through :data:`QUALITY_TIERS` -- a smaller search radius, a coarser detail
+level, finally fewer searches per second -- while the median of the last
+few searches is over the target, and back up once their average has
+stayed well under it.  Changes need a few samples at the current tier
+first, and the median ignores one slow event (a lazy two-level load, a BVH
+built on first use).
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Sequence
+
+DOWN_SAMPLES = 3   # median of this many events over the target: step down
+UP_SAMPLES = 12    # ... this many under HEADROOM * target: step up
+HEADROOM = 0.5
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    name: str
+    radius_scale: float   # times the search radius
+    lod_scale: float      # times the detail-level cell (flat layout with LOD)
+    min_interval: float   # seconds between searches (0 = every event)
+
+
+QUALITY_TIERS = (
+    QualityTier("Full", 1.0, 1.0, 0.0),
+    QualityTier("Reduced", 0.6, 2.0, 0.0),
+    QualityTier("Low", 0.35, 4.0, 0.0),
+    QualityTier("Minimal", 0.2, 8.0, 1.0 / 15.0),
+)
+
+
+class FrameWatchdog:
+    """Pick a :class:`QualityTier` from measured search times.
+
+    *target* is the per-search budget in seconds.  :meth:`record` returns
+    ``True`` when the tier changed; samples taken at the old tier are
+    dropped then, so the new tier is judged on its own timings.
+    """
+
+    def __init__(self, target: float, tiers: Sequence[QualityTier] = QUALITY_TIERS):
+        self.target = float(target)
+        self.tiers = tuple(tiers)
+        self.level = 0
+        self._samples = deque(maxlen=UP_SAMPLES)
+
+    @property
+    def tier(self) -> QualityTier:
+        return self.tiers[self.level]
+
+    def record(self, seconds: float) -> bool:
+        self._samples.append(float(seconds))
+        recent = sorted(list(self._samples)[-DOWN_SAMPLES:])
+        if (self.level + 1 < len(self.tiers) and len(recent) == DOWN_SAMPLES
+                and recent[DOWN_SAMPLES // 2] > self.target):
+            return self._step(1)
+        if (self.level > 0 and len(self._samples) == UP_SAMPLES
+                and sum(self._samples) / UP_SAMPLES < HEADROOM * self.target):
+            return self._step(-1)
+        return False
+
+    def _step(self, delta: int) -> bool:
+        self.level += delta
+        self._samples.clear()
+        return True
@@ -1,18 +1,33 @@
-"""KD-Tree construction (build) and nearest-neighbour query (find) logic.
+"""Blender adapter around the snap core: build (extract) and find (query).
 
-The tree is built once at invoke time and stays static for the entire modal
+The index is built once at invoke time and stays static for the entire modal
 session.  A vertex budget controls how many raw vertices are inserted; objects
-that would blow the budget fall back to bounding-box corners + origin.
+that would blow the budget fall back to bounding-box corners + origin.  An
+optional memory cap (MB) tightens that budget using the per-point cost of the
+chosen backend.
+
+Everything after extraction -- the spatial backend, axis orderings and
+candidate scoring -- lives in the Blender-free :mod:`.core` package; this
+module only turns scene data into arrays and results back into ``Vector``s.
 """
 
-import bisect
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-from mathutils import Vector, kdtree
+import numpy as np
+from mathutils import Vector
 
+from . import cache, core
+from .occlusion import Occluders, static_part_bvh
 from .prefs import get_addon_prefs
-from .utils import object_center_world, world_to_screen
+from .utils import (
+    mesh_edge_vertices,
+    mesh_vertex_coords,
+    object_bound_arrays,
+    object_center_world,
+    view_projection,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -24,8 +39,10 @@ class SnapCandidate:
     """A single snap target returned by *find_candidates*.
 
     type values:
-      POINT / BOUNDS                - regular proximity snap
+      POINT / BOUNDS / FACE         - regular proximity snap
       ALIGN_X / ALIGN_Y / ALIGN_Z  - axis-clipping mode
+      ALIGN_XZ / ALIGN_XYZ / ...   - combined multi-axis alignment
+      SPACING_X / _Y / _Z          - equal-spacing guide along that axis
     """
     type: str
     location: Vector     # world-space snap destination
@@ -33,166 +50,935 @@ class SnapCandidate:
     screen_dist: float   # distance from mouse cursor in pixels
     score: float         # priority (lower = better)
     target_name: str = ""
+    source_co: Optional[Vector] = None  # source-point snapping: the moving point
+    references: List[Vector] = field(default_factory=list)  # multi-axis: one per axis
+    segments: List[tuple] = field(default_factory=list)  # equal spacing: (Vector, Vector) gaps
 
 
 @dataclass
 class _PointMeta:
-    """Per-point metadata stored alongside the KD-Tree."""
+    """Per-point metadata, materialised on demand from the index arrays."""
     obj_name: str
-    point_type: str  # 'POINT' or 'BOUNDS'
+    point_type: str  # 'POINT', 'BOUNDS' or 'MIDPOINT'
+    owner_names: List[str] = field(default_factory=list)  # obj_name, then merged owners
 
 
 @dataclass
 class BuildResult:
-    """Everything produced by *build_spatial_tree*."""
-    tree: Optional[kdtree.KDTree] = None
-    point_meta: List[_PointMeta] = field(default_factory=list)
-    point_count: int = 0
+    """Everything produced by *build_spatial_tree*.
+
+    ``index`` is a flat ``core.SnapIndex`` or, with the two-level layout, a
+    ``core.TwoLevelIndex``; both answer ``query_range`` / ``axis_window``.
+    """
+    index: "core.SnapIndex | core.TwoLevelIndex | None" = None
+    edges: "core.EdgeIndex | None" = None  # edge targets (flat layout only)
+    lod: "core.LodIndex | None" = None     # coarser detail levels (flat layout only)
     source_vertex_count: int = 0
     limit_exceeded: bool = False
     bounds_objects: List[str] = field(default_factory=list)
-    # Stored points + sorted axis arrays for axis-clipping mode
-    points: list = field(default_factory=list)
-    axis_x: list = field(default_factory=list)  # [(x_val, point_idx), ...]
-    axis_y: list = field(default_factory=list)
-    axis_z: list = field(default_factory=list)
-    # Point indices belonging to the active object (excluded from snap)
-    exclude_indices: set = field(default_factory=set)
+    memory_limited: bool = False
+
+    @property
+    def point_count(self) -> int:
+        return len(self.index) if self.index is not None else 0
+
+    @property
+    def backend_name(self) -> str:
+        return self.index.backend_name if self.index is not None else ""
+
+    @property
+    def memory_breakdown(self) -> dict:
+        """Bytes per index component (see ``SnapIndex.memory_breakdown``)."""
+        if self.index is None:
+            return {}
+        parts = self.index.memory_breakdown()
+        for extra in (self.edges, self.lod):
+            if extra is not None:
+                parts.update(extra.memory_breakdown())
+        return parts
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(self.memory_breakdown.values())
+
+    @property
+    def point_meta(self) -> List[_PointMeta]:
+        """Per-point ``_PointMeta`` list (diagnostics / tests only)."""
+        if self.index is None:
+            return []
+        index = self.index
+        names = index.owner_names
+        shared = getattr(index, "shared", None)
+        extra = {}
+        if shared is not None:
+            for k, pid in enumerate(shared.ids.tolist()):
+                extra[pid] = shared.owners[shared.indptr[k]:shared.indptr[k + 1]].tolist()
+        return [
+            _PointMeta(obj_name=names[o], point_type=core.KIND_NAMES[k],
+                       owner_names=[names[x] for x in [o] + extra.get(i, [])])
+            for i, (o, k) in enumerate(zip(index.owners.tolist(), index.kinds.tolist()))
+        ]
 
 
 # ---------------------------------------------------------------------------
 # Scope collection
 # ---------------------------------------------------------------------------
 
-def _collect_scope_objects(context, active_obj):
-    """Return mesh objects that match the current Target Scope setting."""
+def _scope_members(context, active_obj):
+    """Objects of any type that match the current Target Scope setting."""
     scene = context.scene
     scope = scene.target_scope
 
     if scope == "SELF":
-        if active_obj and active_obj.type == "MESH":
-            return [active_obj]
-        return []
+        return [active_obj] if active_obj else []
 
     if scope == "SELECTED":
-        return [
-            obj for obj in context.selected_objects
-            if obj.type == "MESH" and obj is not active_obj
-        ]
+        return [obj for obj in context.selected_objects if obj is not active_obj]
 
     if scope == "COLLECTION":
         coll = scene.target_collection
-        if coll:
-            return [obj for obj in coll.objects if obj.type == "MESH"]
-        return []
+        return list(coll.objects) if coll else []
 
     # VISIBLE (default)
-    return [obj for obj in context.visible_objects if obj.type == "MESH"]
+    return list(context.visible_objects)
+
+
+def moving_selection(context, active_obj) -> list:
+    """Objects that move with *active_obj* in Object Mode, active first.
+
+    The selection moves together, except with the Selected target scope,
+    where the other selected objects are the snap targets.  Objects whose
+    parent also moves are skipped (they follow it already).
+    """
+    if context.scene.target_scope == "SELECTED":
+        objs = [active_obj]
+    else:
+        objs = [active_obj] + [o for o in context.selected_objects if o != active_obj]
+    ptrs = {o.as_pointer() for o in objs}
+    return [o for o in objs if o == active_obj or not _moves_with(o.parent, ptrs)]
+
+
+def _moves_with(obj, ptrs) -> bool:
+    """Whether *obj* or one of its parents is in *ptrs* (object pointers).
+
+    Children follow a moving parent, so they move too even when only the
+    parent is listed (``moving_selection`` drops them).
+    """
+    while obj is not None:
+        if obj.as_pointer() in ptrs:
+            return True
+        obj = obj.parent
+    return False
+
+
+def _collect_scope_objects(context, active_obj, overrides: "_Overrides | None" = None):
+    """Return mesh objects that match the current Target Scope setting.
+
+    With *overrides*, objects whose snap override is Exclude are left out.
+    """
+    objs = [obj for obj in _scope_members(context, active_obj) if obj.type == "MESH"]
+    return objs if overrides is None else overrides.targets(objs)
+
+
+# ---------------------------------------------------------------------------
+# Snap overrides
+# ---------------------------------------------------------------------------
+
+OVERRIDE_FULL, OVERRIDE_BOUNDS, OVERRIDE_EXCLUDE = "FULL", "BOUNDS", "EXCLUDE"
+
+
+def _override_value(id_data) -> "tuple | None":
+    """``(mode, priority, vertex_cap, vertex_subset)`` set on *id_data*, or
+    ``None`` if all default."""
+    group = getattr(id_data, "smartclip_override", None)
+    if group is None:
+        return None
+    value = (group.mode, group.priority, group.vertex_cap, group.vertex_subset)
+    return None if value == ("DEFAULT", 1.0, 0, "") else value
+
+
+class _Overrides:
+    """Snap overrides of objects, falling back to their collections'.
+
+    An object's own override wins; otherwise the override of the nearest
+    collection holding it, where a collection without one inherits its
+    parent's.  Only collections that carry an override have their members
+    visited, so scenes without any cost one read per object.
+    """
+
+    def __init__(self, scene):
+        self._inherited: dict = {}  # object pointer -> override value
+
+        def walk(coll, inherited):
+            value = _override_value(coll) or inherited
+            if value is not None:
+                for obj in coll.objects:
+                    self._inherited.setdefault(obj.as_pointer(), value)
+            for child in coll.children:
+                walk(child, value)
+
+        for child in scene.collection.children:
+            walk(child, None)
+
+    def of(self, obj) -> "tuple | None":
+        value = _override_value(obj)
+        return value if value is not None else self._inherited.get(obj.as_pointer())
+
+    def targets(self, objs) -> list:
+        """*objs* without the excluded ones."""
+        return [obj for obj in objs if (self.of(obj) or ("",))[0] != OVERRIDE_EXCLUDE]
+
+    def arrays(self, objs):
+        """``(always_full, bounds_only, priority, vertex_cap)`` arrays over *objs*."""
+        n = len(objs)
+        always_full = np.zeros(n, dtype=bool)
+        bounds_only = np.zeros(n, dtype=bool)
+        priority = np.ones(n)
+        caps = np.zeros(n, dtype=np.int64)
+        for i, obj in enumerate(objs):
+            value = self.of(obj)
+            if value is not None:
+                mode, priority[i], caps[i], _subset = value
+                always_full[i] = mode == OVERRIDE_FULL
+                bounds_only[i] = mode == OVERRIDE_BOUNDS
+        return always_full, bounds_only, priority, caps
+
+    def subsets(self, objs) -> dict:
+        """Object pointer -> vertex subset name, for *objs* that have one."""
+        out = {}
+        for obj in objs:
+            value = self.of(obj)
+            if value is not None and value[3]:
+                out[obj.as_pointer()] = value[3]
+        return out
+
+
+class _InstanceSet:
+    """Mesh instances (collection instances, Geometry Nodes) in the scope.
+
+    One pass over ``depsgraph.object_instances`` records each instance's
+    world matrix and which unique mesh it shows.  The local points of each
+    unique mesh are read once and cached in ``cache.evaluated_coords``; no
+    evaluated data is kept past the build (the depsgraph re-evaluates while
+    moving).  Instances of objects in *moving*, or of their children, are
+    flagged as moving.
+    """
+
+    def __init__(self, depsgraph, instancers, frame: int, moving=()):
+        allowed = {obj.as_pointer() for obj in instancers}
+        moving_ptrs = {obj.as_pointer() for obj in moving}
+        rows: dict = {}      # evaluated mesh pointer -> unique mesh row
+        labels: dict = {}    # (instancer pointer, row) -> owner name
+        self.coords: List[np.ndarray] = []  # per unique mesh, local (n, 3)
+        self.keys: List[tuple] = []          # per unique mesh, cache key
+        self.orders: list = []               # per unique mesh, disk-cached orderings
+        parent_rows: dict = {}  # instancer pointer -> row in ``parents``
+        self.parents: list = []  # unique instancer objects
+        mesh_ids, parent_ids, mats, names, flags = [], [], [], [], []
+        for inst in depsgraph.object_instances:
+            if not inst.is_instance or inst.object.type != "MESH" or inst.parent is None:
+                continue
+            parent = inst.parent.original
+            ptr = parent.as_pointer()
+            if ptr not in allowed:
+                continue
+            mesh = inst.object.data
+            row = rows.get(mesh.as_pointer())
+            if row is None:
+                row = rows[mesh.as_pointer()] = len(self.coords)
+                src = inst.object.original
+                key = ("INSTANCE", src.name_full, mesh.name_full, len(mesh.vertices),
+                       cache.geometry_generation(src), frame)
+                self.keys.append(key)
+                arrays = None if src.modifiers else cache.linked_arrays(mesh.original)
+                if arrays is not None and len(arrays["coords"]) == len(mesh.vertices):
+                    self.coords.append(arrays["coords"])
+                    self.orders.append(_orders_of(arrays))
+                else:
+                    self.coords.append(self._mesh_coords(key, mesh))
+                    self.orders.append(None)
+            label = labels.get((ptr, row))
+            if label is None:
+                label = labels[(ptr, row)] = f"{parent.name} > {inst.object.original.name}"
+            mesh_ids.append(row)
+            parent_row = parent_rows.get(ptr)
+            if parent_row is None:
+                parent_row = parent_rows[ptr] = len(self.parents)
+                self.parents.append(parent)
+            parent_ids.append(parent_row)
+            mats.append(np.array(inst.matrix_world, dtype=np.float64))  # copy now
+            names.append(label)
+            flags.append(_moves_with(parent, moving_ptrs))
+        self.mesh_ids = np.array(mesh_ids, dtype=np.int64)
+        self.parent_ids = np.array(parent_ids, dtype=np.int64)
+        self.matrices = np.array(mats, dtype=np.float64).reshape(-1, 4, 4)
+        self.names = names
+        self.moving = np.array(flags, dtype=bool)
+        # Local box corners per unique mesh (every min/max combination)
+        empty = np.zeros(3)
+        lo = np.array([p.min(axis=0) if len(p) else empty for p in self.coords]).reshape(-1, 3)
+        hi = np.array([p.max(axis=0) if len(p) else empty for p in self.coords]).reshape(-1, 3)
+        pick = np.array([[a, b, c] for a in (0, 1) for b in (0, 1) for c in (0, 1)])
+        self.local_corners = np.stack((lo, hi), axis=1)[:, pick, np.arange(3)]
+        self.vertex_counts = np.array([len(pts) for pts in self.coords], dtype=np.int64)
+
+    @staticmethod
+    def _mesh_coords(key: tuple, mesh) -> np.ndarray:
+        pts = cache.evaluated_coords.get(key)
+        if pts is None:
+            pts = mesh_vertex_coords(mesh)
+            cache.evaluated_coords.put(key, pts, weight=max(len(pts), 1))
+        return pts
+
+    def __len__(self) -> int:
+        return len(self.mesh_ids)
+
+    def instance_coords(self, k: int) -> np.ndarray:
+        return self.coords[self.mesh_ids[k]]
+
+    def instance_orders(self, k: int) -> "tuple | None":
+        return self.orders[self.mesh_ids[k]]
 
 
 # ---------------------------------------------------------------------------
 # Build
 # ---------------------------------------------------------------------------
 
+def _selection_array(vert_indices) -> np.ndarray:
+    if isinstance(vert_indices, np.ndarray):
+        return vert_indices
+    return np.fromiter(vert_indices, dtype=np.int64, count=len(vert_indices))
+
+
+def _moving_slots(candidates, moving_objects) -> np.ndarray:
+    """Indices into *candidates* of the objects in *moving_objects* and
+    their children."""
+    ptrs = {obj.as_pointer() for obj in moving_objects}
+    return np.array([i for i, obj in enumerate(candidates) if _moves_with(obj, ptrs)],
+                    dtype=np.int64)
+
+
+def _orders_of(arrays: dict) -> tuple:
+    return arrays["order_x"], arrays["order_y"], arrays["order_z"]
+
+
+class _MeshSource:
+    """Where vertex data is read from: original meshes, or evaluated ones.
+
+    With a *depsgraph*, objects with modifiers (and not in Edit Mode, whose
+    selection indices refer to the original mesh) are read from their
+    evaluated mesh.  Evaluated coordinates are cached in
+    ``cache.evaluated_coords`` until the object changes.
+
+    *subsets* maps object pointers to the name of a boolean point attribute
+    or vertex group; only those vertices are read for such objects (not in
+    Edit Mode), and their edges are kept when both ends are.
+    """
+
+    def __init__(self, depsgraph=None, frame: int = 0, subsets: "dict | None" = None):
+        self.depsgraph = depsgraph
+        self.frame = frame
+        self.subsets = subsets or {}
+
+    def evaluated(self, obj) -> bool:
+        return self.depsgraph is not None and bool(obj.modifiers) and obj.mode != "EDIT"
+
+    def mesh(self, obj):
+        return obj.evaluated_get(self.depsgraph).data if self.evaluated(obj) else obj.data
+
+    def subset(self, obj) -> "np.ndarray | None":
+        """Mask of the vertices *obj* contributes, ``None`` for all of them."""
+        name = self.subsets.get(obj.as_pointer())
+        if name is None or obj.mode == "EDIT":
+            return None
+        frame = self.frame if self.evaluated(obj) else None
+        return cache.vertex_mask(obj, self.mesh(obj), name, frame)
+
+    def vertex_count(self, obj) -> int:
+        mask = self.subset(obj)
+        if mask is not None:
+            return int(np.count_nonzero(mask))
+        if self.evaluated(obj):
+            pts = cache.evaluated_coords.peek(cache.evaluated_key(obj, self.frame))
+            if pts is not None:
+                return len(pts)
+        return len(self.mesh(obj).vertices)
+
+    def coords(self, obj) -> np.ndarray:
+        """Local vertex coordinates, ``(n, 3)`` float32."""
+        mask = self.subset(obj)
+        if mask is not None:
+            return self._all_coords(obj)[mask]
+        return self._all_coords(obj)
+
+    def _all_coords(self, obj) -> np.ndarray:
+        if not self.evaluated(obj):
+            pts = cache.linked_coords(obj.data)
+            return mesh_vertex_coords(obj.data) if pts is None else pts
+        key = cache.evaluated_key(obj, self.frame)
+        pts = cache.evaluated_coords.get(key)
+        if pts is None:
+            pts = mesh_vertex_coords(self.mesh(obj))
+            cache.evaluated_coords.put(key, pts, weight=max(len(pts), 1))
+        return pts
+
+    def axis_orders(self, obj) -> "tuple | None":
+        """Local per-axis orderings, when the disk cache holds them."""
+        if self.evaluated(obj) or obj.as_pointer() in self.subsets:
+            return None
+        arrays = cache.linked_arrays(obj.data)
+        return None if arrays is None else _orders_of(arrays)
+
+    def edges(self, obj) -> np.ndarray:
+        """Vertex pairs of *obj*'s edges, renumbered to its subset if it has one."""
+        pairs = mesh_edge_vertices(self.mesh(obj))
+        mask = self.subset(obj)
+        if mask is None:
+            return pairs
+        renumber = np.cumsum(mask) - 1
+        return renumber[pairs[mask[pairs].all(axis=1)]].astype(np.int32)
+
+    def edge_count(self, obj) -> int:
+        if obj.as_pointer() in self.subsets:
+            return len(self.edges(obj))
+        return len(self.mesh(obj).edges)
+
+    def cache_key(self, obj) -> tuple:
+        """``cache.object_key`` extended for evaluated data and subsets."""
+        key = cache.object_key(obj)
+        if self.evaluated(obj):
+            key += ("EVALUATED", self.frame)
+        name = self.subsets.get(obj.as_pointer())
+        return key + ("SUBSET", name) if name is not None else key
+
+
+class _Slots:
+    """Index owners: the scope mesh objects, then the mesh instances.
+
+    Gives every owner slot a name, world box and matrix, and reads its
+    local points through *source* (objects) or *instances*.
+    """
+
+    def __init__(self, objects, source: _MeshSource,
+                 instances: "_InstanceSet | None" = None):
+        self.objects = objects
+        self.source = source
+        self.instances = instances if instances is not None and len(instances) else None
+        self.corners, self.matrices = object_bound_arrays(objects)
+        self.names = [obj.name for obj in objects]
+        if self.instances is not None:
+            inst = self.instances
+            self.corners = np.concatenate((self.corners, inst.local_corners[inst.mesh_ids]))
+            self.matrices = np.concatenate((self.matrices, inst.matrices))
+            self.names += inst.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def is_object(self, i: int) -> bool:
+        return i < len(self.objects)
+
+    def coords(self, i: int) -> np.ndarray:
+        """Local points of slot *i*."""
+        if self.is_object(i):
+            return self.source.coords(self.objects[i])
+        return self.instances.instance_coords(i - len(self.objects))
+
+    def axis_orders(self, i: int) -> "tuple | None":
+        """Local per-axis orderings of slot *i* (disk-cached linked meshes only)."""
+        if self.is_object(i):
+            return self.source.axis_orders(self.objects[i])
+        return self.instances.instance_orders(i - len(self.objects))
+
+    def vertex_counts(self) -> np.ndarray:
+        counts = np.fromiter((self.source.vertex_count(obj) for obj in self.objects),
+                             dtype=np.int64, count=len(self.objects))
+        if self.instances is not None:
+            counts = np.concatenate(
+                (counts, self.instances.vertex_counts[self.instances.mesh_ids]))
+        return counts
+
+    def edge_counts(self) -> np.ndarray:
+        """Edges per slot (instances contribute points only)."""
+        counts = np.zeros(len(self), dtype=np.int64)
+        counts[:len(self.objects)] = [self.source.edge_count(obj) for obj in self.objects]
+        return counts
+
+    def override_masks(self, overrides: _Overrides, vertex_counts: np.ndarray):
+        """``(always_full, bounds_only, priority)`` per slot.
+
+        Instances follow their instancer's override; slots with more
+        vertices than their override's cap are bounds-only.
+        """
+        arrays = overrides.arrays(self.objects)
+        if self.instances is not None:
+            inst = self.instances
+            per_parent = overrides.arrays(inst.parents)
+            arrays = [np.concatenate((a, p[inst.parent_ids])) for a, p in zip(arrays, per_parent)]
+        always_full, bounds_only, priority, caps = arrays
+        bounds_only |= (caps > 0) & (vertex_counts > caps)
+        return always_full & ~bounds_only, bounds_only, priority
+
+    def moving_slots(self, moving_objects) -> np.ndarray:
+        ids = _moving_slots(self.objects, moving_objects)
+        if self.instances is not None:
+            ids = np.concatenate((ids, len(self.objects) + np.flatnonzero(self.instances.moving)))
+        return ids
+
+    def cache_key(self, i: int) -> tuple:
+        if self.is_object(i):
+            return self.source.cache_key(self.objects[i])
+        k = i - len(self.objects)
+        inst = self.instances
+        return inst.keys[inst.mesh_ids[k]] + (cache.matrix_fingerprint(inst.matrices[k]),)
+
+
+def _build_two_level(slots: _Slots, moving_vert_indices, moving_ids,
+                     backend, cache_capacity) -> BuildResult:
+    """Object box tree now; per-object vertex indices on first overlap.
+
+    Only ``bound_box`` and ``matrix_world`` are read here.  Vertex indices are
+    shared through ``cache.object_indices`` across invocations, except for
+    objects in Edit Mode (their selection is excluded and their data live).
+    Objects in *moving_ids* are excluded as a whole.  Linked meshes in the
+    disk cache bring their axis orderings along (see ``cache.linked_arrays``).
+    The Edit Mode indices count against *cache_capacity* too, and each query
+    loads a bounded number of objects (``core.TwoLevelIndex``).
+    """
+    world_corners = core.transform_corners(slots.corners, slots.matrices)
+
+    keys = [None if slots.is_object(i) and name in moving_vert_indices else slots.cache_key(i)
+            for i, name in enumerate(slots.names)]
+    excluded_objects = moving_ids.tolist()
+
+    def loader(i):
+        pts = core.transform_points(slots.coords(i), slots.matrices[i])
+        skip = None
+        sel = moving_vert_indices.get(slots.names[i]) if slots.is_object(i) else None
+        if sel is not None:
+            skip = core.Exclusion()
+            skip.add_selection(0, len(pts), _selection_array(sel))
+        # Disk-cached orderings survive scale + translation (no rotation)
+        orders = slots.axis_orders(i)
+        if orders is not None:
+            orders = core.transformed_axis_orders(orders, slots.matrices[i])
+        return pts, skip, orders
+
+    cache.object_indices.capacity = cache_capacity
+    cache.object_indices.trim()
+    index = core.TwoLevelIndex(
+        world_corners,
+        slots.names,
+        loader,
+        cache_keys=keys,
+        cache=cache.object_indices,
+        excluded_objects=excluded_objects,
+        backend=backend,
+    )
+    return BuildResult(
+        index=index,
+        source_vertex_count=int(slots.vertex_counts().sum()),
+    )
+
+
+def _memory_point_cap(prefs, backend: str, edge_share: float = 0.0, lod: bool = False):
+    """Points allowed by the ``max_index_memory_mb`` preference (None = no cap).
+
+    *edge_share*: fraction of the points that are edge midpoints, whose
+    edges cost extra memory; *lod*: detail levels are built on top.
+    """
+    mb = getattr(prefs, "max_index_memory_mb", 0)
+    if mb <= 0:
+        return None
+    return core.points_for_memory(mb, backend, edge_share, lod)
+
+
 def build_spatial_tree(context, active_obj=None,
-                       moving_vert_indices: "set[int] | None" = None) -> BuildResult:
-    """Build a static KD-Tree of snap reference points.
+                       moving_vert_indices: "set[int] | dict | None" = None,
+                       moving_objects=None, edges: bool = False,
+                       pool: "core.BuildPool | None" = None) -> BuildResult:
+    """Build a static snap index of reference points.
 
     Objects are sorted by distance from *active_obj* (nearest first).  Vertices
     are inserted until the budget is exhausted; remaining objects contribute
-    only their bounding-box corners and origin.
+    only their bounding-box corners and origin.  With the two-level layout
+    preference there is no budget: see *_build_two_level*.  When a memory cap
+    is set, the budget (or the lazy cache size) is lowered so the estimated
+    index size stays within it.
 
     *moving_vert_indices*: if provided (Edit Mode), only these mesh vertex
-    indices of *active_obj* are excluded from snap candidates.  If ``None``
-    (Object Mode), **all** vertices of *active_obj* are excluded.
+    indices are excluded from snap candidates -- either a set for
+    *active_obj*, or a dict mapping each object in Edit Mode (by name) to its
+    selected indices.  Edit Mode objects must have been synced with
+    ``update_from_editmode`` so ``mesh.vertices`` is current.  If ``None``
+    (Object Mode), **all** vertices of every object in *moving_objects*
+    (default: just *active_obj*) are excluded, each as one index range.
+
+    With the ``use_evaluated_mesh`` preference, objects with modifiers are
+    read from their evaluated mesh (see *_MeshSource*).  With
+    ``use_disk_cache``, meshes linked from library files are read from the
+    on-disk cache (extracted and written on first use).
+
+    With the ``include_instances`` preference, collection and Geometry
+    Nodes instances of scope objects become owners too (see
+    *_InstanceSet*); they are budgeted like objects, so far ones are
+    bounds-only.
+
+    Snap overrides on objects and collections (see *_Overrides*) steer the
+    budget: Always Full objects get their vertices first, Bounds Only ones
+    never do, a priority weight scales the distance an object competes at
+    and a vertex cap makes larger objects bounds-only.  Excluded objects are
+    left out entirely (the two-level layout honours only this one).
+
+    With *edges* (flat layout), objects with full vertex data also add
+    their edge midpoints to the index (counted against the budget) and
+    their edges to ``BuildResult.edges``; edges with a moving end are left
+    out.  With the ``use_lod_index`` preference (flat layout), coarser
+    detail levels are built over the index into ``BuildResult.lod``.
+
+    With a *pool*, the flat index's transforms, sorts and backend are
+    spread over its worker threads; see also *submit_spatial_tree*.
+    """
+    return _prepare_spatial_tree(context, active_obj, moving_vert_indices,
+                                 moving_objects, edges)(pool)
+
+
+def submit_spatial_tree(pool: "core.BuildPool", context, active_obj=None,
+                        moving_vert_indices=None, moving_objects=None,
+                        edges: bool = False) -> Future:
+    """*build_spatial_tree* in the background: a ``Future`` of its ``BuildResult``.
+
+    Meshes are read here, on the calling (main) thread; the flat index is
+    assembled on *pool*.  The two-level layout loads objects lazily from
+    ``bpy`` while moving, so its (cheap) build completes here.
+    """
+    return pool.submit(_prepare_spatial_tree(context, active_obj, moving_vert_indices,
+                                             moving_objects, edges), pool)
+
+
+_pool = None  # core.BuildPool shared by all builds
+
+
+def build_pool(workers: int = 0) -> "core.BuildPool":
+    """The shared build pool (*workers* 0 = one per core, up to 32)."""
+    global _pool
+    if _pool is not None and workers and _pool.workers != workers:
+        shutdown_build_pool()
+    if _pool is None:
+        _pool = core.BuildPool(workers or None)
+    return _pool
+
+
+def shutdown_build_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def _ready(result: BuildResult):
+    return lambda pool=None: result
+
+
+# Vertices, as a share of the budget, read for objects that only fit once
+# merging has freed room (see *_spare_slots*).
+MERGE_SPARE_SHARE = 0.5
+
+
+def _spare_slots(bounds_ids, d2, counts, budget: int, bounds_only, priority) -> np.ndarray:
+    """Bounds-only slots to read anyway, in case merging frees their room.
+
+    The allocation charges every vertex, but coincident vertices collapse
+    into one point, and by how much is only known once the points are in
+    world space (on the assembling thread).  The nearest left-out slots --
+    priority-weighted, as in the allocation -- are read up to
+    ``MERGE_SPARE_SHARE`` of the budget; ``core.plan_flat_merge`` takes
+    those that fit.
+    """
+    ids = bounds_ids[~bounds_only[bounds_ids] & (counts[bounds_ids] <= budget)]
+    ids = ids[np.argsort(d2[ids] / np.square(np.maximum(priority[ids], 1e-6)), kind="stable")]
+    return ids[np.cumsum(counts[ids]) <= MERGE_SPARE_SHARE * budget]
+
+
+def _prepare_spatial_tree(context, active_obj, moving_vert_indices, moving_objects, edges):
+    """Read everything *build_spatial_tree* needs from Blender.
+
+    Returns ``assemble(pool=None) -> BuildResult``, which touches no ``bpy``
+    data and may run on any thread.
     """
     active_obj = active_obj or context.active_object
     prefs = get_addon_prefs(context)
     budget = prefs.max_vertex_budget if prefs else 50_000
+    backend = getattr(prefs, "spatial_backend", "AUTO")
+    cache.configure_disk(prefs)
 
-    candidates = _collect_scope_objects(context, active_obj)
-    if not candidates:
-        return BuildResult()
-
-    # Distance sort: nearest objects get full vertex data.
-    active_center = object_center_world(active_obj) if active_obj else object_center_world(candidates[0])
-    candidates.sort(key=lambda o: (object_center_world(o) - active_center).length_squared)
-
-    points: list[Vector] = []
-    meta: list[_PointMeta] = []
-    exclude_indices: set[int] = set()
-    total_verts = 0
-    limit_exceeded = False
-    bounds_objects: list[str] = []
-
-    for obj in candidates:
-        mesh = obj.data
-        vert_count = len(mesh.vertices)
-        mw = obj.matrix_world
-        is_active = obj is active_obj
-
-        if total_verts + vert_count <= budget:
-            # Full vertex insertion
-            start_idx = len(points)
-            for v in mesh.vertices:
-                points.append(mw @ v.co)
-                meta.append(_PointMeta(obj_name=obj.name, point_type="POINT"))
-            if is_active:
-                if moving_vert_indices is not None:
-                    # Edit Mode: only exclude the selected (moving) vertices
-                    for vi in moving_vert_indices:
-                        exclude_indices.add(start_idx + vi)
-                else:
-                    # Object Mode: exclude all vertices of the active object
-                    exclude_indices.update(range(start_idx, len(points)))
-            total_verts += vert_count
-        else:
-            # Fallback: bounding-box 8 corners + origin
-            limit_exceeded = True
-            bounds_objects.append(obj.name)
-            start_idx = len(points)
-            for corner in obj.bound_box:
-                points.append(mw @ Vector(corner))
-                meta.append(_PointMeta(obj_name=obj.name, point_type="BOUNDS"))
-            points.append(mw.translation.copy())
-            meta.append(_PointMeta(obj_name=obj.name, point_type="BOUNDS"))
-            if is_active and moving_vert_indices is None:
-                # Object Mode: exclude bounding box points too
-                exclude_indices.update(range(start_idx, len(points)))
-
-    if not points:
-        return BuildResult(source_vertex_count=total_verts, limit_exceeded=limit_exceeded,
-                           bounds_objects=bounds_objects)
-
-    tree = kdtree.KDTree(len(points))
-    for i, co in enumerate(points):
-        tree.insert(co, i)
-    tree.balance()
-
-    # Sorted axis arrays for axis-clipping mode
-    ax = sorted((co.x, i) for i, co in enumerate(points))
-    ay = sorted((co.y, i) for i, co in enumerate(points))
-    az = sorted((co.z, i) for i, co in enumerate(points))
+    edit_mode = moving_vert_indices is not None
+    if edit_mode:
+        if not isinstance(moving_vert_indices, dict):
+            moving_vert_indices = {active_obj.name: moving_vert_indices}
+    else:
+        moving_vert_indices = {}
+        if moving_objects is None:
+            moving_objects = [active_obj] if active_obj else []
 
-    return BuildResult(
-        tree=tree,
-        point_meta=meta,
-        point_count=len(points),
-        source_vertex_count=total_verts,
-        limit_exceeded=limit_exceeded,
-        bounds_objects=bounds_objects,
-        points=points,
-        axis_x=ax,
-        axis_y=ay,
-        axis_z=az,
-        exclude_indices=exclude_indices,
+    source = _MeshSource()
+    if getattr(prefs, "use_evaluated_mesh", False):
+        source = _MeshSource(context.evaluated_depsgraph_get(), context.scene.frame_current)
+    overrides = _Overrides(context.scene)
+    instances = None
+    if getattr(prefs, "include_instances", False):
+        instances = _InstanceSet(context.evaluated_depsgraph_get(),
+                                 overrides.targets(_scope_members(context, active_obj)),
+                                 context.scene.frame_current,
+                                 moving=() if edit_mode else moving_objects)
+    objects = _collect_scope_objects(context, active_obj, overrides)
+    source.subsets = overrides.subsets(objects)
+    slots = _Slots(objects, source, instances)
+    if not len(slots):
+        return _ready(BuildResult())
+    if edit_mode:
+        moving_ids = np.empty(0, dtype=np.int64)
+    else:
+        moving_ids = slots.moving_slots(moving_objects)
+
+    corners, matrices, names = slots.corners, slots.matrices, slots.names
+    point_cap = _memory_point_cap(prefs, backend)
+    if getattr(prefs, "index_layout", "FLAT") == "TWO_LEVEL":
+        capacity = getattr(prefs, "lazy_cache_vertices", 2_000_000)
+        memory_limited = point_cap is not None and point_cap < capacity
+        if memory_limited:
+            capacity = point_cap
+        result = _build_two_level(slots, moving_vert_indices, moving_ids, backend, capacity)
+        result.memory_limited = memory_limited
+        return _ready(result)
+
+    vert_counts = slots.vertex_counts()
+    counts = vert_counts
+    edge_share = 0.0
+    if edges:
+        # Each edge is a midpoint plus its EdgeIndex entry: price the
+        # points at the scene's mix of vertices and edges.
+        counts = vert_counts + slots.edge_counts()
+        total = int(counts.sum())
+        edge_share = (total - int(vert_counts.sum())) / total if total else 0.0
+    lod = getattr(prefs, "use_lod_index", False)
+    if edges or lod:
+        point_cap = _memory_point_cap(prefs, backend, edge_share, lod)
+
+    # Bounds-only objects cost 9 points each whatever happens; the memory
+    # cap has to leave room for them before granting full vertices.
+    memory_limited = False
+    if point_cap is not None:
+        mem_budget = max(point_cap - core.BOUNDS_POINTS_PER_OBJECT * len(slots), 0)
+        if mem_budget < budget:
+            budget = mem_budget
+            memory_limited = True
+
+    # Distance order: nearest objects get full vertex data.  Centres are
+    # computed in one batch and only the prefix the budget reaches is sorted.
+    centers = core.bbox_centers(corners, matrices)
+    origin = np.array(object_center_world(active_obj)) if active_obj else centers[0]
+    d2 = ((centers - origin) ** 2).sum(axis=1)
+    always_full, bounds_only, priority = slots.override_masks(overrides, vert_counts)
+    full_ids, bounds_ids = core.allocate_vertex_budget(
+        d2, counts, budget, always_full=always_full, bounds_only=bounds_only, priority=priority,
     )
+    full_ids = np.asarray(full_ids, dtype=np.int64)
+
+    moving = np.zeros(len(slots), dtype=bool)
+    moving[moving_ids] = True
+    dedup = getattr(prefs, "merge_distance", 0.0)
+    spare = np.empty(0, dtype=np.int64)
+    if dedup > 0 and len(bounds_ids):
+        spare = _spare_slots(bounds_ids, d2, counts, budget, bounds_only, priority)
+        bounds_ids = bounds_ids[~np.isin(bounds_ids, spare)]
+    rows = np.concatenate((full_ids, spare))
+
+    # Everything that touches bpy happens here; assembly is NumPy only.
+    parts = core.FlatParts(
+        owners=rows,
+        coords=[slots.coords(i) for i in rows.tolist()],
+        matrices=matrices[rows],
+        moving=moving[rows],
+        bounds_owners=bounds_ids,
+        bounds_corners=corners[bounds_ids],
+        bounds_matrices=matrices[bounds_ids],
+        bounds_moving=moving[bounds_ids],
+        spare=len(spare),
+        spare_corners=corners[spare],
+    )
+    for row, i in enumerate(rows.tolist()):
+        if not slots.is_object(i):
+            continue
+        if names[i] in moving_vert_indices:
+            parts.selections[row] = _selection_array(moving_vert_indices[names[i]])
+        if edges:
+            parts.edges[row] = source.edges(slots.objects[i])
+
+
+    def assemble(pool=None) -> BuildResult:
+        # Merging and settling the spare slots are NumPy work too.
+        plan = core.plan_flat_merge(parts, dedup, budget, pool=pool)
+        full = rows[:len(full_ids) + plan.admitted]
+        bounds_objects = [names[i] for i in spare[plan.admitted:].tolist() + bounds_ids.tolist()]
+        limit_exceeded = bool(bounds_objects)
+        index, edge_index, lod_index = core.assemble_flat_index(
+            parts, names, backend=backend, lod=lod, pool=pool, plan=plan,
+        )
+        total_verts = int(vert_counts[full].sum()) if len(full) else 0
+        return BuildResult(
+            index=index,
+            edges=edge_index,
+            lod=lod_index,
+            source_vertex_count=total_verts,
+            limit_exceeded=limit_exceeded,
+            bounds_objects=bounds_objects,
+            memory_limited=memory_limited and (limit_exceeded or index is None),
+        )
+
+    return assemble
+
+
+def build_gap_index(context, active_obj=None, moving_objects=()) -> "core.GapIndex | None":
+    """Equal-spacing index over the world AABBs of the non-moving scope
+    objects (children of a moving object move with it)."""
+    active_obj = active_obj or context.active_object
+    moving = {obj.as_pointer() for obj in moving_objects}
+    objs = [obj for obj in _collect_scope_objects(context, active_obj,
+                                                  _Overrides(context.scene))
+            if not _moves_with(obj, moving)]
+    if not objs:
+        return None
+    corners, matrices = object_bound_arrays(objs)
+    world = core.transform_corners(corners, matrices)
+    return core.GapIndex(world.min(axis=1), world.max(axis=1), [obj.name for obj in objs])
+
+
+def build_occluders(context, moving_objects=(), moving_vert_indices=None) -> Occluders:
+    """Occlusion tester over the visible mesh objects that stay put.
+
+    Anything in view hides targets, so this ignores the Target Scope and
+    the snap overrides.  Objects in *moving_objects*, and their children,
+    are left out.  A mesh in Edit Mode occludes with the triangles not
+    touching its moving vertices (*moving_vert_indices*: object name ->
+    indices), built here; other BVH trees are built on first use.
+    """
+    skip = {obj.as_pointer() for obj in moving_objects}
+    moving_verts = moving_vert_indices or {}
+    objs, trees = [], {}
+    for obj in context.visible_objects:
+        if obj.type != "MESH" or _moves_with(obj, skip):
+            continue
+        if obj.mode == "EDIT":
+            if obj.name not in moving_verts:
+                continue  # not snapshotted: its mesh data may be stale
+            trees[obj.as_pointer()] = static_part_bvh(obj, moving_verts[obj.name])
+        objs.append(obj)
+    return Occluders(context.evaluated_depsgraph_get(), objs, trees)
+
+
+def build_face_targets(context, active_obj=None, moving_objects=()) -> "core.FaceTargets | None":
+    """Nearest-surface (FACE) targets over the scope objects.
+
+    Only bounds are read here; an object's ``BVHTree`` is built the first
+    time a query reaches its box (``cache.object_bvh``, shared across moves).
+    Objects in *moving_objects*, their children and objects in Edit Mode
+    are skipped.
+    """
+    active_obj = active_obj or context.active_object
+    objs = _collect_scope_objects(context, active_obj, _Overrides(context.scene))
+    if not objs:
+        return None
+    depsgraph = context.evaluated_depsgraph_get()
+    corners, matrices = object_bound_arrays(objs)
+    inverse = np.linalg.pinv(matrices)  # zero-scale objects stay usable
+    # World radius -> object-space search distance (largest inverse scale).
+    radius_scale = np.linalg.norm(inverse[:, :3, :3], ord=2, axis=(1, 2))
+
+    def nearest(i, center, radius):
+        local = inverse[i, :3, :3] @ center + inverse[i, :3, 3]
+        found = cache.object_bvh(objs[i], depsgraph).find_nearest(
+            Vector(local), radius * radius_scale[i],
+        )[0]
+        if found is None:
+            return None
+        world = matrices[i, :3, :3] @ np.array(found) + matrices[i, :3, 3]
+        return world, float(np.linalg.norm(world - center))
+
+    skip = {obj.as_pointer() for obj in moving_objects}
+    excluded = [i for i, obj in enumerate(objs)
+                if _moves_with(obj, skip) or obj.mode == "EDIT"]
+    return core.FaceTargets(core.transform_corners(corners, matrices),
+                            [obj.name for obj in objs], nearest, excluded)
 
 
 # ---------------------------------------------------------------------------
 # Query
 # ---------------------------------------------------------------------------
 
+# Score penalty (pixels) of FACE / EDGE points: the nearest point on a
+# surface or edge is always at least as close as the vertices around it.
+FACE_BIAS_PX = 12.0
+EDGE_BIAS_PX = 6.0
+KIND_BIAS_PX = {core.KIND_FACE: FACE_BIAS_PX, core.KIND_EDGE: EDGE_BIAS_PX}
+
+# Axis Align: the soft snap pulls toward an axis value up to this many
+# query radii away; multi-axis combinations only use values within it.
+ALIGN_REACH_RADII = 10.0
+
+# Zoom-dependent detail: points closer than this on screen are one target.
+LOD_CELL_PX = 2.0
+
+
+def _constraint_reach(view, co, query_radius: float) -> float:
+    """Extent of a constrained search along its line or plane: the view's
+    reach at the depth of *co*, at least *query_radius*."""
+    reach = view.reach(co)
+    return max(reach, query_radius) if np.isfinite(reach) else query_radius
+
+
+def _add_midpoint_edge(cands: List[SnapCandidate], edges, constrained: bool):
+    """Give the best candidate, if a MIDPOINT, its edge (``segments``) for drawing."""
+    if not cands or cands[0].type != "MIDPOINT" or edges is None:
+        return cands
+    best = cands[0]
+    found = edges.edge_through(best.reference_co if constrained else best.location)
+    if found is not None:
+        best.segments = [(Vector(found[0]), Vector(found[1]))]
+    return cands
+
+
+def _visible_only(scored, occluders, rv3d):
+    """Keep the best candidates whose reference point is not occluded."""
+    if occluders is None or not scored:
+        return scored
+    view_matrix, perspective = rv3d.view_matrix, rv3d.is_perspective
+    return core.filter_visible(
+        scored, lambda pts: occluders.visible(view_matrix, perspective, pts),
+    )
+
+
+def _target_name(cand: core.CoreCandidate, index) -> str:
+    """Owner of *cand*'s target; all of them when merged points stand for several."""
+    if cand.point_id < 0 or getattr(index, "shared", None) is None:
+        return cand.owner_name
+    return core.format_owners(index.owner_names[o] for o in index.owners_of(cand.point_id))
+
+
+def _to_snap_candidate(cand: core.CoreCandidate, index=None) -> SnapCandidate:
+    return SnapCandidate(
+        type=cand.kind,
+        location=Vector(cand.location),
+        reference_co=Vector(cand.reference),
+        screen_dist=cand.screen_dist,
+        score=cand.score,
+        target_name=_target_name(cand, index),
+        source_co=Vector(cand.source) if cand.source is not None else None,
+        references=[Vector(r) for r in cand.references],
+        segments=[(Vector(a), Vector(b)) for a, b in cand.segments],
+    )
+
+
 def find_candidates(
     build_result: BuildResult,
     current_co: Vector,
@@ -201,48 +987,140 @@ def find_candidates(
     mouse_xy,
     snap_distance_px: int = 30,
     query_radius: float = 7.5,
+    constraint: Optional[str] = None,
+    occluders: Optional[Occluders] = None,
+    faces: "core.FaceTargets | None" = None,
+    lod_scale: float = 1.0,
 ) -> List[SnapCandidate]:
-    """Search the pre-built tree for snap candidates near *current_co*.
+    """Search the pre-built index for snap candidates near *current_co*.
 
     Returns a list sorted by score (best first), containing POINT / BOUNDS
     hits within *query_radius* world units **and** *snap_distance_px* screen
-    pixels.  Points in ``build_result.exclude_indices`` (the active object's
-    own vertices) are skipped.
+    pixels.  Excluded points (the active object's own vertices) are skipped.
+
+    With an axis *constraint* (``"X"``) the query is a cylinder of
+    *query_radius* around that axis line; with a plane (``"XY"``) it is a
+    slab of that thickness around the plane.  Along the line (or inside the
+    plane) it reaches across the whole region at the depth of
+    *current_co*.  Targets are projected onto the constraint, so
+    ``location`` never leaves it.
+
+    With *faces* (free moves only), the nearest surface point of each
+    object in range joins as a FACE candidate, and with edges in the build,
+    the closest point of each edge in range as an EDGE candidate; both are
+    scored like vertices plus ``KIND_BIAS_PX`` so a vertex next to them
+    still wins.  Edge midpoints are ordinary index points (MIDPOINT).  With *occluders*,
+    targets hidden behind other geometry are dropped; only the best few
+    candidates are ray cast.
+
+    With ``BuildResult.lod``, free moves query the detail level whose cells
+    span about ``LOD_CELL_PX`` pixels at *current_co* (times *lod_scale*),
+    so zooming out does not grow the number of points scored.
     """
-    if not build_result or not build_result.tree:
+    if not build_result or build_result.index is None:
         return []
 
-    exclude = build_result.exclude_indices
-    mouse_v = Vector(mouse_xy)
-    raw_hits = build_result.tree.find_range(current_co, query_radius)
-    result: list[SnapCandidate] = []
+    index = build_result.index
+    view = view_projection(region, rv3d)
+    if constraint:
+        free_axes = ["XYZ".index(a) for a in constraint]
+        reach = _constraint_reach(view, current_co, query_radius)
+        if len(free_axes) == 1:
+            hits = index.query_line(current_co, free_axes[0], query_radius, reach)
+        else:
+            normal = 3 - sum(free_axes)
+            hits = index.query_slab(current_co, normal, query_radius, reach)
+        scored = core.score_constrained_hits(
+            hits, current_co, free_axes, view, mouse_xy, snap_distance_px,
+        )
+    else:
+        if build_result.lod is not None:
+            cell = LOD_CELL_PX * lod_scale * view.pixel_size(current_co)
+            hits = build_result.lod.query_range(current_co, query_radius, cell)
+        else:
+            hits = index.query_range(current_co, query_radius)
+        scored = core.score_range_hits(hits, current_co, view, mouse_xy, snap_distance_px)
+        # Surface and edge points score like vertices, with a bias
+        for extra in (faces, build_result.edges):
+            if extra is not None:
+                scored = sorted(scored + core.score_range_hits(
+                    extra.query_range(current_co, query_radius), current_co, view, mouse_xy,
+                    snap_distance_px, kind_bias=KIND_BIAS_PX,
+                ), key=lambda c: c.score)
+    scored = _visible_only(scored, occluders, rv3d)
+    return _add_midpoint_edge([_to_snap_candidate(c, index) for c in scored],
+                              build_result.edges, constrained=bool(constraint))
 
-    for hit_co, index, _world_dist in raw_hits:
-        if index in exclude:
-            continue
 
-        screen = world_to_screen(region, rv3d, hit_co)
-        if screen is None:
-            continue
+def find_source_candidates(
+    build_result: BuildResult,
+    sources,
+    pivot: Vector,
+    region,
+    rv3d,
+    snap_distance_px: int = 30,
+    query_radius: float = 7.5,
+    occluders: Optional[Occluders] = None,
+    constraint: Optional[str] = None,
+) -> List[SnapCandidate]:
+    """Snap candidates for several moving *sources* in one batched query.
 
-        screen_dist = (screen - mouse_v).length
-        if screen_dist > snap_distance_px:
-            continue
+    *sources* is an ``(m, 3)`` array of world positions that move with
+    *pivot* (bounding-box corners or selected vertices).  Each candidate's
+    ``location`` is the pivot position that puts ``source_co`` on the target
+    (``reference_co``); the best (source, target) pair comes first.
+    With an axis or plane *constraint*, each source searches along its own
+    line or plane as in :func:`find_candidates` and lands on the target's
+    projection onto it, so ``location`` stays on the constraint.
+    Occluded targets are dropped as in :func:`find_candidates`.
+    """
+    if not build_result or build_result.index is None or not len(sources):
+        return []
 
-        pm = build_result.point_meta[index]
-        base_type = "BOUNDS" if pm.point_type == "BOUNDS" else "POINT"
+    index = build_result.index
+    view = view_projection(region, rv3d)
+    free_axes = None
+    if constraint:
+        free_axes = ["XYZ".index(a) for a in constraint]
+        reach = _constraint_reach(view, pivot, query_radius)
+        hits = core.query_constrained_multi(index, sources, free_axes, query_radius, reach)
+    else:
+        hits = index.query_range_multi(sources, query_radius)
+    scored = core.score_source_hits(hits, sources, pivot, view, snap_distance_px,
+                                    free_axes=free_axes)
+    scored = _visible_only(scored, occluders, rv3d)
+    return [_to_snap_candidate(c, index) for c in scored]
 
-        result.append(SnapCandidate(
-            type=base_type,
-            location=hit_co.copy(),
-            reference_co=current_co.copy(),
-            screen_dist=screen_dist,
-            score=screen_dist + _world_dist,
-            target_name=pm.obj_name,
-        ))
 
-    result.sort(key=lambda c: c.score)
-    return result
+def find_spacing_candidates(
+    gap_index: "core.GapIndex | None",
+    box_min,
+    box_max,
+    pivot: Vector,
+    region,
+    rv3d,
+    mouse_xy,
+    snap_distance_px: int = 30,
+    max_shift: float = 7.5,
+    axes: str = "XYZ",
+) -> List[SnapCandidate]:
+    """Equal-spacing candidates for the moving box (*box_min*, *box_max*).
+
+    For each of *axes* the box's row neighbours and the closest existing gap
+    are looked up in *gap_index*; matching shifts of at most *max_shift* that
+    keep *pivot* within *snap_distance_px* of *mouse_xy* are returned, best
+    first.  ``segments`` holds the matched gaps for drawing.
+    """
+    if gap_index is None or not len(gap_index):
+        return []
+    matches = []
+    for a in axes:
+        matches.extend(gap_index.matches("XYZ".index(a), box_min, box_max, max_shift))
+    scored = core.score_spacing_matches(
+        matches, pivot, view_projection(region, rv3d), mouse_xy, snap_distance_px,
+        gap_index.owner_names,
+    )
+    return [_to_snap_candidate(c) for c in scored]
 
 
 # ---------------------------------------------------------------------------
@@ -258,6 +1136,7 @@ def find_axis_candidates(
     snap_distance_px: int = 15,
     axis_flags: set = frozenset(),
     query_radius: float = 2.0,
+    combine: bool = False,
 ) -> List[SnapCandidate]:
     """Find axis-alignment candidates.
 
@@ -266,71 +1145,33 @@ def find_axis_candidates(
     The candidate location keeps the other axes at *current_co*, replacing
     only the aligned axis with the reference value.  ``reference_co`` stores
     the full 3-D position of the source vertex (for dashed-line visualisation).
+
+    With *combine* and two or more axes, the best few candidates per axis are
+    also merged into 2- / 3-axis alignment points (``ALIGN_XZ`` ...), which
+    are returned first; ``references`` then holds one vertex per axis.  Only
+    values within the soft-snap reach (``ALIGN_REACH_RADII`` query radii)
+    of *current_co* are combined, so a far value on one axis does not
+    outrank a close single-axis candidate.
     """
-    if not build_result or not build_result.points or not axis_flags:
+    if not build_result or build_result.index is None or not axis_flags:
         return []
 
-    exclude = build_result.exclude_indices
-    mouse_v = Vector(mouse_xy)
+    index = build_result.index
+    view = view_projection(region, rv3d)
     # Generous world-space threshold so distant axis values are reachable.
     threshold = max(query_radius * 20, 10.0)
 
-    _axes = {
-        "X": (0, build_result.axis_x, "ALIGN_X"),
-        "Y": (1, build_result.axis_y, "ALIGN_Y"),
-        "Z": (2, build_result.axis_z, "ALIGN_Z"),
-    }
-
-    result: list[SnapCandidate] = []
-
-    for flag in axis_flags:
-        cfg = _axes.get(flag)
-        if not cfg:
-            continue
-        axis_idx, sorted_entries, snap_type = cfg
-        if not sorted_entries:
+    per_axis: list[list[core.CoreCandidate]] = []
+    for flag in sorted(axis_flags):
+        axis_idx = {"X": 0, "Y": 1, "Z": 2}.get(flag)
+        if axis_idx is None:
             continue
+        hits = index.axis_window(axis_idx, current_co[axis_idx], threshold)
+        per_axis.append(core.score_axis_hits(hits, axis_idx, current_co, view, mouse_xy))
 
-        target_val = current_co[axis_idx]
-        lo = bisect.bisect_left(sorted_entries, (target_val - threshold,))
-        hi = bisect.bisect_right(sorted_entries, (target_val + threshold,))
-
-        # Deduplicate: keep the best score per rounded axis value
-        best: dict[float, SnapCandidate] = {}
-
-        for i in range(lo, min(hi, lo + 5000)):
-            val, pt_idx = sorted_entries[i]
-            if pt_idx in exclude:
-                continue
-            axis_dist = abs(val - target_val)
-
-            # Alignment point: current position with one axis replaced
-            align_co = current_co.copy()
-            align_co[axis_idx] = val
-
-            # Only reject points behind the camera
-            screen = world_to_screen(region, rv3d, align_co)
-            if screen is None:
-                continue
-            screen_dist = (screen - mouse_v).length
-
-            ref_co = build_result.points[pt_idx]
-            meta = build_result.point_meta[pt_idx]
-
-            rounded = round(val, 3)
-            score = axis_dist * 100.0
-            prev = best.get(rounded)
-            if prev is None or score < prev.score:
-                best[rounded] = SnapCandidate(
-                    type=snap_type,
-                    location=align_co,
-                    reference_co=ref_co.copy(),
-                    screen_dist=screen_dist,
-                    score=score,
-                    target_name=meta.obj_name,
-                )
-
-        result.extend(best.values())
-
-    result.sort(key=lambda c: c.score)
-    return result
+    scored = sorted((c for cands in per_axis for c in cands), key=lambda c: c.score)
+    if combine:
+        combos = core.combine_axis_candidates(per_axis, current_co, view, mouse_xy,
+                                              max_axis_dist=query_radius * ALIGN_REACH_RADII)
+        scored = combos + scored
+    return [_to_snap_candidate(c) for c in scored]
@@ -51,12 +51,26 @@ def draw_3d(op, _context):
     if cand:
         if cand.type.startswith("ALIGN_"):
             # Axis-clipping mode: solid line from current to alignment point,
-            # dashed line from alignment point to the reference vertex
+            # dashed line from alignment point to each reference vertex
             pts.append(cand.location)
-            pts.append(cand.reference_co)
             if applied:
                 lines.extend([applied, cand.location])
-            dashes.extend(_dashed_line_points(cand.location, cand.reference_co))
+            for ref in cand.references or [cand.reference_co]:
+                pts.append(ref)
+                dashes.extend(_dashed_line_points(cand.location, ref))
+        elif cand.type.startswith("SPACING_"):
+            # Equal spacing: the matched gaps, each with its end points
+            if applied:
+                lines.extend([applied, cand.location])
+            for a, b in cand.segments:
+                lines.extend([a, b])
+                pts.extend([a, b])
+        elif cand.source_co is not None and free and applied:
+            # Source-point snap: line from the moving source (where it is
+            # now) to its target vertex
+            source_now = cand.source_co + (applied - free)
+            pts.extend([source_now, cand.reference_co])
+            lines.extend([source_now, cand.reference_co])
         else:
             # Regular snap: line from free to applied + line from applied to candidate
             if free and applied:
@@ -64,6 +78,15 @@ def draw_3d(op, _context):
             pts.append(cand.location)
             if applied:
                 lines.extend([applied, cand.location])
+            if getattr(op, "constraint_mode", None):
+                # Constrained snap: the target was projected onto the line /
+                # plane; dash back to the actual vertex
+                pts.append(cand.reference_co)
+                dashes.extend(_dashed_line_points(cand.location, cand.reference_co))
+            for a, b in cand.segments:
+                # EDGE / MIDPOINT: the edge the target lies on
+                pts.extend([a, b])
+                dashes.extend(_dashed_line_points(a, b))
     else:
         # No candidate: show free→applied line only when there's a difference
         if free and applied:
@@ -149,3 +172,10 @@ def draw_2d(op, _context):
     blf.size(font_id, 14.0)
     blf.color(font_id, color[0], color[1], color[2], color[3])
     blf.draw(font_id, text)
+
+    stats = getattr(op, "hud_stats", "")
+    if stats:
+        blf.position(font_id, 20, 40, 0)
+        blf.size(font_id, 12.0)
+        blf.color(font_id, color[0], color[1], color[2], color[3] * 0.7)
+        blf.draw(font_id, stats)
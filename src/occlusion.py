@@ -0,0 +1,103 @@
+"""Occlusion test for snap targets: ray casts against per-object BVH trees.
+
+Occluders are the visible mesh objects that stay where they are during the
+move, whether snap targets or not.  An object's ``BVHTree`` is built only
+when a ray first passes through its world bounding box, in object space
+from the evaluated mesh, and is shared across invocations through
+``cache.object_bvh``.  A mesh in Edit Mode occludes with the triangles that
+do not touch a moving vertex (:func:`static_part_bvh`), built once per
+invocation.  Verdicts are cached per
+view matrix and per point (``core.VisibilityCache``), so rays are cast once
+per target and view.
+"""
+
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+from . import cache, core
+from .utils import matrix_to_array, mesh_triangles, mesh_vertex_coords, object_bound_arrays
+
+
+def static_part_bvh(obj, moving_indices) -> BVHTree:
+    """Object-space ``BVHTree`` of the triangles of *obj* that keep still.
+
+    *obj* is in Edit Mode with its edit-mesh flushed to ``obj.data`` (see
+    ``utils.edit_mesh_arrays``); triangles with a vertex in
+    *moving_indices* are left out, as they follow the cursor.
+    """
+    mesh = obj.data
+    tris = mesh_triangles(mesh)
+    moving = np.zeros(len(mesh.vertices), dtype=bool)
+    moving[np.asarray(moving_indices, dtype=np.int64)] = True
+    tris = tris[~moving[tris].any(axis=1)]
+    return BVHTree.FromPolygons(mesh_vertex_coords(mesh).tolist(), tris.tolist())
+
+
+class Occluders:
+    """Visibility of world points against a fixed set of mesh objects.
+
+    Objects being moved must not be passed in: their trees would describe
+    where they were at invoke, not where they are.  *trees* maps the
+    pointer of an object to a prebuilt tree used instead of its evaluated
+    mesh (the still part of an edited mesh).
+    """
+
+    def __init__(self, depsgraph, objects, trees=None):
+        self._depsgraph = depsgraph
+        self._objects = list(objects)
+        self._trees = trees or {}
+        corners, matrices = object_bound_arrays(self._objects)
+        world = core.transform_corners(corners, matrices)
+        self._box_min = world.min(axis=1) if len(world) else np.empty((0, 3))
+        self._box_max = world.max(axis=1) if len(world) else np.empty((0, 3))
+        self._inverse = np.linalg.pinv(matrices) if len(matrices) else matrices
+        self._visibility = core.VisibilityCache()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def visible(self, view_matrix, perspective: bool, points) -> np.ndarray:
+        """Boolean array: which of the ``(k, 3)`` *points* the view can see."""
+        key = core.view_key(view_matrix) + bytes([perspective])
+        view_inv = np.linalg.inv(matrix_to_array(view_matrix))
+        return self._visibility.resolve(
+            key, points, lambda pts: self._cast(view_inv, perspective, pts),
+        )
+
+    def _cast(self, view_inv: np.ndarray, perspective: bool, points: np.ndarray) -> np.ndarray:
+        """Ray from each point towards the viewer; any hit means hidden."""
+        visible = np.ones(len(points), dtype=bool)
+        if not len(self._objects):
+            return visible
+        if perspective:
+            ends = np.broadcast_to(view_inv[:3, 3], points.shape)
+        else:
+            # Orthographic: parallel rays along the view's +Z, long enough
+            # to leave every occluder box.
+            lo, hi = self._box_min.min(axis=0), self._box_max.max(axis=0)
+            reach = np.linalg.norm(hi - lo) + np.linalg.norm(points - (lo + hi) * 0.5, axis=1)
+            ends = points + view_inv[:3, 2] / np.linalg.norm(view_inv[:3, 2]) * reach[:, None]
+        seg = ends - points
+        length = np.linalg.norm(seg, axis=1)
+        # Start just off the target so its own surface does not count.
+        starts = points + seg * (1e-4 * np.maximum(length, 1.0) / np.maximum(length, 1e-12))[:, None]
+
+        pairs = core.segment_box_overlap(starts, ends, self._box_min, self._box_max)
+        for k, i in zip(*np.nonzero(pairs)):
+            if not visible[k]:
+                continue
+            inv = self._inverse[i]
+            o = inv[:3, :3] @ starts[k] + inv[:3, 3]
+            d = inv[:3, :3] @ (ends[k] - starts[k])
+            dist = float(np.linalg.norm(d))
+            if dist <= 0.0:
+                continue
+            obj = self._objects[i]
+            tree = self._trees.get(obj.as_pointer())
+            if tree is None:
+                tree = cache.object_bvh(obj, self._depsgraph)
+            hit = tree.ray_cast(Vector(o), Vector(d / dist), dist)[0]
+            if hit is not None:
+                visible[k] = False
+        return visible
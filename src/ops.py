@@ -3,17 +3,31 @@
 Lifecycle
 ---------
 invoke  -- build KD-Tree, snapshot initial state, register draw handlers.
+           With "Build Index in Background" only meshes are read here; the
+           index is assembled on worker threads and picked up by a timer.
 modal   -- process mouse / keyboard, query tree, apply snap, redraw.
 finish  -- remove draw handlers, optionally restore initial state.
 """
 
+import time
+
 import bmesh
 import bpy
+import numpy as np
 from mathutils import Vector
 
-from . import detector, drawing
+from . import core, detector, drawing, prefetch
 from .prefs import get_addon_prefs
-from .utils import clamp01, screen_to_world, world_delta_to_local, world_to_screen
+from .utils import (
+    clamp01,
+    edit_mesh_arrays,
+    matrix_to_array,
+    object_bound_arrays,
+    screen_to_world,
+    world_delta_to_local,
+    world_delta_to_location,
+    world_to_screen,
+)
 
 
 class SMARTCLIP_OT_modal_move(bpy.types.Operator):
@@ -60,6 +74,10 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         if prefs:
             self.color_guide = tuple(prefs.color_guide)
             self.color_snap = tuple(prefs.color_snap)
+            self._show_stats = getattr(prefs, "show_index_stats", False)
+            frame_ms = getattr(prefs, "frame_budget_ms", 0)
+            if frame_ms > 0:
+                self._watchdog = core.FrameWatchdog(frame_ms / 1000.0)
 
         # Resolve the 3-D view region we'll use for projections
         self._region, self._rv3d = _resolve_region(context)
@@ -73,12 +91,18 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
 
         # Snapshot the geometry that will be moved
         if self._is_edit:
-            if not self._snapshot_edit_mode():
+            if not self._snapshot_edit_mode(context):
                 self.report({"WARNING"}, "Select at least one vertex")
                 return {"CANCELLED"}
         else:
-            self._init_obj_loc = self._active_obj.location.copy()
-            self._start_world = self._init_obj_loc.copy()
+            self._snapshot_object_mode(context)
+
+        if scene.smartclip_equal_spacing and not self._is_edit:
+            self._snapshot_spacing(context)
+
+        if scene.smartclip_source_snap:
+            cap = getattr(prefs, "max_source_points", 64)
+            self._snapshot_source_points(cap)
 
         # Depth reference for mouse unprojection
         self._start_mouse_world = screen_to_world(
@@ -86,17 +110,49 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         )
 
         # Build spatial index (heavy work happens here, once)
-        # In Edit Mode, pass the selected vertex indices so only those are
-        # excluded from snap candidates (non-selected verts remain as targets).
-        moving_verts = set(self._init_vert_cos.keys()) if self._is_edit else None
-        self._build = detector.build_spatial_tree(
-            context, active_obj=self._active_obj,
+        # In Edit Mode, pass each edited object's selected vertex indices so
+        # only those are excluded (non-selected verts remain as targets).
+        # In Object Mode every moving object is excluded as a whole, from the
+        # same single build.
+        moving_verts = None
+        if self._is_edit:
+            moving_verts = {e.obj.name: e.indices for e in self._edit_objects}
+        build_args = dict(
+            active_obj=self._active_obj,
             moving_vert_indices=moving_verts,
+            moving_objects=None if self._is_edit else [m[0] for m in self._moving],
+            edges=scene.smartclip_edge_snap,
         )
-        if self._build.limit_exceeded:
-            scene.smartclip_runtime_info = "Limit exceeded: Switched to Box Mode"
+        pool = detector.build_pool(getattr(prefs, "build_threads", 0))
+        prefetched = None if self._is_edit else prefetch.take(context, prefs)
+        prefetch.set_busy(True)
+        if prefetched is not None and prefetched.done():
+            self._build = prefetched.result()
+            self._report_build(scene)
+        elif prefetched is not None or getattr(prefs, "background_build", False):
+            # Snapping starts once the timer sees the index; moving works now.
+            self._pending = prefetched or detector.submit_spatial_tree(pool, context, **build_args)
+            self._build = detector.BuildResult()
+            self._sync_timer(context)
+            scene.smartclip_runtime_info = "Building index..."
         else:
-            scene.smartclip_runtime_info = f"Vertices in tree: {self._build.source_vertex_count}"
+            self._build = detector.build_spatial_tree(context, pool=pool, **build_args)
+            self._report_build(scene)
+
+        # Occlusion filter: trees are built on the first ray that needs them
+        if scene.smartclip_occlusion:
+            self._occluders = detector.build_occluders(
+                context,
+                moving_objects=[] if self._is_edit else [m[0] for m in self._moving],
+                moving_vert_indices=moving_verts,
+            )
+
+        # Face targets: per-object BVH trees are built when first reached
+        if scene.smartclip_face_snap:
+            self._faces = detector.build_face_targets(
+                context, self._active_obj,
+                moving_objects=[] if self._is_edit else [m[0] for m in self._moving],
+            )
 
         # Register GPU draw handlers
         self._add_draw_handlers()
@@ -104,8 +160,35 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         context.window_manager.modal_handler_add(self)
         return {"RUNNING_MODAL"}
 
+    def _report_build(self, scene):
+        """Runtime info line for the finished build."""
+        if self._build.limit_exceeded:
+            scene.smartclip_runtime_info = "Limit exceeded: Switched to Box Mode"
+        elif self._build.backend_name == "TWO_LEVEL":
+            scene.smartclip_runtime_info = (
+                f"Lazy index: {len(self._build.index.owner_names)} objects, "
+                f"{self._build.source_vertex_count} verts"
+            )
+        else:
+            scene.smartclip_runtime_info = (
+                f"Vertices in tree: {self._build.source_vertex_count} ({self._build.backend_name})"
+            )
+        if self._build.index is not None:
+            memory = core.format_breakdown(self._build.memory_breakdown)
+            if self._build.memory_limited:
+                memory += " (memory cap)"
+            scene.smartclip_runtime_info += f" | Memory: {memory}"
+
     # --------------------------------------------------------------- modal
     def modal(self, context, event):
+        # Background build finished: start snapping
+        if event.type == "TIMER":
+            if self._pending is not None and self._pending.done():
+                self._collect_build(context)
+            elif self._snap_due and not self._throttled():
+                self._do_snap(context)
+            return {"PASS_THROUGH"}
+
         # Cancel (ESC only — right-click is used for hard snap)
         if event.type == "ESC" and event.value == "PRESS":
             self._restore()
@@ -130,7 +213,10 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         # Mouse movement -> recalculate snap
         if event.type == "MOUSEMOVE":
             self._last_mouse = _event_to_region(event, self._region)
-            self._do_snap(context)
+            if self._throttled():
+                self._snap_due = True  # the timer runs it with the latest mouse
+            else:
+                self._do_snap(context)
             return {"RUNNING_MODAL"}
 
         # Axis / plane constraint toggle (like G then X / Shift+X)
@@ -163,8 +249,19 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         self._start_world = Vector((0.0, 0.0, 0.0))
         self._start_mouse_world = Vector((0.0, 0.0, 0.0))
 
-        self._init_obj_loc = None
-        self._init_vert_cos = {}  # {vert_index: Vector}
+        self._moving = []         # [(obj, initial location, world->location 3x3)]
+        self._edit_objects = []   # [_EditSnapshot] for every mesh in Edit Mode
+        self._selected_world = []  # [(k, 3) arrays] selected vertices at invoke
+        self._source_offsets = None  # (m, 3) source points relative to the pivot
+        self._gaps = None         # core.GapIndex for equal-spacing guides
+        self._moving_box = None   # world AABB of the moving objects at invoke
+        self._occluders = None    # occlusion.Occluders when hidden targets are skipped
+        self._faces = None        # core.FaceTargets when face snapping is on
+        self._pending = None      # Future of the background build
+        self._timer = None        # modal timer polling it (and deferred searches)
+        self._watchdog = None     # core.FrameWatchdog with a frame budget
+        self._snap_due = False    # a throttled search is waiting for the timer
+        self._last_snap = 0.0     # perf_counter() of the last search
 
         # Axis / plane movement constraint (like G then X/Y/Z / Shift+X/Y/Z)
         # None = free, "X"/"Y"/"Z" = single axis, "YZ"/"XZ"/"XY" = plane
@@ -179,6 +276,8 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         self.current_candidate = None
         self.hard_snap = False
         self.hud_text = ""
+        self.hud_stats = ""
+        self._show_stats = False
         self.draw_enabled = False
         self.color_guide = (1.0, 0.0, 1.0, 1.0)
         self.color_snap = (0.0, 1.0, 1.0, 1.0)
@@ -186,17 +285,65 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
         self._handle_3d = None
         self._handle_2d = None
 
-    def _snapshot_edit_mode(self) -> bool:
-        bm = bmesh.from_edit_mesh(self._active_obj.data)
-        bm.verts.ensure_lookup_table()
-        sel = [v for v in bm.verts if v.select]
-        if not sel:
+    def _snapshot_object_mode(self, context):
+        """Record every object that moves with the active one (see
+        ``detector.moving_selection``)."""
+        active = self._active_obj
+        self._moving = [
+            (o, o.location.copy(), world_delta_to_location(o))
+            for o in detector.moving_selection(context, active)
+        ]
+        self._start_world = active.matrix_world.translation.copy()
+
+    def _snapshot_spacing(self, context):
+        """Gap index over the other objects plus the moving selection's box."""
+        moving = [m[0] for m in self._moving]
+        self._gaps = detector.build_gap_index(context, self._active_obj, moving)
+        corners, matrices = object_bound_arrays(moving)
+        world = core.transform_corners(corners, matrices).reshape(-1, 3)
+        self._moving_box = (world.min(axis=0), world.max(axis=0))
+
+    def _snapshot_edit_mode(self, context) -> bool:
+        """Snapshot the selected vertices of every mesh in Edit Mode.
+
+        Coordinates and selection are bulk-read per object (see
+        ``edit_mesh_arrays``); the move pivot is the centre of all selected
+        vertices in world space.
+        """
+        self._edit_objects = []
+        self._selected_world = []
+        objs = [o for o in context.objects_in_mode if o.type == "MESH"] or [self._active_obj]
+        world_sum = np.zeros(3)
+        total = 0
+        for obj in objs:
+            coords, selected = edit_mesh_arrays(obj)
+            indices = np.flatnonzero(selected)
+            self._edit_objects.append(_EditSnapshot(obj, indices, coords[indices]))
+            if len(indices):
+                world = core.transform_points(coords[indices], matrix_to_array(obj.matrix_world))
+                self._selected_world.append(world)
+                world_sum += world.sum(axis=0)
+                total += len(indices)
+        if not total:
             return False
-        center_local = sum((v.co for v in sel), Vector()) / len(sel)
-        self._start_world = self._active_obj.matrix_world @ center_local
-        self._init_vert_cos = {v.index: v.co.copy() for v in sel}
+        self._start_world = Vector(world_sum / total)
         return True
 
+    def _snapshot_source_points(self, cap: int):
+        """Offsets from the pivot of the points that snap alongside it.
+
+        Object Mode: bounding-box corners of every moving object; Edit Mode:
+        the selected vertices.  The pivot itself is always the first source.
+        """
+        if self._is_edit:
+            points = np.concatenate(self._selected_world)
+        else:
+            corners, matrices = object_bound_arrays([m[0] for m in self._moving])
+            points = core.transform_corners(corners, matrices).reshape(-1, 3)
+        start = np.array(self._start_world)
+        points = core.limit_points(points, max(cap - 1, 1))
+        self._source_offsets = np.vstack((np.zeros((1, 3)), points - start))
+
     # ------------------------------------------------ constraint toggle
     def _toggle_constraint(self, axis_key: str, plane: bool):
         """Toggle axis or plane constraint, Blender-style.
@@ -238,11 +385,15 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
 
     # --------------------------------------------------------- snap core
     def _do_snap(self, context):
+        started = time.perf_counter()
+        self._snap_due = False
         prefs = get_addon_prefs(context)
         threshold_px = prefs.snap_distance_px if prefs else 15
         # World-space search radius for the KD-Tree.  The screen-pixel filter
         # (snap_distance_px) is the real gatekeeper, so this can be generous.
         query_radius = max(5.0, threshold_px * 0.5)
+        tier = self._watchdog.tier if self._watchdog else core.QUALITY_TIERS[0]
+        search_radius = query_radius * tier.radius_scale
 
         mouse_world = screen_to_world(
             self._region, self._rv3d, self._last_mouse, self._start_world,
@@ -276,7 +427,20 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
                 mouse_xy=free_screen,
                 snap_distance_px=threshold_px,
                 axis_flags=axis_flags,
-                query_radius=query_radius,
+                query_radius=search_radius,
+                combine=getattr(scene, "smartclip_align_combine", False),
+            )
+        elif self._source_offsets is not None:
+            candidates = detector.find_source_candidates(
+                self._build,
+                sources=self._source_offsets + np.array(self.free_world),
+                pivot=self.free_world,
+                region=self._region,
+                rv3d=self._rv3d,
+                snap_distance_px=threshold_px,
+                query_radius=search_radius,
+                occluders=self._occluders,
+                constraint=self.constraint_mode,
             )
         else:
             candidates = detector.find_candidates(
@@ -286,9 +450,29 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
                 rv3d=self._rv3d,
                 mouse_xy=free_screen,
                 snap_distance_px=threshold_px,
-                query_radius=query_radius,
+                query_radius=search_radius,
+                constraint=self.constraint_mode,
+                occluders=self._occluders,
+                faces=self._faces,
+                lod_scale=tier.lod_scale,
             )
 
+        if self._gaps is not None and not axis_flags:
+            offset = np.array(self.free_world - self._start_world)
+            spacing = detector.find_spacing_candidates(
+                self._gaps,
+                self._moving_box[0] + offset,
+                self._moving_box[1] + offset,
+                pivot=self.free_world,
+                region=self._region,
+                rv3d=self._rv3d,
+                mouse_xy=free_screen,
+                snap_distance_px=threshold_px,
+                max_shift=search_radius,
+                axes=self.constraint_mode or "XYZ",
+            )
+            candidates = sorted(candidates + spacing, key=lambda c: c.score)
+
         self.current_candidate = candidates[0] if candidates else None
         self.hard_snap = bool(self._rmb_held and self.current_candidate)
 
@@ -298,9 +482,12 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
                 self.applied_world = cand.location.copy()
             elif cand.type.startswith("ALIGN_"):
                 # Axis-clipping soft snap: use world-space axis distance
-                axis_idx = {"ALIGN_X": 0, "ALIGN_Y": 1, "ALIGN_Z": 2}[cand.type]
-                axis_dist = abs(self.free_world[axis_idx] - cand.location[axis_idx])
-                ratio = 1.0 - min(axis_dist / max(0.01, query_radius * 10), 1.0)
+                # (the largest one for a multi-axis alignment)
+                axis_dist = max(
+                    abs(self.free_world[i] - cand.location[i])
+                    for i in ("XYZ".index(a) for a in cand.type[len("ALIGN_"):])
+                )
+                ratio = 1.0 - min(axis_dist / max(0.01, query_radius * detector.ALIGN_REACH_RADII), 1.0)
                 soft = clamp01(ratio) * 0.5
                 self.applied_world = self.free_world.lerp(cand.location, soft)
             else:
@@ -312,36 +499,52 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
             self.applied_world = self.free_world.copy()
 
         self._apply_position(self.applied_world)
+        self._last_snap = time.perf_counter()
+        if self._watchdog and self._watchdog.record(self._last_snap - started):
+            self._sync_timer(context)
         self._update_hud()
 
         if context.area:
             context.area.tag_redraw()
 
+    def _throttled(self) -> bool:
+        """Whether the quality tier's search interval has not passed yet."""
+        if self._watchdog is None:
+            return False
+        interval = self._watchdog.tier.min_interval
+        return interval > 0 and time.perf_counter() - self._last_snap < interval
+
     def _apply_position(self, world_co: Vector):
         if self._is_edit:
             delta_w = world_co - self._start_world
-            delta_l = world_delta_to_local(self._active_obj, delta_w)
-            bm = bmesh.from_edit_mesh(self._active_obj.data)
-            bm.verts.ensure_lookup_table()
-            for idx, orig in self._init_vert_cos.items():
-                bm.verts[idx].co = orig + delta_l
-            bmesh.update_edit_mesh(self._active_obj.data, loop_triangles=False, destructive=False)
+            for snap in self._edit_objects:
+                snap.apply(world_delta_to_local(snap.obj, delta_w))
         else:
-            self._active_obj.location = world_co
+            # Same world offset for the whole selection, one pass per event.
+            delta_w = world_co - self._start_world
+            for obj, loc, to_location in self._moving:
+                obj.location = loc + to_location @ delta_w
 
     def _restore(self):
         if self._is_edit:
-            bm = bmesh.from_edit_mesh(self._active_obj.data)
-            bm.verts.ensure_lookup_table()
-            for idx, orig in self._init_vert_cos.items():
-                bm.verts[idx].co = orig
-            bmesh.update_edit_mesh(self._active_obj.data, loop_triangles=False, destructive=False)
-        elif self._init_obj_loc is not None:
-            self._active_obj.location = self._init_obj_loc
+            for snap in self._edit_objects:
+                snap.apply(None)
+        else:
+            for obj, loc, _to_location in self._moving:
+                obj.location = loc
 
     def _update_hud(self):
+        self._update_hud_stats()
         parts = []
 
+        moving = len(self._moving) or sum(1 for e in self._edit_objects if len(e.indices))
+        if moving > 1:
+            parts.append(f"Objects: {moving}")
+        if self._pending is not None:
+            parts.append("Building index...")
+        if self._watchdog is not None:
+            parts.append(f"Quality: {self._watchdog.tier.name}")
+
         # Constraint indicator
         cm = self.constraint_mode
         if cm:
@@ -357,21 +560,38 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
             return
 
         if cand.type.startswith("ALIGN_"):
-            axis_label = cand.type[-1]  # 'X', 'Y', 'Z'
-            axis_idx = {"X": 0, "Y": 1, "Z": 2}[axis_label]
-            val = cand.location[axis_idx]
+            axis_label = cand.type[len("ALIGN_"):]  # 'X', 'Y', 'Z' or e.g. 'XZ'
+            vals = ", ".join(f"{cand.location['XYZ'.index(a)]:.3f}" for a in axis_label)
             dist = (cand.location - self.applied_world).length
             parts.append(
-                f"Align {axis_label}: {val:.3f} "
+                f"Align {axis_label}: {vals} "
                 f"({cand.target_name}) | Dist: {dist:.3f}m"
             )
+        elif cand.type.startswith("SPACING_"):
+            a, b = cand.segments[0]
+            parts.append(
+                f"Spacing {cand.type[-1]}: {(b - a).length:.3f}m ({cand.target_name})"
+            )
         else:
-            kind = "Bounds" if cand.type == "BOUNDS" else "Vertex"
+            kind = {
+                "BOUNDS": "Bounds", "FACE": "Face", "EDGE": "Edge", "MIDPOINT": "Midpoint",
+            }.get(cand.type, "Vertex")
             dist = (cand.location - self.applied_world).length
             parts.append(f"Target: {cand.target_name} ({kind}) | Dist: {dist:.3f}m")
 
         self.hud_text = " | ".join(parts)
 
+    def _update_hud_stats(self):
+        build = self._build
+        if not self._show_stats or build is None or build.index is None:
+            self.hud_stats = ""
+            return
+        # Two-level indices grow while moving, so this is refreshed per event.
+        self.hud_stats = (
+            f"Index: {build.point_count} pts ({build.backend_name}) | "
+            f"{core.format_bytes(build.memory_bytes)}"
+        )
+
     # ----------------------------------------------- draw handler mgmt
     def _add_draw_handlers(self):
         if self._handle_3d is None:
@@ -393,7 +613,39 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
             bpy.types.SpaceView3D.draw_handler_remove(self._handle_2d, "WINDOW")
             self._handle_2d = None
 
+    def _collect_build(self, context):
+        future, self._pending = self._pending, None
+        self._sync_timer(context)
+        try:
+            self._build = future.result()
+        except Exception as exc:  # keep moving without snapping
+            self._build = detector.BuildResult()
+            self.report({"WARNING"}, f"Snap index build failed: {exc}")
+            return
+        self._report_build(context.scene)
+        self._do_snap(context)
+
+    def _sync_timer(self, context):
+        """Keep the timer while a build is pending or searches are throttled."""
+        throttling = self._watchdog is not None and self._watchdog.tier.min_interval > 0
+        if self._pending is None and not throttling:
+            self._stop_timer(context)
+        elif self._timer is None:
+            self._timer = context.window_manager.event_timer_add(
+                BUILD_POLL_SECONDS, window=context.window,
+            )
+
+    def _stop_timer(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+
     def _finish(self, context):
+        prefetch.set_busy(False)
+        if self._pending is not None:
+            self._pending.cancel()  # a running build finishes unobserved
+            self._pending = None
+        self._stop_timer(context)
         self._remove_draw_handlers()
         if context.area:
             context.area.tag_redraw()
@@ -403,6 +655,32 @@ class SMARTCLIP_OT_modal_move(bpy.types.Operator):
 # Helpers (module-level)
 # ------------------------------------------------------------------
 
+BUILD_POLL_SECONDS = 0.02
+
+
+class _EditSnapshot:
+    """Selected vertices of one Edit Mode object and their start positions."""
+
+    def __init__(self, obj, indices, init_co):
+        self.obj = obj
+        self.indices = indices    # (k,) selected vertex indices
+        self.init_co = init_co    # (k, 3) local coordinates at invoke
+        self._verts = None
+
+    def apply(self, delta_local):
+        """Offset the selection by *delta_local* (``None`` restores it)."""
+        if not len(self.indices):
+            return
+        bm = bmesh.from_edit_mesh(self.obj.data)
+        if self._verts is None:
+            bm.verts.ensure_lookup_table()
+            self._verts = [bm.verts[i] for i in self.indices.tolist()]
+        cos = self.init_co if delta_local is None else self.init_co + tuple(delta_local)
+        for v, co in zip(self._verts, cos.tolist()):
+            v.co = co
+        bmesh.update_edit_mesh(self.obj.data, loop_triangles=False, destructive=False)
+
+
 def _resolve_region(context):
     """Return (region, rv3d) for the active 3-D viewport."""
     if context.region and context.region.type == "WINDOW" and context.region_data:
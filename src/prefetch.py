@@ -0,0 +1,127 @@
+"""Build the next move's snap index while the user is idle.
+
+A ``bpy.app.timers`` callback polls a cheap key of everything an Object
+Mode build reads: active object, moving selection, target scope, the
+settings that shape the index and a counter of depsgraph updates (any
+edit, transform or visibility change).  Once the key has held still for a
+moment, the meshes are read (one bulk pass on the main thread, as at
+invoke) and the flat index is assembled on the shared build pool.  The
+next move whose key matches takes the finished -- or still running --
+build instead of starting its own.
+"""
+
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+
+from . import cache, core, detector
+from .prefs import get_addon_prefs
+
+POLL_SECONDS = 0.25
+IDLE_SECONDS = 0.5
+
+# Preferences that change what a build produces
+BUILD_PREFS = (
+    "max_vertex_budget", "max_index_memory_mb", "spatial_backend", "index_layout",
+    "use_evaluated_mesh", "include_instances", "use_lod_index", "use_disk_cache",
+    "disk_cache_dir", "merge_distance",
+)
+
+_state = core.IdlePrefetch(IDLE_SECONDS)
+_busy = False  # a move is running: its own edits are not idle time
+
+
+def state_key(context, prefs) -> "tuple | None":
+    """Key of the Object Mode build *context* would run; ``None`` if none applies.
+
+    Only the flat layout is prefetched: the two-level layout's build is
+    already cheap, its objects load lazily while moving.
+    """
+    scene = context.scene
+    active = context.active_object
+    if (context.mode != "OBJECT" or active is None or not scene.smartclip_enabled
+            or getattr(prefs, "index_layout", "FLAT") != "FLAT"):
+        return None
+    collection = scene.target_collection
+    return (
+        scene.name_full, context.view_layer.name, scene.frame_current,
+        cache.scene_generation(),
+        tuple(o.name_full for o in detector.moving_selection(context, active)),
+        scene.target_scope, collection.name_full if collection else "",
+        scene.smartclip_edge_snap,
+        tuple(getattr(prefs, name, None) for name in BUILD_PREFS),
+    )
+
+
+def build_args(context) -> dict:
+    """Arguments of the Object Mode ``build_spatial_tree`` call for *context*."""
+    active = context.active_object
+    return dict(
+        active_obj=active,
+        moving_objects=detector.moving_selection(context, active),
+        edges=context.scene.smartclip_edge_snap,
+    )
+
+
+def take(context, prefs):
+    """The prefetched build (a ``Future``) for *context*'s state, or ``None``."""
+    if not getattr(prefs, "prefetch_index", False):
+        return None
+    key = state_key(context, prefs)
+    return None if key is None else _state.take(key)
+
+
+def set_busy(busy: bool) -> None:
+    global _busy
+    _busy = busy
+
+
+def _view3d_override(wm):
+    for window in wm.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                return dict(window=window, area=area)
+    return None
+
+
+def _poll():
+    context = bpy.context
+    prefs = get_addon_prefs(context)
+    if not getattr(prefs, "prefetch_index", False):
+        _state.clear()
+        return POLL_SECONDS
+    override = None if _busy else _view3d_override(context.window_manager)
+    if override is None:
+        _state.observe(None, time.monotonic())
+        return POLL_SECONDS
+    try:
+        with context.temp_override(**override):
+            key = state_key(context, prefs)
+            if _state.observe(key, time.monotonic()):
+                pool = detector.build_pool(getattr(prefs, "build_threads", 0))
+                _state.start(key, detector.submit_spatial_tree(pool, context,
+                                                               **build_args(context)))
+    except Exception:  # a timer that raises is unregistered; the move builds itself
+        _state.clear()
+    return POLL_SECONDS
+
+
+@persistent
+def on_load_pre(*_args):
+    _state.clear()
+
+
+def register():
+    if not bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.register(_poll, first_interval=POLL_SECONDS, persistent=True)
+    if on_load_pre not in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.append(on_load_pre)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
+    if on_load_pre in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(on_load_pre)
+    _state.clear()
@@ -1,5 +1,12 @@
 import bpy
-from bpy.props import FloatVectorProperty, IntProperty
+from bpy.props import (
+    BoolProperty,
+    EnumProperty,
+    FloatProperty,
+    FloatVectorProperty,
+    IntProperty,
+    StringProperty,
+)
 from bpy.types import AddonPreferences
 
 ADDON_MODULE_NAME = __package__
@@ -31,6 +38,157 @@ class SMARTCLIP_AddonPreferences(AddonPreferences):
         max=10_000_000,
     )
 
+    max_index_memory_mb: IntProperty(
+        name="Max Index Memory (MB)",
+        description="Upper bound on snap index memory; lowers the vertex budget (or the "
+                    "Two-Level cache) when it would not fit. 0 = no memory cap",
+        default=0,
+        min=0,
+        max=65536,
+    )
+
+    frame_budget_ms: IntProperty(
+        name="Frame Budget (ms)",
+        description="Snap search time per mouse event; when moves take longer, the search "
+                    "radius, detail level and then search rate step down for the rest of "
+                    "the move (and back up with headroom). 0 = off",
+        default=0,
+        min=0,
+        max=1000,
+    )
+
+    show_index_stats: BoolProperty(
+        name="Show Index Stats in HUD",
+        description="Show point count, backend and index memory in the viewport HUD",
+        default=False,
+    )
+
+    max_source_points: IntProperty(
+        name="Max Source Points",
+        description="Snap From Corners / Vertices: most moving points queried per event "
+                    "(axis extremes are always kept)",
+        default=64,
+        min=1,
+        max=4096,
+    )
+
+    use_evaluated_mesh: BoolProperty(
+        name="Use Modifier Results",
+        description="Snap to the evaluated mesh (Array, Mirror, Subdivision, Geometry "
+                    "Nodes ...) instead of the original cage; results are cached per "
+                    "object until it changes",
+        default=False,
+    )
+
+    include_instances: BoolProperty(
+        name="Include Instances",
+        description="Also snap to collection and Geometry Nodes instances; each instanced "
+                    "mesh is read once and shared by all of its instances, and far "
+                    "instances fall back to their bounding box",
+        default=False,
+    )
+
+    use_disk_cache: BoolProperty(
+        name="Disk Cache for Linked Meshes",
+        description="Keep vertex arrays and axis orderings of meshes linked from library "
+                    "files on disk, memory-mapped in later sessions; an entry is "
+                    "replaced when its library file changes",
+        default=False,
+    )
+
+    disk_cache_dir: StringProperty(
+        name="Cache Folder",
+        description="Folder for the disk cache (empty: a folder in Blender's user data)",
+        subtype="DIR_PATH",
+        default="",
+    )
+
+    disk_cache_mb: IntProperty(
+        name="Cache Size (MB)",
+        description="Oldest disk cache entries are removed above this size (0 = no limit)",
+        default=2048,
+        min=0,
+        max=1_000_000,
+    )
+
+    background_build: BoolProperty(
+        name="Build Index in Background",
+        description="Read meshes at the start of a move, then assemble the snap index on "
+                    "worker threads; the move starts at once and snapping joins when the "
+                    "index is ready",
+        default=False,
+    )
+
+    merge_distance: FloatProperty(
+        name="Merge Coincident Vertices",
+        description="Vertices of different (or the same) objects closer than this share "
+                    "one snap point, e.g. at the seams of modular kit pieces (flat layout). "
+                    "0 = off",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        precision=5,
+        subtype="DISTANCE",
+    )
+
+    prefetch_index: BoolProperty(
+        name="Prefetch Index When Idle",
+        description="Build the next move's snap index (Object Mode, flat layout) while "
+                    "the scene and selection stay unchanged, so the move starts with it "
+                    "ready",
+        default=False,
+    )
+
+    build_threads: IntProperty(
+        name="Build Threads",
+        description="Worker threads for transforms, sorts and tree building "
+                    "(0 = one per CPU core, up to 32)",
+        default=0,
+        min=0,
+        max=256,
+    )
+
+    spatial_backend: EnumProperty(
+        name="Spatial Index",
+        description="Structure used for nearest-point queries",
+        items=[
+            ("AUTO", "Automatic", "Pick from point count and distribution"),
+            ("KDTREE", "KD-Tree", "mathutils KD-Tree (per-point insertion)"),
+            ("GRID", "Uniform Grid", "Spatial-hash grid; best for evenly spread meshes"),
+            ("STATIC", "Static Tree", "NumPy packed box tree; fast to build on huge sets"),
+        ],
+        default="AUTO",
+    )
+
+    index_layout: EnumProperty(
+        name="Index Layout",
+        description="How snap targets are organised at the start of a move",
+        items=[
+            ("FLAT", "Flat (Budgeted)",
+             "One index of up to Max Vertex Budget vertices; the rest use bounding boxes"),
+            ("TWO_LEVEL", "Two-Level (Lazy)",
+             "Object bounding-box tree; full vertices loaded per object on first approach"),
+        ],
+        default="FLAT",
+    )
+
+    use_lod_index: BoolProperty(
+        name="Zoom-Dependent Detail",
+        description="Flat layout: also build coarser octree levels with one representative "
+                    "vertex per cell, and query the level that matches the zoom at the "
+                    "cursor so zoomed-out moves score a few points per pixel, not all",
+        default=False,
+    )
+
+    lazy_cache_vertices: IntProperty(
+        name="Lazy Cache Vertices",
+        description="Two-Level layout: vertices kept in per-object indices before the "
+                    "least recently used are dropped",
+        default=2_000_000,
+        min=10_000,
+        max=100_000_000,
+    )
+
     color_guide: FloatVectorProperty(
         name="Guide Color",
         subtype="COLOR",
@@ -54,6 +212,26 @@ class SMARTCLIP_AddonPreferences(AddonPreferences):
         col = layout.column(align=True)
         col.prop(self, "snap_distance_px")
         col.prop(self, "max_vertex_budget")
+        col.prop(self, "max_index_memory_mb")
+        col.prop(self, "max_source_points")
+        col.prop(self, "use_evaluated_mesh")
+        col.prop(self, "merge_distance")
+        col.prop(self, "include_instances")
+        col.prop(self, "use_disk_cache")
+        if self.use_disk_cache:
+            col.prop(self, "disk_cache_dir")
+            col.prop(self, "disk_cache_mb")
+        col.prop(self, "background_build")
+        col.prop(self, "prefetch_index")
+        col.prop(self, "build_threads")
+        col.prop(self, "spatial_backend")
+        col.prop(self, "index_layout")
+        if self.index_layout == "TWO_LEVEL":
+            col.prop(self, "lazy_cache_vertices")
+        else:
+            col.prop(self, "use_lod_index")
+        col.prop(self, "frame_budget_ms")
+        col.prop(self, "show_index_stats")
         col.separator()
         col.prop(self, "color_guide")
         col.prop(self, "color_snap")
@@ -1,6 +1,10 @@
-from mathutils import Vector
+import bpy
+import numpy as np
+from mathutils import Matrix, Vector
 from bpy_extras.view3d_utils import location_3d_to_region_2d, region_2d_to_location_3d
 
+from .core import ViewProjection
+
 
 def object_center_world(obj) -> Vector:
     """Return the world-space bounding-box center of *obj* (fallback: origin)."""
@@ -20,10 +24,142 @@ def screen_to_world(region, rv3d, mouse_xy, depth_location) -> Vector:
     return region_2d_to_location_3d(region, rv3d, mouse_xy, depth_location)
 
 
+def view_projection(region, rv3d) -> ViewProjection:
+    """Snapshot *rv3d*'s perspective matrix and *region*'s size for the core."""
+    return ViewProjection(rv3d.perspective_matrix, region.width, region.height)
+
+
+def matrix_to_array(matrix) -> np.ndarray:
+    """Convert a ``mathutils.Matrix`` to a 4x4 float64 array (row-major)."""
+    return np.array(matrix, dtype=np.float64).reshape(4, 4)
+
+
+def mesh_vertex_coords(mesh) -> np.ndarray:
+    """Read all local vertex coordinates of *mesh* in one ``foreach_get``."""
+    n = len(mesh.vertices)
+    buf = np.empty(n * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", buf)
+    return buf.reshape(n, 3)
+
+
+def mesh_edge_vertices(mesh) -> np.ndarray:
+    """Read the vertex pair of every edge of *mesh* in one ``foreach_get``."""
+    m = len(mesh.edges)
+    buf = np.empty(m * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", buf)
+    return buf.reshape(m, 2)
+
+
+def mesh_triangles(mesh) -> np.ndarray:
+    """Read the vertex triple of every loop triangle of *mesh* in one ``foreach_get``."""
+    mesh.calc_loop_triangles()
+    t = len(mesh.loop_triangles)
+    buf = np.empty(t * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", buf)
+    return buf.reshape(t, 3)
+
+
+def mesh_vertex_mask(mesh, vertex_groups, name: str) -> "np.ndarray | None":
+    """Vertices of *mesh* flagged by the boolean point attribute or vertex group *name*.
+
+    Attributes are read in one ``foreach_get``.  Vertex group weights have
+    no bulk accessor, so a group takes one Python pass over the vertices
+    (any weight above zero counts).  ``None`` if *name* is neither.
+    """
+    n = len(mesh.vertices)
+    attr = mesh.attributes.get(name)
+    if attr is not None and attr.domain == "POINT" and attr.data_type == "BOOLEAN":
+        mask = np.empty(n, dtype=bool)
+        attr.data.foreach_get("value", mask)
+        return mask
+    group = vertex_groups.get(name)
+    if group is None:
+        return None
+    index = group.index
+    mask = np.zeros(n, dtype=bool)
+    for vert in mesh.vertices:
+        for elem in vert.groups:
+            if elem.group == index and elem.weight > 0.0:
+                mask[vert.index] = True
+                break
+    return mask
+
+
+def edit_mesh_arrays(obj):
+    """Live local coordinates and selection of a mesh object in Edit Mode.
+
+    ``mesh.vertices`` is stale while editing, so the edit-mesh is first
+    flushed to the mesh (in C) and then read back with two ``foreach_get``
+    calls.  Returns ``(coords (n, 3) float32, selected (n,) bool)``.
+    """
+    obj.update_from_editmode()
+    mesh = obj.data
+    sel = np.empty(len(mesh.vertices), dtype=bool)
+    mesh.vertices.foreach_get("select", sel)
+    return mesh_vertex_coords(mesh), sel
+
+
+def _batch_matrix_layout(mats: np.ndarray, objects) -> np.ndarray:
+    """Return *mats* in row-major order, checked against one real matrix.
+
+    ``foreach_get`` copies matrices in Blender's internal column-major order;
+    verify on the first non-symmetric matrix instead of trusting that.
+    """
+    asym = np.flatnonzero(np.abs(mats - mats.transpose(0, 2, 1)).max(axis=(1, 2)) > 1e-6)
+    if not len(asym):
+        return mats
+    i = int(asym[0])
+    ref = matrix_to_array(objects[i].matrix_world)
+    if np.allclose(mats[i], ref, rtol=1e-5, atol=1e-5 * max(1.0, np.abs(ref).max())):
+        return mats
+    return mats.transpose(0, 2, 1).copy()
+
+
+def object_bound_arrays(objects):
+    """Batch-read local ``bound_box`` corners and ``matrix_world`` of *objects*.
+
+    Returns ``(corners (n, 8, 3), matrices (n, 4, 4))`` as float64 arrays.
+    Uses two ``foreach_get`` calls over ``bpy.data.objects`` instead of
+    touching every corner and matrix row from Python.
+    """
+    n = len(objects)
+    if not n:
+        return np.empty((0, 8, 3)), np.empty((0, 4, 4))
+    all_objs = bpy.data.objects
+    slot = {o.as_pointer(): i for i, o in enumerate(all_objs)}
+    try:
+        rows = np.fromiter((slot[o.as_pointer()] for o in objects), dtype=np.int64, count=n)
+    except KeyError:
+        # Not a main-database object (should not happen); read one by one.
+        corners = np.array([o.bound_box for o in objects], dtype=np.float64)
+        return corners, np.array([o.matrix_world for o in objects], dtype=np.float64)
+
+    n_all = len(all_objs)
+    boxes = np.empty(n_all * 24, dtype=np.float32)
+    all_objs.foreach_get("bound_box", boxes)
+    mats = np.empty(n_all * 16, dtype=np.float32)
+    all_objs.foreach_get("matrix_world", mats)
+    corners = boxes.reshape(n_all, 8, 3)[rows].astype(np.float64)
+    matrices = _batch_matrix_layout(mats.reshape(n_all, 4, 4)[rows].astype(np.float64), objects)
+    return corners, matrices
+
+
 def world_delta_to_local(obj, world_delta: Vector) -> Vector:
     """Convert a world-space translation delta to object-local space."""
     return obj.matrix_world.inverted_safe().to_3x3() @ world_delta
 
 
+def world_delta_to_location(obj):
+    """3x3 matrix taking a world-space translation delta to a ``location`` delta.
+
+    ``location`` lives in the parent's space (after ``matrix_parent_inverse``),
+    so unparented objects get the identity.
+    """
+    if obj.parent is None:
+        return Matrix.Identity(3)
+    parent_space = obj.parent.matrix_world @ obj.matrix_parent_inverse
+    return parent_space.to_3x3().inverted_safe()
+
+
 def clamp01(value: float) -> float:
     return max(0.0, min(1.0, value))
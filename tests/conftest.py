@@ -0,0 +1,29 @@
+"""pytest setup for the Blender-free core tests.
+
+``src/__init__.py`` imports ``bpy``, so ``src.core`` cannot be imported the
+normal way outside Blender.  The core package is self-contained, so load it
+directly under the name ``smartclip_core``.
+"""
+
+import importlib.util
+import os
+import sys
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "core")
+
+
+def _load_core():
+    if "smartclip_core" in sys.modules:
+        return sys.modules["smartclip_core"]
+    spec = importlib.util.spec_from_file_location(
+        "smartclip_core",
+        os.path.join(CORE_DIR, "__init__.py"),
+        submodule_search_locations=[CORE_DIR],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["smartclip_core"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_load_core()
@@ -9,20 +9,24 @@ Usage:
 import argparse
 import os
 import sys
+import tempfile
 import time
 import traceback
 from contextlib import contextmanager
 
 import bmesh
 import bpy
+from mathutils import Matrix
 
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+import numpy as np  # noqa: E402
+
 import src  # noqa: E402
-from src import detector  # noqa: E402
+from src import cache, detector, occlusion, prefetch, utils  # noqa: E402
 
 
 def _ensure_addon_enabled():
@@ -119,30 +123,38 @@ def _get_addon_prefs():
 
 
 @contextmanager
-def _temporary_budget(max_vertex_budget):
+def _temporary_prefs(**values):
     prefs = _get_addon_prefs()
     if prefs is not None:
-        old_value = prefs.max_vertex_budget
-        prefs.max_vertex_budget = int(max_vertex_budget)
+        old_values = {name: getattr(prefs, name) for name in values}
+        for name, value in values.items():
+            setattr(prefs, name, value)
         try:
             yield
         finally:
-            prefs.max_vertex_budget = old_value
+            for name, value in old_values.items():
+                setattr(prefs, name, value)
         return
 
     original_fn = detector.get_addon_prefs
 
     class _DummyPrefs:
-        def __init__(self, value):
-            self.max_vertex_budget = value
+        def __init__(self, overrides):
+            self.max_vertex_budget = 50000
+            for name, value in overrides.items():
+                setattr(self, name, value)
 
-    detector.get_addon_prefs = lambda _ctx: _DummyPrefs(int(max_vertex_budget))
+    detector.get_addon_prefs = lambda _ctx: _DummyPrefs(values)
     try:
         yield
     finally:
         detector.get_addon_prefs = original_fn
 
 
+def _temporary_budget(max_vertex_budget):
+    return _temporary_prefs(max_vertex_budget=int(max_vertex_budget))
+
+
 def case_scene_properties_registered():
     assert hasattr(bpy.types.Scene, "smartclip_enabled")
     assert hasattr(bpy.types.Scene, "target_scope")
@@ -283,6 +295,560 @@ def case_stress_100k_vertices():
     print(f"[src:test] stress build elapsed: {elapsed:.4f}s")
 
 
+def case_two_level_lazy_load():
+    _clear_scene()
+    active = _add_cube("Lazy_Active", (0.0, 0.0, 0.0))
+    heavy = _create_grid_object("Lazy_Heavy", location=(20.0, 0.0, 0.0), x_verts=320, y_verts=320)
+    _add_cube("Lazy_Far", (60.0, 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+
+    with _temporary_prefs(index_layout="TWO_LEVEL", max_vertex_budget=100):
+        start = time.perf_counter()
+        result = detector.build_spatial_tree(bpy.context, active_obj=active)
+        elapsed = time.perf_counter() - start
+
+    index = result.index
+    assert not result.limit_exceeded
+    assert index.loads == 0 and result.point_count == 0
+    assert result.source_vertex_count >= len(heavy.data.vertices)
+
+    # Query inside the heavy grid: only it is loaded, at full resolution.
+    hits = index.query_range((20.0, 0.0, 0.0), 0.2)
+    assert index.loads == 1
+    assert len(hits) > 0 and set(index.owner_names[o] for o in hits.owner) == {"Lazy_Heavy"}
+    # The active object is excluded in Object Mode.
+    assert len(index.query_range((0.0, 0.0, 0.0), 2.0)) == 0
+    print(f"[src:test] two-level build elapsed: {elapsed:.4f}s")
+
+
+def case_memory_cap():
+    _clear_scene()
+    active = _add_cube("Mem_Active", (0.0, 0.0, 0.0))
+    _add_cube("Mem_Near", (3.0, 0.0, 0.0))
+    _create_grid_object("Mem_Heavy", location=(20.0, 0.0, 0.0), x_verts=320, y_verts=320)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+
+    # 1 MB holds ~14k points: the 100k grid must fall back despite the budget.
+    with _temporary_prefs(max_vertex_budget=1_000_000, max_index_memory_mb=1):
+        result = detector.build_spatial_tree(bpy.context, active_obj=active)
+
+    assert result.memory_limited and result.limit_exceeded
+    assert "Mem_Heavy" in result.bounds_objects
+    assert 0 < result.memory_bytes <= 1024 * 1024
+    assert set(result.memory_breakdown) >= {"points", "meta", "axes", "exclude", "tree"}
+
+
+def case_multi_object_exclusion():
+    _clear_scene()
+    active = _add_cube("Multi_Active", (0.0, 0.0, 0.0))
+    mate = _add_cube("Multi_Mate", (3.0, 0.0, 0.0))
+    _add_cube("Multi_Target", (6.0, 0.0, 0.0))
+    _add_cube("Multi_Far", (40.0, 0.0, 0.0))
+    _select_only(active)
+    mate.select_set(True)
+    bpy.context.scene.target_scope = "VISIBLE"
+
+    # Budget 16: the two nearest cubes are full, the others BOUNDS; both
+    # moving objects must be excluded whichever way they were inserted.
+    with _temporary_budget(16):
+        result = detector.build_spatial_tree(
+            bpy.context, active_obj=active, moving_objects=[active, mate],
+        )
+
+    hits = result.index.query_range((3.0, 0.0, 0.0), 50.0)
+    owners = {result.index.owner_names[o] for o in hits.owner}
+    assert owners == {"Multi_Target", "Multi_Far"}
+
+
+def case_moving_children():
+    _clear_scene()
+    active = _add_cube("Kid_Parent", (0.0, 0.0, 0.0))
+    child = _add_cube("Kid_Child", (3.0, 0.0, 0.0))
+    child.parent = active
+    _add_cube("Kid_Target", (6.0, 0.0, 0.0))
+    _select_only(active)
+    child.select_set(True)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    # The child follows its parent: moving_selection drops it, and every
+    # index still leaves it out.
+    moving = detector.moving_selection(bpy.context, active)
+    assert moving == [active]
+    with _temporary_budget(100000):
+        result = detector.build_spatial_tree(bpy.context, active_obj=active, moving_objects=moving)
+    hits = result.index.query_range((3.0, 0.0, 0.0), 50.0)
+    assert {result.index.owner_names[o] for o in hits.owner} == {"Kid_Target"}
+    gaps = detector.build_gap_index(bpy.context, active, moving)
+    assert "Kid_Child" not in gaps.owner_names
+    faces = detector.build_face_targets(bpy.context, active, moving)
+    near = faces.query_range((4.5, 0.0, 0.0), 1.0)  # child and target both 0.5 away
+    assert [near.owner_names[o] for o in near.owner] == ["Kid_Target"]
+    assert len(detector.build_occluders(bpy.context, moving)) == 1
+
+
+def case_multi_edit_live_coords():
+    _clear_scene()
+    a = _add_cube("Edit_A", (0.0, 0.0, 0.0))
+    b = _add_cube("Edit_B", (5.0, 0.0, 0.0))
+    _select_only(a)
+    b.select_set(True)
+    bpy.ops.object.mode_set(mode="EDIT")
+    try:
+        # Move one vertex of B in the edit-mesh only: mesh.vertices is stale.
+        bm = bmesh.from_edit_mesh(b.data)
+        bm.verts.ensure_lookup_table()
+        for v in bm.verts:
+            v.select = v.index == 0
+        bm.verts[0].co.z += 10.0
+        bmesh.update_edit_mesh(b.data)
+        bm_a = bmesh.from_edit_mesh(a.data)
+        for v in bm_a.verts:
+            v.select = v.index in {0, 1}
+        bmesh.update_edit_mesh(a.data)
+
+        coords, selected = utils.edit_mesh_arrays(b)
+        assert abs(coords[0][2] - b.data.vertices[0].co.z) < 1e-6 and coords[0][2] > 5.0
+        assert selected.tolist().count(True) == 1
+
+        bpy.context.scene.target_scope = "VISIBLE"
+        utils.edit_mesh_arrays(a)
+        with _temporary_budget(100000):
+            result = detector.build_spatial_tree(
+                bpy.context, active_obj=a,
+                moving_vert_indices={"Edit_A": [0, 1], "Edit_B": [0]},
+            )
+        assert result.point_count == 16
+        hits = result.index.query_range((0.0, 0.0, 0.0), 100.0)
+        assert len(hits) == 16 - 3
+    finally:
+        bpy.ops.object.mode_set(mode="OBJECT")
+
+
+def case_equal_spacing_index():
+    _clear_scene()
+    active = _add_cube("Gap_Active", (12.3, 0.0, 0.0))
+    _add_cube("Gap_A", (0.0, 0.0, 0.0))
+    _add_cube("Gap_B", (4.0, 0.0, 0.0))   # cubes are 2 wide: A-B gap = 2
+    _add_cube("Gap_C", (8.0, 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+
+    gaps = detector.build_gap_index(bpy.context, active, [active])
+    assert len(gaps) == 3 and "Gap_Active" not in gaps.owner_names
+    assert np.allclose(gaps.gaps[0], [2.0, 2.0], atol=1e-5)
+    # Active box spans 11.3..13.3: gap to C is 2.3 -> shift -0.3 to match.
+    matches = gaps.matches(0, (11.3, -1.0, -1.0), (13.3, 1.0, 1.0), max_shift=0.5)
+    assert matches and abs(matches[0].shift + 0.3) < 1e-5
+
+
+def case_occlusion_filter():
+    _clear_scene()
+    active = _add_cube("Occ_Active", (20.0, 0.0, 0.0))
+    ground = _add_cube("Occ_Ground", (0.0, 0.0, 0.0))
+    _add_cube("Occ_Roof", (0.0, 0.0, 4.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "SELF"   # occluders ignore the scope
+    bpy.context.view_layer.update()
+
+    occ = detector.build_occluders(bpy.context, [active])
+    assert len(occ) == 2
+    # Viewer at z = 20 looking down -Z: the roof hides the ground's top face.
+    view = Matrix.Translation((0.0, 0.0, -20.0))
+    pts = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 5.0], [0.5, 0.5, -1.0]])
+    for perspective in (True, False):
+        assert occ.visible(view, perspective, pts).tolist() == [False, True, False]
+    assert cache.object_key(ground) in cache.object_bvhs
+
+    # Edit Mode: triangles touching a moving (top, z = +1) vertex are left out.
+    co = utils.mesh_vertex_coords(ground.data)
+    tree = occlusion.static_part_bvh(ground, np.flatnonzero(co[:, 2] > 0.0))
+    hit = tree.ray_cast((0.0, 0.0, 5.0), (0.0, 0.0, -1.0), 20.0)[0]
+    assert hit is not None and abs(hit.z + 1.0) < 1e-5
+
+
+def case_face_targets():
+    _clear_scene()
+    active = _add_cube("Face_Active", (0.0, 0.0, 6.0))
+    floor = _add_cube("Face_Floor", (0.0, 0.0, 0.0))
+    floor.scale = (10.0, 10.0, 1.0)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    faces = detector.build_face_targets(bpy.context, active, [active])
+    assert len(faces) == 1
+    hits = faces.query_range((3.0, -2.0, 1.5), 2.0)
+    assert hits.owner_names[hits.owner[0]] == "Face_Floor"
+    assert np.allclose(hits.co[0], (3.0, -2.0, 1.0), atol=1e-4) and abs(hits.dist[0] - 0.5) < 1e-4
+    tree = cache.object_bvhs.peek(cache.object_key(floor))
+    assert tree is not None
+    # A second move reuses the tree; moving the floor keys a new one.
+    detector.build_face_targets(bpy.context, active, [active]).query_range((3.0, -2.0, 1.5), 2.0)
+    assert cache.object_bvhs.peek(cache.object_key(floor)) is tree
+    floor.location.x = 1.0
+    bpy.context.view_layer.update()
+    assert cache.object_key(floor) not in cache.object_bvhs
+
+
+def case_edge_targets():
+    _clear_scene()
+    active = _add_cube("Edge_Active", (6.0, 0.0, 0.0))
+    _add_cube("Edge_Target", (0.0, 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    with _temporary_budget(1000):
+        build = detector.build_spatial_tree(bpy.context, active_obj=active, edges=True)
+    kinds = [m.point_type for m in build.point_meta]
+    assert kinds.count("POINT") == 16 and kinds.count("MIDPOINT") == 24
+    # Only the target's 12 edges are segments; the active cube's are excluded.
+    assert len(build.edges) == 12 and "edges" in build.memory_breakdown
+    hits = build.edges.query_range((0.3, -1.0, 1.4), 0.5)
+    assert np.allclose(hits.co[0], (0.3, -1.0, 1.0), atol=1e-5)
+    mids = build.index.query_range((0.0, -1.0, 1.0), 0.1)
+    assert mids.kind.tolist() == [src.core.KIND_MIDPOINT]
+
+
+def case_evaluated_mesh():
+    _clear_scene()
+    active = _add_cube("Eval_Active", (0.0, 0.0, 10.0))
+    arrayed = _add_cube("Eval_Array", (0.0, 0.0, 0.0))
+    mod = arrayed.modifiers.new("Array", "ARRAY")
+    mod.count = 3
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    with _temporary_budget(1000):
+        cage = detector.build_spatial_tree(bpy.context, active_obj=active)
+    with _temporary_prefs(max_vertex_budget=1000, use_evaluated_mesh=True):
+        first = detector.build_spatial_tree(bpy.context, active_obj=active)
+        key = cache.evaluated_key(arrayed, bpy.context.scene.frame_current)
+        coords = cache.evaluated_coords.peek(key)
+        second = detector.build_spatial_tree(bpy.context, active_obj=active)
+    # Active cube (8, excluded but indexed) plus the arrayed cube
+    assert cage.point_count == 8 + 8
+    assert first.point_count == 8 + 24 and second.point_count == 8 + 24
+    # The third array copy (x = 4) only exists in the evaluated mesh.
+    assert len(first.index.query_range((5.0, 1.0, 1.0), 0.01)) == 1
+    assert coords is not None and len(coords) == 24
+    assert cache.evaluated_coords.peek(key) is coords  # reused, not re-extracted
+
+
+def case_collection_instances():
+    _clear_scene()
+    active = _add_cube("Inst_Active", (0.0, 0.0, 10.0))
+    source = _add_cube("Inst_Source", (0.0, 0.0, 0.0))
+    coll = bpy.data.collections.new("Inst_Coll")  # not linked to the scene
+    for users in list(source.users_collection):
+        users.objects.unlink(source)
+    coll.objects.link(source)
+    for name, x in (("Inst_Near", 3.0), ("Inst_Far", -30.0)):
+        empty = bpy.data.objects.new(name, None)
+        empty.instance_type = "COLLECTION"
+        empty.instance_collection = coll
+        empty.location = (x, 0.0, 10.0)
+        bpy.context.scene.collection.objects.link(empty)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    with _temporary_budget(1000):
+        plain = detector.build_spatial_tree(bpy.context, active_obj=active)
+    cache.clear()
+    with _temporary_prefs(max_vertex_budget=1000, include_instances=True):
+        full = detector.build_spatial_tree(bpy.context, active_obj=active)
+    with _temporary_prefs(max_vertex_budget=16, include_instances=True):
+        budgeted = detector.build_spatial_tree(bpy.context, active_obj=active)
+    assert plain.point_count == 8
+    # Both instances share one cached point set, placed by their own matrix.
+    assert full.point_count == 8 + 8 + 8
+    assert len(cache.evaluated_coords) == 1
+    hits = full.index.query_range((4.0, 1.0, 11.0), 0.01)
+    assert [hits.owner_names[o] for o in hits.owner] == ["Inst_Near > Inst_Source"]
+    # The far instance is over budget: bounds corners and origin only.
+    assert budgeted.point_count == 8 + 8 + 9
+    assert budgeted.bounds_objects == ["Inst_Far > Inst_Source"]
+
+
+def case_lod_index():
+    _clear_scene()
+    active = _add_cube("Lod_Active", (0.0, 0.0, 10.0))
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=200, y_subdivisions=200, size=10.0)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    with _temporary_budget(100_000):
+        flat = detector.build_spatial_tree(bpy.context, active_obj=active)
+    with _temporary_prefs(max_vertex_budget=100_000, use_lod_index=True):
+        build = detector.build_spatial_tree(bpy.context, active_obj=active)
+    assert flat.lod is None and build.lod is not None
+    assert build.point_count == flat.point_count == 8 + 200 * 200
+    assert "lod" in build.memory_breakdown
+    coarse = build.lod.levels[0]
+    assert len(coarse.ids) <= 8
+    # Representatives are grid vertices, never the active (moving) cube.
+    owners = {build.index.owner_names[o] for o in build.index.owners[coarse.ids].tolist()}
+    assert owners == {"Grid"}
+    # Zoomed out, a 1-unit query sees far fewer points than the full index.
+    assert len(build.lod.query_range((0.0, 0.0, 0.0), 1.0, 0.5)) < len(
+        build.index.query_range((0.0, 0.0, 0.0), 1.0)) // 10
+
+
+def case_linked_disk_cache():
+    _clear_scene()
+    active = _add_cube("Disk_Active", (0.0, 0.0, 10.0))
+    lib_mesh = bpy.data.meshes.new("Disk_LibMesh")
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=1.0)
+    bm.to_mesh(lib_mesh)
+    bm.free()
+    folder = tempfile.mkdtemp(prefix="smartclip_")
+    lib_path = os.path.join(folder, "library.blend")
+    bpy.data.libraries.write(lib_path, {lib_mesh})
+    bpy.data.meshes.remove(lib_mesh)
+    with bpy.data.libraries.load(lib_path, link=True) as (data_from, data_to):
+        data_to.meshes = ["Disk_LibMesh"]
+    linked = bpy.data.objects.new("Disk_Linked", data_to.meshes[0])
+    linked.location = (3.0, 0.0, 10.0)
+    linked.scale = (2.0, 2.0, -1.0)  # scale only: cached orderings still apply
+    bpy.context.scene.collection.objects.link(linked)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    cache_dir = os.path.join(folder, "cache")
+    settings = dict(max_vertex_budget=100_000, index_layout="TWO_LEVEL",
+                    use_disk_cache=True, disk_cache_dir=cache_dir, disk_cache_mb=0)
+    with _temporary_prefs(**settings):
+        cold = detector.build_spatial_tree(bpy.context, active_obj=active)
+        cold_hits = cold.index.query_range((3.0, 0.0, 11.0), 0.2)
+    files = [n for n in os.listdir(cache_dir) if n.endswith(".scidx")]
+    assert len(files) == 1
+    cache.clear()  # a new session: only the file on disk is left
+    with _temporary_prefs(**settings):
+        arrays = cache.linked_arrays(linked.data)
+        warm = detector.build_spatial_tree(bpy.context, active_obj=active)
+        warm_hits = warm.index.query_range((3.0, 0.0, 11.0), 0.2)
+    assert isinstance(arrays["coords"], np.memmap)
+    assert len(arrays["coords"]) == len(linked.data.vertices)
+    assert np.allclose(warm_hits.co, cold_hits.co) and len(warm_hits) > 0
+    assert cache.library_key(active.data) is None  # local meshes never go to disk
+
+
+def case_background_build():
+    _clear_scene()
+    active = _add_cube("Bg_Active", (0.0, 0.0, 0.0))
+    for i in range(6):
+        bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32,
+                                             location=(3.0 * (i + 1), 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    pool = src.core.BuildPool(workers=4)
+    try:
+        with _temporary_budget(1_000_000):
+            serial = detector.build_spatial_tree(bpy.context, active_obj=active, edges=True)
+            future = detector.submit_spatial_tree(pool, bpy.context, active_obj=active,
+                                                  edges=True)
+        # Meshes were read on this thread; the scene may change meanwhile.
+        active.location.x = 50.0
+        built = future.result(timeout=60)
+    finally:
+        pool.shutdown(wait=True)
+    assert built.point_count == serial.point_count > 6 * 2000
+    assert np.array_equal(built.index.points, serial.index.points)
+    assert len(built.edges) == len(serial.edges)
+    assert built.index.excluded.nbytes == serial.index.excluded.nbytes
+
+
+def case_idle_prefetch():
+    _clear_scene()
+    active = _add_cube("Pre_Active", (0.0, 0.0, 0.0))
+    other = _add_cube("Pre_Other", (3.0, 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    class _Prefs:
+        prefetch_index = True
+        index_layout = "FLAT"
+        max_vertex_budget = 50000
+
+    prefs = _Prefs()
+    key = prefetch.state_key(bpy.context, prefs)
+    assert key is not None and key == prefetch.state_key(bpy.context, prefs)
+
+    # Idle long enough: the build started then is what the move takes.
+    state = src.core.IdlePrefetch(idle_seconds=0.5)
+    assert not state.observe(key, 10.0) and state.observe(key, 10.6)
+    pool = src.core.BuildPool(workers=2)
+    try:
+        state.start(key, detector.submit_spatial_tree(pool, bpy.context,
+                                                      **prefetch.build_args(bpy.context)))
+        built = state.take(prefetch.state_key(bpy.context, prefs)).result(timeout=60)
+    finally:
+        pool.shutdown(wait=True)
+    direct = detector.build_spatial_tree(bpy.context, active_obj=active)
+    assert np.array_equal(built.index.points, direct.index.points)
+
+    # Moving an object or changing the selection makes the key stale.
+    other.location.y = 1.0
+    bpy.context.view_layer.update()
+    moved = prefetch.state_key(bpy.context, prefs)
+    assert moved != key
+    other.select_set(True)
+    assert prefetch.state_key(bpy.context, prefs) != moved
+    prefs.index_layout = "TWO_LEVEL"
+    assert prefetch.state_key(bpy.context, prefs) is None
+
+
+def case_snap_overrides():
+    _clear_scene()
+    active = _add_cube("Ovr_Active", (0.0, 0.0, 0.0))
+    skipped = _add_cube("Ovr_Skipped", (2.0, 0.0, 0.0))
+    near = _add_cube("Ovr_Near", (4.0, 0.0, 0.0))
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=64, ring_count=32, location=(60.0, 0.0, 0.0))
+    hero = bpy.context.active_object
+    hero.name = "Ovr_Hero"
+    clutter = _add_cube("Ovr_Clutter", (3.0, 3.0, 0.0))
+    outer = _new_collection("SC_Ovr_Outer")
+    inner = bpy.data.collections.new("SC_Ovr_Inner")
+    outer.children.link(inner)
+    _link_to_collection(clutter, inner)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+    budget = len(hero.data.vertices) + 8  # not enough for the hero after the cubes
+
+    try:
+        with _temporary_budget(budget):
+            plain = detector.build_spatial_tree(bpy.context, active_obj=active)
+        assert "Ovr_Hero" in plain.bounds_objects
+
+        skipped.smartclip_override.mode = "EXCLUDE"
+        hero.smartclip_override.mode = "FULL"
+        outer.smartclip_override.mode = "BOUNDS"  # inherited by the inner collection
+        with _temporary_budget(budget):
+            result = detector.build_spatial_tree(bpy.context, active_obj=active)
+        assert "Ovr_Skipped" not in result.index.owner_names
+        assert "Ovr_Clutter" in result.bounds_objects
+        # The hero is the farthest object, but indexed first.
+        assert "Ovr_Hero" not in result.bounds_objects
+        assert result.source_vertex_count >= len(hero.data.vertices)
+
+        # A vertex cap below the cube's 8 vertices makes it bounds-only.
+        near.smartclip_override.vertex_cap = 4
+        with _temporary_budget(100_000):
+            capped = detector.build_spatial_tree(bpy.context, active_obj=active)
+        assert "Ovr_Near" in capped.bounds_objects
+        assert "Ovr_Active" not in capped.bounds_objects
+    finally:
+        for id_data in (skipped, hero, near, outer):
+            id_data.smartclip_override.mode = "DEFAULT"
+            id_data.smartclip_override.vertex_cap = 0
+
+
+def case_merge_coincident():
+    _clear_scene()
+    active = _add_cube("Merge_Active", (0.0, 0.0, 10.0))
+    _add_cube("Merge_A", (0.0, 0.0, 0.0))
+    _add_cube("Merge_B", (2.0, 0.0, 0.0))  # shares its -X face with A's +X face
+    _add_cube("Merge_C", (10.0, 0.0, 0.0))
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    with _temporary_budget(1000):
+        plain = detector.build_spatial_tree(bpy.context, active_obj=active)
+    with _temporary_prefs(max_vertex_budget=1000, merge_distance=1e-4):
+        merged = detector.build_spatial_tree(bpy.context, active_obj=active)
+    assert plain.point_count == 32 and merged.point_count == 28
+    # The 4 vertices merged at the seam make room for the farthest cube.
+    with _temporary_budget(28):
+        assert detector.build_spatial_tree(bpy.context, active_obj=active).bounds_objects == [
+            "Merge_C"]
+    with _temporary_prefs(max_vertex_budget=28, merge_distance=1e-4):
+        refilled = detector.build_spatial_tree(bpy.context, active_obj=active)
+    assert not refilled.bounds_objects and refilled.point_count == 28
+    index = merged.index
+    seam = index.query_range((1.0, 1.0, 1.0), 1e-3)
+    assert len(seam) == 1
+    row = int(np.flatnonzero(np.all(np.isclose(index.points, (1.0, 1.0, 1.0)), axis=1))[0])
+    assert {index.owner_names[o] for o in index.owners_of(row)} == {"Merge_A", "Merge_B"}
+    assert sorted(merged.point_meta[row].owner_names) == ["Merge_A", "Merge_B"]
+
+
+def case_vertex_subset():
+    _clear_scene()
+    active = _add_cube("Sub_Active", (0.0, 0.0, 10.0))
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=100, y_subdivisions=100, size=10.0)
+    scan = bpy.context.active_object
+    scan.name = "Sub_Scan"
+    keys = list(range(0, 100, 2))  # 50 vertices along the first row
+    scan.vertex_groups.new(name="Keys").add(keys, 1.0, "REPLACE")
+    marked = scan.data.attributes.new("marked", "BOOLEAN", "POINT")
+    flags = np.zeros(len(scan.data.vertices), dtype=bool)
+    flags[-10:] = True
+    marked.data.foreach_set("value", flags)
+    _select_only(active)
+    bpy.context.scene.target_scope = "VISIBLE"
+    bpy.context.view_layer.update()
+
+    try:
+        with _temporary_budget(500):
+            plain = detector.build_spatial_tree(bpy.context, active_obj=active)
+            assert "Sub_Scan" in plain.bounds_objects
+
+            scan.smartclip_override.vertex_subset = "Keys"
+            grouped = detector.build_spatial_tree(bpy.context, active_obj=active, edges=True)
+            assert "Sub_Scan" not in grouped.bounds_objects
+            owned = grouped.index.owners == grouped.index.owner_names.index("Sub_Scan")
+            points = grouped.index.points[owned & (grouped.index.kinds == 0)]
+            expected = np.array([scan.data.vertices[i].co for i in keys])
+            assert np.allclose(points, expected, atol=1e-5)
+            scan_slot = grouped.edges.owner_names.index("Sub_Scan")
+            assert not np.any(grouped.edges.owners == scan_slot)  # no two keys share an edge
+
+            scan.smartclip_override.vertex_subset = "marked"
+            flagged = detector.build_spatial_tree(bpy.context, active_obj=active, edges=True)
+            # Cube: 8 vertices + 12 midpoints; scan: 10 flagged in a row + 9 midpoints.
+            assert flagged.point_count == 8 + 12 + 10 + 9
+            edge_owners = flagged.edges.owners.tolist()
+            assert edge_owners.count(flagged.edges.owner_names.index("Sub_Scan")) == 9
+
+            # Without modifiers the mask is kept across frame changes.
+            mask = cache.vertex_mask(scan, scan.data, "marked")
+            frame = bpy.context.scene.frame_current
+            bpy.context.scene.frame_set(frame + 5)
+            try:
+                assert cache.vertex_mask(scan, scan.data, "marked") is mask
+            finally:
+                bpy.context.scene.frame_set(frame)
+    finally:
+        scan.smartclip_override.vertex_subset = ""
+
+
+def case_batched_bound_arrays():
+    _clear_scene()
+    a = _add_cube("Batch_A", (1.0, 2.0, 3.0))
+    b = _add_cube("Batch_B", (-4.0, 0.5, 2.0))
+    b.rotation_euler = (0.3, -0.7, 1.1)
+    b.scale = (1.0, 2.5, 0.5)
+    bpy.context.view_layer.update()
+
+    corners, matrices = utils.object_bound_arrays([b, a])
+    for obj, c, m in ((b, corners[0], matrices[0]), (a, corners[1], matrices[1])):
+        assert np.allclose(c, np.array(obj.bound_box), atol=1e-5)
+        assert np.allclose(m, np.array(obj.matrix_world), atol=1e-5)
+
+
 CASES = {
     "scene_props": case_scene_properties_registered,
     "scope_self": case_scope_self,
@@ -291,6 +857,25 @@ CASES = {
     "budget_fallback": case_budget_fallback_with_cubes,
     "scope_collection": case_scope_collection,
     "stress_100k": case_stress_100k_vertices,
+    "two_level_lazy": case_two_level_lazy_load,
+    "memory_cap": case_memory_cap,
+    "multi_object": case_multi_object_exclusion,
+    "moving_children": case_moving_children,
+    "multi_edit": case_multi_edit_live_coords,
+    "equal_spacing": case_equal_spacing_index,
+    "occlusion": case_occlusion_filter,
+    "face_targets": case_face_targets,
+    "edge_targets": case_edge_targets,
+    "evaluated_mesh": case_evaluated_mesh,
+    "instances": case_collection_instances,
+    "lod_index": case_lod_index,
+    "disk_cache": case_linked_disk_cache,
+    "background_build": case_background_build,
+    "idle_prefetch": case_idle_prefetch,
+    "snap_overrides": case_snap_overrides,
+    "merge_coincident": case_merge_coincident,
+    "vertex_subset": case_vertex_subset,
+    "batched_bounds": case_batched_bound_arrays,
 }
 
 
@@ -0,0 +1,992 @@
+"""Plain-CPython tests for the snap core (no Blender required).
+
+Usage:
+  python -m pytest -q tests
+"""
+
+import os
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+import smartclip_core as core
+
+
+def _look_down_z(width=800, height=600, scale=0.1):
+    """Orthographic-style matrix looking down -Z; 1 world unit = 40 px."""
+    m = np.eye(4)
+    m[0, 0] = scale
+    m[1, 1] = scale * width / height
+    return core.ViewProjection(m, width, height)
+
+
+def _grid_points(n=10, spacing=1.0):
+    xs = np.arange(n) * spacing
+    gx, gy = np.meshgrid(xs, xs, indexing="ij")
+    return np.column_stack((gx.ravel(), gy.ravel(), np.zeros(gx.size)))
+
+
+def _index(points, **kw):
+    n = len(points)
+    return core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Grid"], **kw)
+
+
+def test_projection_matches_region_formula():
+    view = _look_down_z()
+    xy, ok = view.project([[0.0, 0.0, 0.0], [1.0, 2.0, 0.0]])
+    assert ok.all()
+    assert xy[0].tolist() == [400.0, 300.0]
+    assert xy[1] == pytest.approx([440.0, 300.0 + 2 * 40.0])
+
+
+def test_projection_rejects_points_behind_viewer():
+    m = np.eye(4)
+    m[3] = (0.0, 0.0, -1.0, 0.0)  # w = -z: only z < 0 is visible
+    view = core.ViewProjection(m, 100, 100)
+    _xy, ok = view.project([[0.0, 0.0, -1.0], [0.0, 0.0, 1.0]])
+    assert ok.tolist() == [True, False]
+    assert view.project_point((0.0, 0.0, 1.0)) is None
+
+
+def test_transform_points_applies_translation_and_rotation():
+    m = np.eye(4)
+    m[:3, :3] = [[0, -1, 0], [1, 0, 0], [0, 0, 1]]  # +90 deg about Z
+    m[:3, 3] = (10.0, 0.0, 0.0)
+    out = core.transform_points([[1.0, 0.0, 0.0]], m)
+    assert out[0] == pytest.approx([10.0, 1.0, 0.0])
+
+
+def test_linear_backend_range_sorted_by_distance():
+    pts = _grid_points(5)
+    backend = core.LinearBackend(pts)
+    ids, dist = backend.find_range((0.1, 0.0, 0.0), 1.05)
+    assert ids.tolist()[0] == 0
+    assert np.all(np.diff(dist) >= 0)
+    assert set(ids.tolist()) == {0, 1, 5}
+
+
+def test_query_range_skips_excluded_points():
+    pts = _grid_points(3)
+    excluded = np.zeros(len(pts), dtype=bool)
+    excluded[0] = True
+    index = _index(pts, excluded=excluded)
+    hits = index.query_range((0.0, 0.0, 0.0), 1.01)
+    assert [0.0, 0.0, 0.0] not in hits.co.tolist()
+    assert len(hits) == 2
+
+
+def test_score_range_hits_filters_by_pixels_and_orders_by_score():
+    pts = _grid_points(10)
+    index = _index(pts)
+    view = _look_down_z()
+    center = (2.1, 2.0, 0.0)
+    mouse = view.project_point(center)
+    hits = index.query_range(center, 5.0)
+    cands = core.score_range_hits(hits, center, view, mouse, snap_distance_px=30)
+    assert cands
+    assert cands[0].location == (2.0, 2.0, 0.0)
+    assert all(c.screen_dist <= 30 for c in cands)
+    assert [c.score for c in cands] == sorted(c.score for c in cands)
+    assert cands[0].owner_name == "Grid"
+
+
+def test_axis_window_and_dedup_keep_one_candidate_per_value():
+    pts = _grid_points(10)
+    index = _index(pts)
+    view = _look_down_z()
+    center = (3.2, 7.5, 0.0)
+    hits = index.axis_window(0, center[0], 10.0)
+    cands = core.score_axis_hits(hits, 0, center, view, view.project_point(center))
+    values = [c.location[0] for c in cands]
+    assert len(values) == len(set(values)) == 10
+    assert cands[0].kind == "ALIGN_X"
+    assert cands[0].location == (3.0, 7.5, 0.0)
+
+
+def test_axis_window_respects_limit():
+    pts = _grid_points(10)
+    index = _index(pts)
+    hits = index.axis_window(0, 4.5, 100.0, limit=7)
+    assert len(hits) == 7
+
+
+@pytest.mark.parametrize("name", ["GRID", "STATIC", "LINEAR"])
+def test_backends_agree_with_brute_force(name):
+    rng = np.random.default_rng(7)
+    pts = np.vstack((rng.uniform(-20, 20, (3000, 3)), rng.normal(5.0, 0.2, (2000, 3))))
+    ref = core.LinearBackend(pts)
+    backend = core.BACKENDS[name](pts)
+    for center, radius in (((0, 0, 0), 3.0), ((5, 5, 5), 0.5), ((40, 40, 40), 2.0), ((1, -2, 3), 60.0)):
+        ids, dist = backend.find_range(center, radius)
+        ref_ids, ref_dist = ref.find_range(center, radius)
+        assert sorted(ids.tolist()) == sorted(ref_ids.tolist())
+        assert np.allclose(np.sort(dist), np.sort(ref_dist))
+        assert np.all(np.diff(dist) >= 0)
+
+
+def test_backends_handle_flat_and_empty_inputs():
+    flat = _grid_points(40, spacing=0.25)
+    for name in ("GRID", "STATIC"):
+        ids, _ = core.BACKENDS[name](flat).find_range((1.0, 1.0, 0.0), 0.3)
+        assert len(ids) == 5  # centre + 4 edge neighbours (diagonals at 0.354)
+        ids, _ = core.BACKENDS[name](np.empty((0, 3))).find_range((0, 0, 0), 1.0)
+        assert len(ids) == 0
+
+
+def test_choose_backend_heuristic():
+    rng = np.random.default_rng(3)
+    assert core.choose_backend(rng.uniform(0, 1, (100, 3))) == "LINEAR"
+    assert core.choose_backend(rng.uniform(0, 10, (20_000, 3))) == "GRID"
+    clustered = np.vstack([rng.normal(c, 0.05, (2000, 3)) for c in rng.uniform(-100, 100, (10, 3))])
+    # No mathutils outside Blender -> the NumPy static tree.
+    assert core.choose_backend(clustered) == "STATIC"
+
+
+def test_forced_kdtree_outside_blender_falls_back():
+    pts = _grid_points(5)
+    index = _index(pts, backend="KDTREE")
+    assert index.backend.name != "KDTREE"
+
+
+def test_lru_cache_evicts_by_weight():
+    lru = core.LRUCache(capacity=10)
+    lru.put("a", 1, weight=4)
+    lru.put("b", 2, weight=4)
+    assert lru.get("a") == 1          # "a" becomes most recent
+    lru.put("c", 3, weight=4)         # evicts "b"
+    assert "b" not in lru and "a" in lru and "c" in lru
+    lru.put("huge", 4, weight=50)     # newest entry is always kept
+    assert list(lru._items) == ["huge"]
+    assert lru.total == 50
+
+
+def test_aabb_tree_matches_brute_force():
+    rng = np.random.default_rng(11)
+    lo = rng.uniform(-100, 100, (500, 3))
+    hi = lo + rng.uniform(0.1, 5.0, (500, 3))
+    tree = core.AabbTree(lo, hi)
+    for center, radius in (((0, 0, 0), 10.0), ((50, -20, 5), 3.0), ((500, 0, 0), 1.0)):
+        c = np.asarray(center, dtype=float)
+        near = np.clip(c, lo, hi)
+        expected = np.flatnonzero(((near - c) ** 2).sum(axis=1) <= radius * radius)
+        assert tree.query_sphere(center, radius).tolist() == expected.tolist()
+    qlo, qhi = np.array([-30.0, -100.0, -2.0]), np.array([30.0, 100.0, 2.0])
+    expected = np.flatnonzero(np.all((lo <= qhi) & (hi >= qlo), axis=1))
+    assert tree.query_box(qlo, qhi).tolist() == expected.tolist()
+
+
+def _two_level_scene():
+    """Three 10x10 grids, 20 units apart along X."""
+    grids = [_grid_points(10) + (x, 0.0, 0.0) for x in (0.0, 20.0, 40.0)]
+    corners = []
+    for g in grids:
+        lo, hi = g.min(axis=0), g.max(axis=0)
+        corners.append([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    return grids, np.array(corners)
+
+
+def test_two_level_loads_objects_only_on_overlap():
+    grids, corners = _two_level_scene()
+    loaded = []
+
+    def loader(i):
+        loaded.append(i)
+        return grids[i], None
+
+    cache = core.LRUCache(capacity=1000)
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], loader,
+                               cache_keys=["a", "b", "c"], cache=cache)
+    assert loaded == []
+    hits = index.query_range((21.0, 1.0, 0.0), 1.5)
+    assert loaded == [1]
+    assert set(hits.owner.tolist()) == {1}
+    assert np.all(np.diff(hits.dist) >= 0)
+    assert len(index) == 100
+
+    # Shared cache: a second session reuses the built index.
+    again = core.TwoLevelIndex(corners, ["A", "B", "C"], loader,
+                               cache_keys=["a", "b", "c"], cache=cache)
+    again.query_range((21.0, 1.0, 0.0), 1.5)
+    assert loaded == [1] and again.loads == 0
+
+
+def test_two_level_excluded_objects_and_axis_corners():
+    grids, corners = _two_level_scene()
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], lambda i: (grids[i], None),
+                               excluded_objects=[0])
+    assert len(index.query_range((4.0, 4.0, 0.0), 3.0)) == 0
+
+    index.query_range((44.0, 4.0, 0.0), 1.0)        # load C only
+    hits = index.axis_window(1, 8.8, 0.5)
+    owners = set(hits.owner.tolist())
+    assert 0 not in owners and owners == {1, 2}
+    kinds_b = {int(k) for k, o in zip(hits.kind, hits.owner) if o == 1}
+    assert kinds_b == {core.KIND_BOUNDS}            # B unloaded: box corners only
+
+
+def test_bbox_centers_match_transformed_corners():
+    rng = np.random.default_rng(5)
+    corners = rng.uniform(-1, 1, (20, 8, 3))
+    mats = np.tile(np.eye(4), (20, 1, 1))
+    mats[:, :3, :3] = rng.uniform(-2, 2, (20, 3, 3))
+    mats[:, :3, 3] = rng.uniform(-50, 50, (20, 3))
+    expected = core.transform_corners(corners, mats).mean(axis=1)
+    assert np.allclose(core.bbox_centers(corners, mats), expected)
+
+
+def test_iter_nearest_yields_sorted_prefixes():
+    rng = np.random.default_rng(9)
+    d2 = rng.uniform(0, 100, 5000)
+    d2[10:20] = 1.0  # ties keep input order
+    seen = np.concatenate(list(core.iter_nearest(d2, first_chunk=16)))
+    assert seen.tolist() == np.argsort(d2, kind="stable").tolist()
+
+
+def test_allocate_vertex_budget_matches_greedy_sort():
+    rng = np.random.default_rng(13)
+    d2 = rng.uniform(0, 1000, 3000)
+    counts = rng.integers(1, 5000, 3000)
+    budget = 60_000
+    full, bounds = core.allocate_vertex_budget(d2, counts, budget)
+
+    expected, left = [], budget
+    for i in np.argsort(d2, kind="stable").tolist():
+        if counts[i] <= left:
+            expected.append(i)
+            left -= counts[i]
+    assert full == expected
+    assert sorted(full + bounds.tolist()) == list(range(3000))
+
+
+def test_allocate_vertex_budget_stops_early():
+    d2 = np.arange(100_000, dtype=float)
+    counts = np.full(100_000, 10)
+    full, bounds = core.allocate_vertex_budget(d2, counts, 55)
+    assert full == [0, 1, 2, 3, 4]
+    assert len(bounds) == 99_995
+
+
+def test_allocate_vertex_budget_honours_overrides():
+    d2 = np.arange(10, dtype=float)
+    counts = np.full(10, 10)
+    always_full = np.zeros(10, dtype=bool)
+    always_full[[9, 7]] = True
+    bounds_only = np.zeros(10, dtype=bool)
+    bounds_only[[0, 7]] = True  # bounds-only beats always-full
+    priority = np.ones(10)
+    priority[6] = 10.0  # competes as if 10x nearer: d2 6 -> 0.06
+    full, bounds = core.allocate_vertex_budget(d2, counts, 40, always_full=always_full,
+                                               bounds_only=bounds_only, priority=priority)
+    assert full == [9, 6, 1, 2]
+    assert bounds.tolist()[:2] == [0, 7] and sorted(full + bounds.tolist()) == list(range(10))
+    # Forced objects may use up the whole budget on their own.
+    full, _ = core.allocate_vertex_budget(d2, counts, 15, always_full=np.ones(10, dtype=bool))
+    assert full == list(range(10))
+
+
+@pytest.mark.parametrize("name", ["LINEAR", "GRID", "STATIC"])
+def test_memory_breakdown_counts_owned_arrays(name):
+    pts = np.random.default_rng(21).uniform(0, 10, (5000, 3))
+    index = _index(pts, backend=name)
+    mem = index.memory_breakdown()
+    assert mem["points"] == 5000 * 12            # float32 xyz
+    assert mem["meta"] == 5000 * 5               # uint8 kind + int32 owner
+    assert mem["axes"] == 5000 * 3 * 8           # int32 order + float32 value
+    assert mem["exclude"] == 0                    # nothing excluded
+    assert mem["tree"] <= 5000 * core.BACKENDS[name].bytes_per_point * 1.5 + 4096
+    assert sum(mem.values()) <= 5000 * core.bytes_per_point(name) * 1.5 + 4096
+
+
+def test_points_for_memory_respects_backend_cost():
+    assert core.points_for_memory(0) == 0
+    worst = core.points_for_memory(64)
+    assert worst <= core.points_for_memory(64, "LINEAR")
+    assert core.points_for_memory(64, "GRID") * core.bytes_per_point("GRID") <= 64 * 1024 * 1024
+    assert core.format_bytes(512) == "512 B"
+    assert core.format_bytes(3 * 1024 * 1024) == "3.0 MB"
+    text = core.format_breakdown({"points": 2048, "tree": 0})
+    assert text == "2.0 KB (points 2.0 KB)"
+
+
+def test_memory_cap_covers_edge_index():
+    n = 100
+    ids = np.arange(n * n).reshape(n, n)
+    edges = np.concatenate((np.column_stack((ids[:-1].ravel(), ids[1:].ravel())),
+                            np.column_stack((ids[:, :-1].ravel(), ids[:, 1:].ravel()))))
+    parts = core.FlatParts(
+        owners=np.array([0]), coords=[_grid_points(n).astype(np.float32)],
+        matrices=np.eye(4)[None], moving=np.array([False]), edges={0: edges},
+        bounds_owners=np.empty(0, dtype=np.int64), bounds_corners=np.zeros((0, 8, 3)),
+        bounds_matrices=np.zeros((0, 4, 4)), bounds_moving=np.empty(0, dtype=bool),
+    )
+    index, edge_index, _ = core.assemble_flat_index(parts, ["Grid"], backend="GRID")
+    measured = sum(index.memory_breakdown().values()) + edge_index.nbytes
+    units = n * n + len(edges)   # vertices + edge midpoints, as budgeted
+    share = len(edges) / units
+    assert measured > units * core.bytes_per_point("GRID")
+    assert measured <= units * core.bytes_per_point("GRID", share)
+    mb = measured / (1024 * 1024)
+    assert core.points_for_memory(mb, "GRID", share) < core.points_for_memory(mb, "GRID")
+
+
+@pytest.mark.parametrize("name", ["GRID", "STATIC"])
+def test_memory_cap_covers_detail_levels(name):
+    # Clusters at many scales keep several levels alive at once.
+    rng = np.random.default_rng(23)
+    pts = np.concatenate([rng.normal(0, 10.0 ** -k, (4000, 3)) + k for k in range(4)])
+    index = _index(pts, backend=name)
+    lod = core.LodIndex(index, backend=name)
+    assert sum(len(level.ids) for level in lod.levels) <= core.lod.MAX_TOTAL_FRACTION * len(pts)
+    measured = sum(index.memory_breakdown().values()) + lod.nbytes
+    assert measured <= len(pts) * core.bytes_per_point(name, lod=True)
+    assert core.points_for_memory(64, name, lod=True) < core.points_for_memory(64, name)
+
+
+def test_two_level_memory_covers_loaded_objects():
+    grids, corners = _two_level_scene()
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], lambda i: (grids[i], None))
+    before = index.memory_breakdown()
+    assert set(before) == {"objects"}
+    index.query_range((21.0, 1.0, 0.0), 1.5)
+    after = index.memory_breakdown()
+    assert after["points"] == 100 * 12
+
+
+def test_exclusion_ranges_and_bitmaps_match_mask():
+    n = 1000
+    expected = np.zeros(n, dtype=bool)
+    ex = core.Exclusion()
+    assert not ex
+    ex.add_range(600, 700)
+    ex.add_range(100, 150)
+    expected[100:150] = expected[600:700] = True
+    sel = [0, 3, 17, 199]
+    ex.add_selection(300, 200, sel + [250])       # out-of-slice index ignored
+    expected[[300 + i for i in sel]] = True
+    ids = np.random.default_rng(3).integers(0, n, 5000)
+    assert np.array_equal(ex.mask(ids), expected[ids])
+    assert ex.nbytes < 64
+
+    from_mask = core.Exclusion.from_mask(expected)
+    assert np.array_equal(from_mask.mask(np.arange(n)), expected)
+
+
+def test_exclusion_filters_several_objects_in_queries():
+    pts = _grid_points(10)
+    ex = core.Exclusion()
+    ex.add_range(0, 10)                           # row x = 0
+    ex.add_range(90, 100)                         # row x = 9
+    ex.add_selection(50, 10, [5])                 # single vertex (5, 5)
+    index = _index(pts, excluded=ex)
+    hits = index.query_range((5.0, 5.0, 0.0), 20.0)
+    assert len(hits) == 100 - 21
+    assert not np.any(np.all(hits.co == (5.0, 5.0, 0.0), axis=1))
+    window = index.axis_window(0, 9.0, 0.1)
+    assert len(window) == 0
+
+
+def test_query_range_multi_matches_per_source_queries():
+    pts = np.random.default_rng(31).uniform(0, 10, (4000, 3))
+    index = _index(pts, backend="GRID")
+    rng = np.random.default_rng(32)
+    for sources in (rng.uniform(4, 5, (8, 3)), rng.uniform(0, 10, (8, 3))):  # clustered, spread
+        hits = index.query_range_multi(sources, 0.6)
+        assert np.all(np.diff(hits.dist) >= 0)
+        expected = set()
+        for j, s in enumerate(sources):
+            one = index.query_range(s, 0.6)
+            expected |= {(j, tuple(c)) for c in one.co.tolist()}
+        assert {(int(j), tuple(c)) for j, c in zip(hits.source, hits.co.tolist())} == expected
+
+
+def test_score_source_hits_moves_pivot_onto_target():
+    view = _look_down_z()
+    index = _index(np.array([[2.0, 0.0, 0.0], [9.0, 9.0, 0.0]]))
+    pivot = np.array([0.0, 0.0, 0.0])
+    sources = np.array([[0.0, 0.0, 0.0], [1.9, 0.1, 0.0]])    # pivot + one corner
+    hits = index.query_range_multi(sources, 1.0)
+    cands = core.score_source_hits(hits, sources, pivot, view, 30)
+    assert len(cands) == 1
+    best = cands[0]
+    assert best.source == (1.9, 0.1, 0.0)
+    assert np.allclose(best.location, (0.1, -0.1, 0.0))
+    assert np.allclose(best.reference, (2.0, 0.0, 0.0))
+
+
+def test_constrained_source_hits_stay_on_the_constraint():
+    view = _look_down_z()
+    index = _index(np.array([[6.0, 0.3, 0.0], [1.9, 0.4, 0.0], [2.0, 5.0, 0.0]]))
+    pivot = np.array([0.0, 0.0, 0.0])
+    sources = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    # Locked to X: the far target on the source's line is found, off-line ones are not.
+    hits = core.query_constrained_multi(index, sources, [0], 0.5, 25.0)
+    assert sorted(set(hits.source.tolist())) == [0, 1] and np.all(np.diff(hits.dist) >= 0)
+    cands = core.score_source_hits(hits, sources, pivot, view, 1000, free_axes=[0])
+    assert all(c.location[1] == 0.0 and c.location[2] == 0.0 for c in cands)
+    best = cands[0]   # source 1 onto (1.9, 0.4): slides 0.9 along X, 0.4 off the line
+    assert best.source == (1.0, 0.0, 0.0) and np.allclose(best.location, (0.9, 0.0, 0.0))
+    assert np.allclose(best.reference, (1.9, 0.4, 0.0))
+    # In the XY plane every target is in reach and the pivot lands on it.
+    hits = core.query_constrained_multi(index, sources, [0, 1], 0.5, 25.0)
+    assert len(hits) == 6
+    plane = core.score_source_hits(hits, sources, pivot, view, 1000, free_axes=[0, 1])
+    assert np.allclose(plane[0].location, (0.9, 0.4, 0.0))
+
+
+def test_limit_points_keeps_extremes():
+    pts = np.random.default_rng(4).uniform(-1, 1, (500, 3))
+    out = core.limit_points(pts, 20)
+    assert len(out) == 20
+    for axis in range(3):
+        assert out[:, axis].min() == pts[:, axis].min()
+        assert out[:, axis].max() == pts[:, axis].max()
+    assert len(core.limit_points(pts[:5], 20)) == 5
+
+
+def test_line_and_slab_queries_match_brute_force():
+    pts = np.random.default_rng(41).uniform(-5, 5, (6000, 3))
+    excluded = np.zeros(len(pts), dtype=bool)
+    excluded[::7] = True
+    index = _index(pts, excluded=excluded)
+    p32 = index.points.astype(np.float64)
+    origin = np.array([0.5, -1.0, 2.0])
+    d = p32 - origin
+
+    hits = index.query_line(origin, 0, 0.8, 3.0)
+    perp = np.hypot(d[:, 1], d[:, 2])
+    expected = (perp <= 0.8) & (np.abs(d[:, 0]) <= 3.0) & ~excluded
+    assert len(hits) == expected.sum()
+    assert np.allclose(np.sort(hits.dist), np.sort(perp[expected]))
+    assert np.all(np.diff(hits.dist) >= 0)
+
+    hits = index.query_slab(origin, 2, 0.3, 2.5)
+    in_plane = np.hypot(d[:, 0], d[:, 1])
+    expected = (np.abs(d[:, 2]) <= 0.3) & (in_plane <= 2.5) & ~excluded
+    assert len(hits) == expected.sum()
+    assert np.allclose(np.sort(hits.dist), np.sort(np.abs(d[expected, 2])))
+
+
+def test_constrained_scoring_projects_targets_onto_the_line():
+    view = _look_down_z()
+    # Target off the X line through the origin, outside a sphere query but
+    # inside the cylinder.
+    index = _index(np.array([[4.0, 0.5, 0.0], [0.0, 3.0, 0.0]]))
+    origin = (3.9, 0.0, 0.0)
+    assert len(index.query_range(origin, 0.3)) == 0
+    hits = index.query_line(origin, 0, 1.0, 5.0)
+    cands = core.score_constrained_hits(hits, origin, (0,), view,
+                                        view.project_point(origin), 30)
+    assert [c.location for c in cands] == [(4.0, 0.0, 0.0)]
+    assert cands[0].reference == (4.0, 0.5, 0.0)
+
+
+def test_two_level_line_query_loads_objects_along_the_line():
+    grids, corners = _two_level_scene()
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], lambda i: (grids[i], None))
+    hits = index.query_line((21.0, 1.0, 0.0), 1, 0.2, 50.0)
+    assert set(hits.owner.tolist()) == {1} and index.loads == 1
+    assert np.allclose(hits.co[:, 0], 21.0)
+
+
+def test_two_level_caps_loads_per_query_with_box_corners_for_the_rest():
+    grids, corners = _two_level_scene()
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], lambda i: (grids[i], None),
+                               max_loads=1)
+    hits = index.query_line((24.5, 0.0, 0.0), 0, 0.2, 100.0)   # crosses all three
+    assert index.loads == 1 and index._peek(1) is not None     # nearest box first
+    assert {int(o) for o, k in zip(hits.owner, hits.kind) if k == core.KIND_POINT} == {1}
+    assert {int(o) for o, k in zip(hits.owner, hits.kind) if k == core.KIND_BOUNDS} == {0, 2}
+    index.query_line((24.5, 0.0, 0.0), 0, 0.2, 100.0)
+    assert index.loads == 2                                     # one more per query
+
+
+def test_two_level_uncached_indices_count_against_capacity():
+    grids, corners = _two_level_scene()
+    cache = core.LRUCache(capacity=250)
+    index = core.TwoLevelIndex(corners, ["A", "B", "C"], lambda i: (grids[i], None),
+                               cache_keys=[None, "b", "c"], cache=cache)
+    index.object_index(1)
+    index.object_index(2)
+    assert cache.total == 200
+    index.object_index(0)                                       # uncached: 100 more
+    assert "b" not in cache and "c" in cache
+    assert cache.total + index._local.total <= index.capacity == 250
+    assert len(index) == 200
+
+
+def test_combine_axis_candidates_is_bounded_and_prefers_more_axes():
+    view = _look_down_z()
+    center = (0.0, 0.0, 0.0)
+    mouse = view.project_point(center)
+    pts = np.random.default_rng(51).uniform(-3, 3, (2000, 3))
+    index = _index(pts)
+    per_axis = [
+        core.score_axis_hits(index.axis_window(a, center[a], 5.0), a, center, view, mouse)
+        for a in (0, 2)
+    ]
+    assert all(len(c) > 100 for c in per_axis)
+    combos = core.combine_axis_candidates(per_axis, center, view, mouse, top_k=3)
+    assert len(combos) == 9
+    best = combos[0]
+    assert best.kind == "ALIGN_XZ" and len(best.references) == 2
+    assert best.location[0] == per_axis[0][0].location[0]
+    assert best.location[2] == per_axis[1][0].location[2]
+    assert best.location[1] == 0.0
+    assert best.score == per_axis[0][0].score + per_axis[1][0].score
+
+    three = core.combine_axis_candidates(per_axis + [per_axis[0][:0]], center, view, mouse)
+    assert all(c.kind == "ALIGN_XZ" for c in three)        # empty axis list ignored
+
+
+def test_combine_axis_candidates_only_uses_values_within_reach():
+    view = _look_down_z()
+    center = (0.0, 0.0, 0.0)
+    mouse = view.project_point(center)
+    # X aligns 0.1 or 5 away; Z only 7 or 8 away.
+    index = _index(np.array([[0.1, 3.0, 7.0], [5.0, 3.0, 8.0]]))
+    per_axis = [
+        core.score_axis_hits(index.axis_window(a, center[a], 10.0), a, center, view, mouse)
+        for a in (0, 2)
+    ]
+    assert len(core.combine_axis_candidates(per_axis, center, view, mouse)) == 4
+    assert core.combine_axis_candidates(per_axis, center, view, mouse, max_axis_dist=5.0) == []
+    near = core.combine_axis_candidates(per_axis, center, view, mouse, max_axis_dist=7.5)
+    assert len(near) == 2 and all(c.location[2] == 7.0 for c in near)
+    assert near[0].location[0] == per_axis[0][0].location[0]
+
+
+def _row_of_boxes(starts, width=1.0):
+    """Unit-height boxes along X at the given lower bounds (one row)."""
+    lo = np.array([[x, 0.0, 0.0] for x in starts])
+    return lo, lo + (width, 1.0, 1.0)
+
+
+def test_gap_index_pairs_row_neighbours_only():
+    lo, hi = _row_of_boxes([0.0, 3.0, 5.0])
+    # A box far away on Y is not part of the row.
+    lo = np.vstack((lo, [1.5, 10.0, 0.0]))
+    hi = np.vstack((hi, [2.5, 11.0, 1.0]))
+    gaps = core.GapIndex(lo, hi, ["A", "B", "C", "Off"])
+    assert gaps.gaps[0].tolist() == [1.0, 2.0]
+    assert gaps.gap_pairs[0].tolist() == [[1, 2], [0, 1]]
+    assert gaps.neighbours(0, (7.2, 0.2, 0.2), (8.2, 0.8, 0.8)) == (2, -1)
+    assert gaps.neighbours(0, (1.2, 0.2, 0.2), (2.2, 0.8, 0.8)) == (0, 1)
+
+
+def test_gap_index_matches_equal_gap_and_centering():
+    lo, hi = _row_of_boxes([0.0, 3.0, 10.0])
+    gaps = core.GapIndex(lo, hi, ["A", "B", "C"])
+    # Moving box right of B with a 2.3 gap: snapping to B-A's 2.0 gap.
+    m = gaps.matches(0, (6.3, 0.0, 0.0), (7.3, 1.0, 1.0), max_shift=0.5)
+    equal = [x for x in m if x.mode == core.SPACING_EQUAL]
+    assert equal and np.isclose(equal[0].shift, -0.3) and equal[0].reference == (0, 1)
+    # Centred between B (ends 4) and C (starts 10): box of width 1 at 6.4.
+    m = gaps.matches(0, (6.4, 0.0, 0.0), (7.4, 1.0, 1.0), max_shift=0.5)
+    center = [x for x in m if x.mode == core.SPACING_CENTER]
+    assert center and np.isclose(center[0].shift, 0.1) and np.isclose(center[0].gap, 2.5)
+    assert gaps.matches(0, (6.4, 0.0, 0.0), (7.4, 1.0, 1.0), max_shift=0.01) == []
+
+
+def test_score_spacing_matches_shifts_pivot_along_axis():
+    view = _look_down_z()
+    lo, hi = _row_of_boxes([0.0, 3.0, 10.0])
+    gaps = core.GapIndex(lo, hi, ["A", "B", "C"])
+    pivot = np.array([6.8, 0.5, 0.5])
+    matches = gaps.matches(0, (6.3, 0.0, 0.0), (7.3, 1.0, 1.0), max_shift=1.0)
+    cands = core.score_spacing_matches(matches, pivot, view, view.project_point(pivot), 30,
+                                       gaps.owner_names)
+    assert cands and all(c.kind == "SPACING_X" for c in cands)
+    best = cands[0]
+    assert np.isclose(best.location[0], 6.8 + 0.2) and best.location[1:] == (0.5, 0.5)
+    assert best.owner_name == "B - C" and len(best.segments) == 2
+
+
+def test_segment_box_overlap_matches_sampling():
+    rng = np.random.default_rng(5)
+    lo = rng.uniform(-5, 4, (20, 3))
+    hi = lo + rng.uniform(0.2, 2.0, (20, 3))
+    start = rng.uniform(-6, 6, (30, 3))
+    end = rng.uniform(-6, 6, (30, 3))
+    end[0] = start[0] + [0.0, 0.0, 3.0]  # axis-parallel segment
+    got = core.segment_box_overlap(start, end, lo, hi)
+    t = np.linspace(0.0, 1.0, 2001)[:, None, None]
+    samples = start[None] + t * (end - start)[None]                    # (t, k, 3)
+    inside = ((samples[:, :, None] >= lo) & (samples[:, :, None] <= hi)).all(axis=3)
+    assert (got >= inside.any(axis=0)).all()  # sampling can only miss hits
+
+
+def test_visibility_cache_casts_unknown_points_once_per_view():
+    cache = core.VisibilityCache(max_views=2)
+    calls = []
+
+    def cast(pts):
+        calls.append(len(pts))
+        return pts[:, 2] > 0.0
+
+    pts = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]])
+    view_a, view_b = core.view_key(np.eye(4)), core.view_key(np.diag([2.0, 1.0, 1.0, 1.0]))
+    assert core.view_key(np.eye(4) * -0.0 + np.eye(4)) == view_a
+    assert cache.resolve(view_a, pts, cast).tolist() == [True, False]
+    assert cache.resolve(view_a, pts + 1e-7, cast).tolist() == [True, False]
+    assert calls == [2]
+    cache.resolve(view_b, pts[:1], cast)
+    assert calls == [2, 1] and cache.lookup(view_b, pts).tolist() == [1, -1]
+    assert len(cache) == 3
+
+
+def test_filter_visible_casts_only_the_top_batches():
+    cands = [core.CoreCandidate("POINT", (i, 0, 0), (i, 0, 0), float(i), float(i), "A")
+             for i in range(20)]
+    tested = []
+
+    def is_visible(pts):
+        tested.extend(pts[:, 0].tolist())
+        return pts[:, 0] >= 5
+
+    out = core.filter_visible(cands, is_visible, top_k=4)
+    assert tested == list(range(8)) and [c.location[0] for c in out] == [5, 6, 7]
+    assert core.filter_visible(cands, lambda p: np.zeros(len(p), bool), max_checks=6) == []
+
+
+def test_range_candidates_are_tested_at_their_own_location():
+    pts = _grid_points(10)
+    view = _look_down_z()
+    center = (2.1, 2.0, 0.0)
+    cands = core.score_range_hits(_index(pts).query_range(center, 5.0), center, view,
+                                  view.project_point(center), snap_distance_px=30)
+    assert all(c.reference == c.location for c in cands)
+    # The moving vertex at the query centre hides itself, not the targets.
+    out = core.filter_visible(cands, lambda p: np.linalg.norm(p - center, axis=1) > 1e-6,
+                              top_k=4)
+    assert [c.location for c in out] == [c.location for c in cands[:4]]
+
+
+def test_face_targets_query_only_reached_objects():
+    # Three unit squares in z = 0; "nearest" clamps onto the square.
+    lo = np.array([[0.0, 0.0, 0.0], [5.0, 0.0, 0.0], [20.0, 0.0, 0.0]])
+    corners = np.stack([lo + [dx, dy, 0.0] for dx in (0, 1) for dy in (0, 1)] * 2, axis=1)
+    asked = []
+
+    def nearest(i, center, radius):
+        asked.append(i)
+        p = np.clip(center, lo[i], lo[i] + [1.0, 1.0, 0.0])
+        return p, float(np.linalg.norm(p - center))
+
+    faces = core.FaceTargets(corners, ["A", "B", "C"], nearest, excluded_objects=[1])
+    hits = faces.query_range((0.5, 0.5, 2.0), 6.0)
+    assert asked == [0] and len(faces) == 2
+    assert hits.kind.tolist() == [core.KIND_FACE] and np.allclose(hits.co, [[0.5, 0.5, 0.0]])
+    assert np.allclose(hits.dist, [2.0]) and len(faces.query_range((10.0, 0.0, 9.0), 2.0)) == 0
+
+
+def test_kind_bias_ranks_vertices_before_face_points():
+    view = _look_down_z()
+    hits = core.HitSet(
+        co=np.array([[0.1, 0.0, 0.0], [0.2, 0.0, 0.0]]), dist=np.array([0.1, 0.2]),
+        kind=np.array([core.KIND_FACE, core.KIND_POINT], dtype=np.uint8),
+        owner=np.zeros(2, dtype=np.int32), owner_names=["A"],
+    )
+    mouse = view.project_point((0.0, 0.0, 0.0))
+    plain = core.score_range_hits(hits, (0, 0, 0), view, mouse, 30)
+    biased = core.score_range_hits(hits, (0, 0, 0), view, mouse, 30,
+                                   kind_bias={core.KIND_FACE: 12.0})
+    assert [c.kind for c in plain] == ["FACE", "POINT"]
+    assert [c.kind for c in biased] == ["POINT", "FACE"]
+    assert np.isclose(biased[1].score, plain[0].score + 12.0)
+
+
+def test_edge_index_closest_points_match_brute_force():
+    rng = np.random.default_rng(9)
+    pts = rng.uniform(-5, 5, (200, 3)).astype(np.float32)
+    edges = rng.integers(0, 200, (400, 2))
+    idx = core.EdgeIndex(pts, edges, np.arange(400) % 3, ["A", "B", "C"])
+    center = np.array([0.5, -0.2, 0.1])
+    hits = idx.query_range(center, 1.5)
+    a, b = pts[edges[:, 0]].astype(float), pts[edges[:, 1]].astype(float)
+    ab = b - a
+    t = np.clip(((center - a) * ab).sum(1) / np.maximum((ab ** 2).sum(1), 1e-12), 0, 1)
+    d = np.linalg.norm(a + ab * t[:, None] - center, axis=1)
+    assert np.allclose(hits.dist, np.sort(d[d <= 1.5]))
+    assert (hits.kind == core.KIND_EDGE).all() and hits.segment.shape == (len(hits), 2, 3)
+    assert idx.edges.dtype == np.int32 and idx.nbytes > idx.edges.nbytes
+
+
+def test_edge_midpoints_and_edge_candidates_carry_segments():
+    pts = np.array([[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], [2.0, 2.0, 0.0]], dtype=np.float32)
+    edges = np.array([[0, 1], [1, 2]])
+    assert np.allclose(core.edge_midpoints(pts, edges), [[1, 0, 0], [2, 1, 0]])
+    idx = core.EdgeIndex(pts, edges, [0, 0], ["A"])
+    assert idx.edge_through((2.0, 1.0, 0.0)) == ((2.0, 0.0, 0.0), (2.0, 2.0, 0.0))
+    # Far from the origin a float32 midpoint is off its edge by more than 1e-5.
+    far = np.random.default_rng(40).uniform(-1, 1, (200, 3)) + (5000, -3000, 800)
+    far = far.astype(np.float32)
+    pairs = np.arange(200).reshape(-1, 2)
+    idx_far = core.EdgeIndex(far, pairs, np.zeros(100), ["A"])
+    for mid, (a, b) in zip(core.edge_midpoints(far, pairs).astype(np.float32), pairs):
+        assert idx_far.edge_through(mid) == (tuple(far[a].tolist()), tuple(far[b].tolist()))
+    view = _look_down_z()
+    center = (1.0, 0.3, 0.0)
+    cands = core.score_range_hits(idx.query_range(center, 1.0), center, view,
+                                  view.project_point(center), 30)
+    assert cands[0].kind == "EDGE" and np.allclose(cands[0].location, (1.0, 0.0, 0.0))
+    assert cands[0].segments == (((0.0, 0.0, 0.0), (2.0, 0.0, 0.0)),)
+
+
+def test_lod_levels_keep_one_real_point_per_cell():
+    rng = np.random.default_rng(11)
+    pts = rng.uniform(0, 8, (5000, 3))
+    excluded = np.zeros(len(pts), dtype=bool)
+    excluded[:500] = True
+    lod = core.LodIndex(_index(pts, excluded=excluded))
+    cells = [level.cell for level in lod.levels]
+    assert cells == sorted(cells, reverse=True) and len(lod.levels[0].ids) <= 8
+    lo = pts[500:].min(axis=0)
+    for level in lod.levels:
+        assert len(level.ids) <= len(pts) // 2 and (level.ids >= 500).all()
+        key = np.floor((pts[level.ids] - lo) / level.cell).astype(np.int64)
+        assert len(np.unique(key, axis=0)) == len(level.ids)  # one per cell
+    assert lod.level_for(0.0) is None and lod.level_for(100.0) is lod.levels[0]
+    assert "lod" in lod.memory_breakdown() and lod.nbytes > 0
+
+
+def test_lod_query_cost_stays_flat_across_zoom():
+    pts = _grid_points(400, spacing=0.01)   # 160k points on a 4 x 4 plane
+    index = _index(pts, backend="GRID")
+    lod = core.LodIndex(index, backend="GRID")
+    center = (2.0, 2.0, 0.0)
+    # Zooming out: query radius and cell grow together (fixed pixel sizes).
+    counts = [len(lod.query_range(center, 20 * cell, cell)) for cell in (0.01, 0.04, 0.16)]
+    assert max(counts) < 4 * min(counts)
+    assert len(index.query_range(center, 20 * 0.16)) > 10 * counts[-1]
+    # Full detail below the finest level: same hits as the flat index.
+    fine = lod.query_range(center, 0.05, 0.0)
+    assert np.array_equal(fine.co, index.query_range(center, 0.05).co)
+
+
+def test_pixel_size_matches_projection():
+    view = _look_down_z()
+    assert view.pixel_size((3.0, 1.0, 0.0)) == pytest.approx(1.0 / 40.0)
+    m = np.eye(4)
+    m[3] = (0.0, 0.0, -1.0, 0.0)
+    assert core.ViewProjection(m, 100, 100).pixel_size((0.0, 0.0, 1.0)) == np.inf
+    # 800 x 600 px at 40 px per unit: a 25-unit diagonal.
+    assert view.reach((3.0, 1.0, 0.0)) == pytest.approx(25.0)
+
+
+def test_disk_cache_round_trip_maps_arrays(tmp_path):
+    disk = core.DiskCache(str(tmp_path))
+    coords = np.random.default_rng(3).random((1000, 3)).astype(np.float32)
+    arrays = {"coords": coords, "empty": np.empty((0, 2), dtype=np.int32)}
+    arrays.update(zip(("order_x", "order_y", "order_z"), core.local_axis_orders(coords)))
+    key = ("/lib/env.blend", 1234, 5678, "Wall", 1000)
+    assert disk.get(key) is None and disk.put(key, arrays)
+    loaded = disk.get(key)
+    assert isinstance(loaded["coords"], np.memmap) and not loaded["coords"].flags.writeable
+    for name, value in arrays.items():
+        assert loaded[name].dtype == value.dtype and np.array_equal(loaded[name], value)
+    # Truncated or foreign files are misses, not errors.
+    with open(disk.path(key), "r+b") as f:
+        f.truncate(200)
+    assert disk.get(key) is None
+    (tmp_path / "other.scidx").write_bytes(b"not an index")
+    assert core.read_arrays(str(tmp_path / "other.scidx")) is None
+
+
+def test_disk_cache_prunes_oldest_entries(tmp_path):
+    disk = core.DiskCache(str(tmp_path), max_bytes=10_000)
+    for i in range(5):
+        assert disk.put(("mesh", i), {"coords": np.zeros((300, 3), dtype=np.float32)})
+        os.utime(disk.path(("mesh", i)), ns=(i * 10 ** 9, i * 10 ** 9))
+    disk.prune(disk.max_bytes)
+    assert disk.nbytes <= 10_000
+    assert disk.get(("mesh", 4)) is not None and disk.get(("mesh", 0)) is None
+    disk.clear()
+    assert disk.nbytes == 0
+
+
+def test_cached_axis_orders_follow_scale_and_translation():
+    rng = np.random.default_rng(5)
+    local = rng.integers(-20, 20, (500, 3)).astype(np.float32)  # many ties
+    orders = core.local_axis_orders(local)
+    m = np.diag([2.0, -0.5, 1.0, 1.0])
+    m[:3, 3] = (4.0, 1.0, -3.0)
+    world = core.transform_points(local, m)
+    mapped = core.transformed_axis_orders(orders, m)
+    index = core.SnapIndex(world, np.zeros(500), np.zeros(500), ["A"], axis_order=mapped)
+    plain = core.SnapIndex(world, np.zeros(500), np.zeros(500), ["A"])
+    for axis in range(3):
+        assert np.all(np.diff(index.axis_values[axis]) >= 0)
+        assert np.array_equal(index.axis_values[axis], plain.axis_values[axis])
+    assert len(index.query_line((4.0, 1.0, 0.0), 2, 1.5, 50.0)) == len(
+        plain.query_line((4.0, 1.0, 0.0), 2, 1.5, 50.0))
+    rotated = np.eye(4)
+    rotated[:2, :2] = [[0.0, -1.0], [1.0, 0.0]]
+    assert core.transformed_axis_orders(orders, rotated) is None
+    # The two-level loader may hand precomputed orderings to its indices.
+    box = np.array([[[x, y, z] for x in (-40, 40) for y in (-10, 10) for z in (-25, 25)]])
+    two = core.TwoLevelIndex(box, ["A"], lambda i: (world, None, mapped))
+    assert np.array_equal(two.object_index(0).axis_order[1], mapped[1])
+
+
+def _flat_parts(rng, n_parts=12, per_part=3000):
+    coords = [rng.uniform(-1, 1, (per_part + k, 3)).astype(np.float32) for k in range(n_parts)]
+    mats = np.tile(np.eye(4), (n_parts, 1, 1))
+    mats[:, :3, 3] = rng.uniform(-20, 20, (n_parts, 3))
+    moving = np.zeros(n_parts, dtype=bool)
+    moving[0] = True
+    parts = core.FlatParts(
+        owners=np.arange(n_parts), coords=coords, matrices=mats, moving=moving,
+        selections={1: np.array([0, 5, 7])},
+        edges={1: np.array([[0, 1], [2, 3]]), 2: np.array([[0, 1]])},
+        bounds_owners=np.array([n_parts]), bounds_corners=np.zeros((1, 8, 3)),
+        bounds_matrices=np.eye(4)[None], bounds_moving=np.array([False]),
+    )
+    return parts, [f"P{i}" for i in range(n_parts + 1)]
+
+
+def test_assemble_flat_index_is_the_same_with_a_pool():
+    parts, names = _flat_parts(np.random.default_rng(13))
+    serial, serial_edges, _ = core.assemble_flat_index(parts, names, backend="GRID")
+    pool = core.BuildPool(workers=4)
+    try:
+        pooled, pooled_edges, lod = core.assemble_flat_index(parts, names, backend="GRID",
+                                                             lod=True, pool=pool)
+        future = pool.submit(core.assemble_flat_index, parts, names, "GRID", False, pool)
+        assert np.array_equal(future.result(timeout=30)[0].points, serial.points)
+    finally:
+        pool.shutdown(wait=True)
+    assert np.array_equal(pooled.points, serial.points)
+    for a, b in zip(pooled.axis_order, serial.axis_order):
+        assert np.array_equal(a, b)
+    assert np.array_equal(pooled_edges.edges, serial_edges.edges) and lod.levels
+    # Moving part, selected vertices and the edge touching them are excluded.
+    sizes = [len(c) for c in parts.coords]
+    assert pooled.query_range(parts.matrices[0, :3, 3], 2.0).owner.tolist().count(0) == 0
+    second = pooled.query_range(parts.matrices[1, :3, 3], 2.0)
+    assert len(second.owner[second.owner == 1]) == sizes[1] + 2 - 3 - 1
+    assert len(pooled_edges) == 2 and pooled.kinds[-9:].tolist() == [core.KIND_BOUNDS] * 9
+
+
+def test_transform_parts_batches_keep_part_order():
+    rng = np.random.default_rng(14)
+    coords = [rng.random((n, 3)) for n in (10, 70_000, 3, 55_000, 0, 120_000)]
+    mats = np.tile(np.eye(4), (len(coords), 1, 1))
+    mats[:, 0, 3] = np.arange(len(coords))
+    pool = core.BuildPool(workers=3)
+    try:
+        out = core.transform_parts(coords, mats, pool)
+    finally:
+        pool.shutdown(wait=True)
+    assert [len(p) for p in out] == [len(c) for c in coords]
+    for k, pts in enumerate(out):
+        assert np.allclose(pts - coords[k], [k, 0.0, 0.0])
+
+
+def test_idle_prefetch_waits_for_a_steady_key_and_hands_it_out_once():
+    state = core.IdlePrefetch(idle_seconds=0.5)
+    assert not state.observe("a", 0.0)
+    assert not state.observe("a", 0.4)
+    assert not state.observe("b", 0.6)  # changed: the wait starts over
+    assert state.observe("b", 1.1)
+    future = Future()
+    state.start("b", future)
+    assert not state.observe("b", 2.0)  # building already
+    assert state.take("c") is None and future.cancelled()  # stale build dropped
+
+    future = Future()
+    state.start("b", future)
+    future.set_result("built")
+    assert state.take("b") is future and state.take("b") is None
+    assert not state.observe(None, 5.0) and not state.observe(None, 9.0)
+
+    failed = Future()
+    failed.set_exception(RuntimeError("bad mesh"))
+    state.start("d", failed)
+    assert state.take("d") is None
+
+
+def test_frame_watchdog_steps_down_when_slow_and_back_up_with_headroom():
+    dog = core.FrameWatchdog(target=0.010)
+    assert dog.tier is core.QUALITY_TIERS[0]
+    # One slow event (a lazy load) is not enough.
+    assert not dog.record(0.050) and not dog.record(0.001) and not dog.record(0.001)
+    changes = [dog.record(0.030) for _ in range(3)]
+    assert changes == [False, True, False] and dog.level == 1
+    for _ in range(20):
+        dog.record(0.030)
+    assert dog.tier is core.QUALITY_TIERS[-1] and dog.tier.min_interval > 0
+    # Just under the target holds the tier; well under it steps back up.
+    assert not any(dog.record(0.008) for _ in range(30))
+    steps = sum(dog.record(0.002) for _ in range(3 * core.watchdog.UP_SAMPLES))
+    assert steps == 3 and dog.level == 0
+    radii = [t.radius_scale for t in core.QUALITY_TIERS]
+    cells = [t.lod_scale for t in core.QUALITY_TIERS]
+    assert radii == sorted(radii, reverse=True) and cells == sorted(cells)
+
+
+def test_coincident_first_and_shared_owners():
+    pts = np.array([[0.0, 0, 0], [1, 1, 1], [0.00004, 0, 0], [1.00002, 1, 1], [0.5, 0, 0]])
+    assert core.coincident_first(pts, 1e-4).tolist() == [0, 1, 0, 1, 4]
+    assert core.coincident_first(pts, 1e-6).tolist() == [0, 1, 2, 3, 4]
+    # Cells too many for one int64 code take the row-wise path.
+    far = np.array([[-1e12, 0, 0], [1e12, 5, 5], [-1e12, 0, 0]])
+    assert core.coincident_first(far, 1e-3).tolist() == [0, 1, 0]
+    shared = core.SharedOwners.from_pairs([7, 3, 7, 7], [2, 1, 5, 2])
+    assert shared.of(7).tolist() == [2, 5] and shared.of(3).tolist() == [1]
+    assert len(shared.of(4)) == 0 and len(shared) == 2
+
+
+def test_assemble_flat_index_merges_seam_vertices():
+    # Two quads sharing an edge (a kit seam), a moving copy and a selection.
+    quad = np.array([[0.0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 0]], np.float32)
+    mats = np.tile(np.eye(4), (4, 1, 1))
+    mats[1, 0, 3] = 1.0  # shares vertices 1/2 of part 0 through its 0/3
+    mats[3, 2, 3] = 5.0  # the edited part is elsewhere
+    parts = core.FlatParts(
+        owners=np.arange(4), coords=[quad] * 4, matrices=mats,
+        moving=np.array([False, False, True, False]), selections={3: np.array([0])},
+        edges={1: np.array([[0, 3], [1, 2]])},
+    )
+    names = ["A", "B", "Moving", "Edited"]
+    plain, _, _ = core.assemble_flat_index(parts, names, backend="LINEAR")
+    merged, edges, _ = core.assemble_flat_index(parts, names, backend="LINEAR", dedup=1e-4)
+    # A keeps 4 of 5 (split copy), B 2 new; moving and edited parts stay whole.
+    assert len(plain) == 4 * 5 + 2 and len(merged) == 4 + 2 + 5 + 5 + 2
+    seam = merged.query_range((1.0, 0.0, 0.0), 1e-3)
+    assert len(seam) == 1 and merged.owners_of(int(np.flatnonzero(
+        np.all(merged.points == [1, 0, 0], axis=1))[0])) == [0, 1]
+    assert merged.excluded.nbytes == plain.excluded.nbytes
+    # B's seam edge now ends at A's vertices.
+    assert np.allclose(merged.points[edges.edges[0]], [[1, 0, 0], [1, 1, 0]])
+    assert merged.memory_breakdown()["meta"] > 0
+    # Candidates keep the point id, so every owner of a seam point is named.
+    view = _look_down_z()
+    cands = core.score_range_hits(seam, (1.0, 0.0, 0.0), view,
+                                  view.project_point((1.0, 0.0, 0.0)), 30)
+    owners = [names[o] for o in merged.owners_of(cands[0].point_id)]
+    assert core.format_owners(owners) == "A, B"
+    assert core.format_owners(["A", "B", "C", "D"]) == "A, B +2"
+
+
+
+def test_plan_flat_merge_takes_spare_parts_the_merge_makes_room_for():
+    quad = np.array([[0.0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 0]], np.float32)
+    mats = np.tile(np.eye(4), (3, 1, 1))
+    mats[1, 0, 3] = 1.0    # spare B shares a seam with A: costs 2
+    mats[2, 0, 3] = 10.0   # spare C stands alone: costs 4
+    parts = core.FlatParts(
+        owners=np.arange(3), coords=[quad] * 3, matrices=mats, moving=np.zeros(3, dtype=bool),
+        spare=2, spare_corners=np.zeros((2, 8, 3)),
+    )
+    plan = core.plan_flat_merge(parts, 1e-4, budget=9)
+    assert plan.admitted == 1 and len(plan.world) == 2
+    assert plan.parts.bounds_owners.tolist() == [2] and plan.parts.spare == 1
+    index, _, _ = core.assemble_flat_index(plan.parts, ["A", "B", "C"], backend="LINEAR",
+                                           plan=plan)
+    assert len(index) == 4 + 2 + core.BOUNDS_POINTS_PER_OBJECT
+    c_points = index.kinds[index.owners == 2]
+    assert len(c_points) == core.BOUNDS_POINTS_PER_OBJECT and np.all(c_points == core.KIND_BOUNDS)
+    # Unmerged, B alone overruns the budget; without one, every spare is kept.
+    assert core.plan_flat_merge(parts, 0.0, budget=9).admitted == 0
+    assert core.plan_flat_merge(parts, 1e-4).admitted == 2
@@ -0,0 +1,279 @@
+"""pytest-benchmark microbenchmarks for the snap core build and query paths.
+
+Usage:
+  python -m pytest -q tests/test_core_benchmarks.py
+  python -m pytest -q tests/test_core_benchmarks.py --benchmark-disable   # smoke only
+
+Backends are benchmarked per scene type; results are grouped so the table
+shows which backend wins for each (KDTREE only runs inside Blender).
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import smartclip_core as core
+
+pytest.importorskip("pytest_benchmark")
+
+_N = 50_000
+_BACKENDS = ["GRID", "STATIC", "LINEAR"] + (["KDTREE"] if core.backends.kdtree_available() else [])
+
+
+def _architectural(rng):
+    """Near-uniform: walls and floors of a 10 x 10 room grid (surfaces)."""
+    per = _N // 300
+    planes = []
+    for i in range(10):
+        for j in range(10):
+            base = np.array([i * 10.0, j * 10.0, 0.0])
+            u = rng.uniform(0, 10, (per, 2))
+            planes.append(base + np.column_stack((u, np.zeros(per))))           # floor
+            planes.append(base + np.column_stack((u[:, 0], np.zeros(per), u[:, 1] * 0.3)))  # wall
+            planes.append(base + np.column_stack((np.zeros(per), u[:, 0], u[:, 1] * 0.3)))  # wall
+    return np.vstack(planes)
+
+
+def _clustered(rng):
+    """Dense props scattered in a large, mostly empty set."""
+    centers = rng.uniform(-200, 200, (40, 3))
+    return np.vstack([rng.normal(c, 0.5, (_N // 40, 3)) for c in centers])
+
+
+def _volume(rng):
+    """Uniform random volume (scan / particle-like)."""
+    return rng.uniform(-50.0, 50.0, size=(_N, 3))
+
+
+_SCENES = {"architectural": _architectural, "clustered": _clustered, "volume": _volume}
+
+
+@pytest.fixture(scope="module", params=sorted(_SCENES))
+def scene(request):
+    rng = np.random.default_rng(2825)
+    points = _SCENES[request.param](rng)
+    return request.param, points
+
+
+@pytest.fixture(scope="module")
+def view():
+    m = np.eye(4)
+    m[0, 0] = m[1, 1] = 0.02
+    return core.ViewProjection(m, 1920, 1080)
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+def test_bench_backend_build(benchmark, scene, backend):
+    name, points = scene
+    benchmark.group = f"build-{name}"
+    benchmark.extra_info["auto_choice"] = core.choose_backend(points)
+    result = benchmark(core.BACKENDS[backend], points)
+    assert result.count == len(points)
+
+
+@pytest.mark.parametrize("backend", _BACKENDS)
+def test_bench_backend_query(benchmark, scene, backend):
+    name, points = scene
+    benchmark.group = f"query-{name}"
+    benchmark.extra_info["auto_choice"] = core.choose_backend(points)
+    built = core.BACKENDS[backend](points)
+    centers = points[:: len(points) // 64][:64]
+
+    def run():
+        return sum(len(built.find_range(c, 1.5)[0]) for c in centers)
+
+    assert benchmark(run) > 0
+
+
+def test_bench_build(benchmark, view):
+    points = _volume(np.random.default_rng(1))
+    n = len(points)
+    benchmark.group = "index"
+    index = benchmark(core.SnapIndex, points, np.zeros(n), np.zeros(n), ["Scene"])
+    assert len(index) == n
+
+
+def test_bench_query_and_score(benchmark, view):
+    points = _volume(np.random.default_rng(1))
+    n = len(points)
+    index = core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"])
+    center = (1.0, 2.0, 3.0)
+    mouse = view.project_point(center)
+    benchmark.group = "index"
+
+    def run():
+        hits = index.query_range(center, 7.5)
+        return core.score_range_hits(hits, center, view, mouse, 30)
+
+    assert isinstance(benchmark(run), list)
+
+
+def test_bench_axis_query(benchmark, view):
+    points = _volume(np.random.default_rng(1))
+    n = len(points)
+    index = core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"])
+    center = (1.0, 2.0, 3.0)
+    mouse = view.project_point(center)
+    benchmark.group = "index"
+
+    def run():
+        hits = index.axis_window(2, center[2], 10.0)
+        return core.score_axis_hits(hits, 2, center, view, mouse)
+
+    assert benchmark(run)
+
+
+def test_bench_source_corners_query_and_score(benchmark, view):
+    points = _volume(np.random.default_rng(1))
+    n = len(points)
+    index = core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"])
+    center = np.array([1.0, 2.0, 3.0])
+    corners = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)])
+    sources = np.vstack((center, center + corners))
+    benchmark.group = "index"
+
+    def run():
+        hits = index.query_range_multi(sources, 7.5)
+        return core.score_source_hits(hits, sources, center, view, 30)
+
+    assert isinstance(benchmark(run), list)
+
+
+@pytest.mark.parametrize("constraint", ["X", "XY"])
+def test_bench_constrained_query_and_score(benchmark, view, constraint):
+    points = _volume(np.random.default_rng(1))
+    n = len(points)
+    index = core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"])
+    center = (1.0, 2.0, 3.0)
+    mouse = view.project_point(center)
+    free_axes = ["XYZ".index(a) for a in constraint]
+    benchmark.group = "index"
+
+    def run():
+        if len(free_axes) == 1:
+            hits = index.query_line(center, free_axes[0], 7.5, 7.5)
+        else:
+            hits = index.query_slab(center, 3 - sum(free_axes), 7.5, 7.5)
+        return core.score_constrained_hits(hits, center, free_axes, view, mouse, 30)
+
+    assert isinstance(benchmark(run), list)
+
+
+def _grid_edges(side):
+    """Points and edges of a *side* x *side* vertex grid (mesh-like edges)."""
+    xs = np.arange(side, dtype=np.float64) * 0.1
+    gx, gy = np.meshgrid(xs, xs, indexing="ij")
+    points = np.column_stack((gx.ravel(), gy.ravel(), np.zeros(gx.size)))
+    ids = np.arange(side * side).reshape(side, side)
+    edges = np.vstack((
+        np.column_stack((ids[:-1].ravel(), ids[1:].ravel())),
+        np.column_stack((ids[:, :-1].ravel(), ids[:, 1:].ravel())),
+    ))
+    return points, edges
+
+
+def test_bench_edge_index_build(benchmark):
+    points, edges = _grid_edges(224)  # ~50k vertices, ~100k edges
+    pts32 = points.astype(np.float32)
+    benchmark.group = "edges"
+    assert len(benchmark(lambda: core.EdgeIndex(pts32, edges, np.zeros(len(edges)), ["G"])))
+
+
+def test_bench_edge_query_and_score(benchmark, view):
+    points, edges = _grid_edges(224)
+    index = core.EdgeIndex(points.astype(np.float32), edges, np.zeros(len(edges)), ["G"])
+    center = (11.05, 11.02, 0.3)
+    mouse = view.project_point(center)
+    benchmark.group = "edges"
+
+    def run():
+        hits = index.query_range(center, 0.5)
+        return core.score_range_hits(hits, center, view, mouse, 30,
+                                     kind_bias={core.KIND_EDGE: 6.0})
+
+    assert benchmark(run)
+
+
+def test_bench_lod_build(benchmark, scene):
+    name, points = scene
+    n = len(points)
+    index = core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"], backend="GRID")
+    benchmark.group = "lod"
+    benchmark.extra_info["scene"] = name
+    assert benchmark(core.LodIndex, index, "GRID").levels
+
+
+@pytest.mark.parametrize("pixel", [0.02, 0.2, 2.0])
+def test_bench_lod_query_and_score(benchmark, view, pixel):
+    """Zoomed out (larger world pixel): radius grows, level gets coarser."""
+    points = _architectural(np.random.default_rng(1))
+    n = len(points)
+    lod = core.LodIndex(core.SnapIndex(points, np.zeros(n), np.zeros(n), ["Scene"]))
+    center = (45.0, 45.0, 0.0)
+    mouse = view.project_point(center)
+    benchmark.group = "lod"
+    benchmark.extra_info["level_points"] = len(getattr(lod.level_for(2 * pixel), "ids", points))
+
+    def run():
+        hits = lod.query_range(center, 30 * pixel, 2 * pixel)
+        return core.score_range_hits(hits, center, view, mouse, 30)
+
+    assert isinstance(benchmark(run), list)
+
+
+@pytest.mark.parametrize("workers", sorted({1, 4, os.cpu_count() or 1}))
+def test_bench_assemble_flat_index(benchmark, workers):
+    """Post-extraction build of ~1M points in 200 parts, serial vs pooled."""
+    rng = np.random.default_rng(6)
+    coords = [rng.uniform(-1, 1, (5000, 3)).astype(np.float32) for _ in range(200)]
+    mats = np.tile(np.eye(4), (200, 1, 1))
+    mats[:, :3, 3] = rng.uniform(-100, 100, (200, 3))
+    parts = core.FlatParts(owners=np.arange(200), coords=coords, matrices=mats,
+                           moving=np.zeros(200, dtype=bool))
+    pool = core.BuildPool(workers) if workers > 1 else None
+    benchmark.group = "assemble"
+    try:
+        index, _edges, _lod = benchmark(core.assemble_flat_index, parts, [""] * 200,
+                                        "GRID", False, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    assert len(index) == 200 * 5000
+
+
+def test_bench_assemble_merged_kit(benchmark):
+    """~1.7M points of 400 kit pieces with split-normal copies and shared seams."""
+    rng = np.random.default_rng(7)
+    piece = np.floor(rng.uniform(0, 1, (2500, 3)) * 20) / 20
+    piece[::3, 0] = 1.0  # the +X face is the next piece's -X face
+    piece = np.vstack((piece, piece[:2500 // 3 * 2]))  # split-normal copies
+    mats = np.tile(np.eye(4), (400, 1, 1))
+    mats[:, 0, 3] = np.arange(400) % 20
+    mats[:, 1, 3] = np.arange(400) // 20 * 2
+    parts = core.FlatParts(owners=np.arange(400), coords=[piece.astype(np.float32)] * 400,
+                           matrices=mats, moving=np.zeros(400, dtype=bool))
+    benchmark.group = "assemble"
+    index, _edges, _lod = benchmark(core.assemble_flat_index, parts, [""] * 400, "GRID",
+                                    dedup=1e-4)
+    benchmark.extra_info["kept"] = len(index) / (400 * len(piece))
+    assert len(index) < 400 * 2500 and len(index.shared)
+
+
+def test_bench_allocate_50k_objects(benchmark):
+    """Scope ordering for 50k objects: batched centres + partial selection."""
+    rng = np.random.default_rng(4)
+    n = 50_000
+    corners = rng.uniform(-1, 1, (n, 8, 3))
+    mats = np.tile(np.eye(4), (n, 1, 1))
+    mats[:, :3, 3] = rng.uniform(-500, 500, (n, 3))
+    counts = rng.integers(8, 20_000, n)
+    benchmark.group = "scope"
+
+    def run():
+        centers = core.bbox_centers(corners, mats)
+        d2 = ((centers - centers[0]) ** 2).sum(axis=1)
+        return core.allocate_vertex_budget(d2, counts, 50_000)
+
+    full, bounds = benchmark(run)
+    assert len(full) + len(bounds) == n